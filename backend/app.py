@@ -1,20 +1,66 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import time
+boot = time.perf_counter()  # Startup time is measured from here
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import cv2
-import numpy as np
-import base64
-import json
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 import sys
 import os
+import asyncio
+from contextlib import asynccontextmanager
 
 # Add current directory to sys.path to allow imports from main.py and its dependencies
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from backend.main import HandTrackingSystem
+from modules.session_manager import SessionManager, SessionLimitError
+from modules.frame_worker import FrameWorker
+from modules.frame_ingest import LatestFrameSlot
+from modules.protocol import ConnectionProtocol
+from modules.frame_store import FrameRecorder
+from modules.boundary_log import BoundaryLogger
+from modules.profiler import StageProfiler, merge_profiles
+from modules.streaming import StreamRegistry, mjpeg_part, MJPEG_MEDIA_TYPE
+from modules.startup import Startup
+from config.config import RECORD_DIR, LOG_DIR, STREAM_ENABLED, STREAM_MAX_FPS
 
-app = FastAPI()
+# Each WebSocket gets its own pipeline state from the session manager; the pool is built during warm-up
+sessions = SessionManager(HandTrackingSystem, prefill=False)
+connections = {}  # session_id -> WebSocket, used to close evicted sessions
+# Decoding and processing run in an executor so the event loop stays responsive
+worker = FrameWorker(HandTrackingSystem)
+# Annotated frames of the sessions supervisors can watch (rendered only while watched)
+streams = StreamRegistry()
+# Artifacts, pooled pipelines and worker processes are prepared after the server starts answering
+startup = Startup(started=boot)
+
+async def evict_idle_sessions():
+    """
+    Periodically evict idle sessions and close their sockets.
+    """
+    while True:
+        await asyncio.sleep(max(1.0, sessions.idle_timeout / 4))
+        for session in sessions.evict_idle():
+            websocket = connections.pop(session.session_id, None)
+            if websocket is not None:
+                print(f"Evicting idle session {session.session_id}")
+                try:
+                    await websocket.close(code=1001)
+                except Exception:
+                    pass
+
+@asynccontextmanager
+async def lifespan(app):
+    reaper = asyncio.create_task(evict_idle_sessions())
+    warmup = asyncio.create_task(startup.run(sessions, worker))
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        reaper.cancel()
+        worker.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS
 app.add_middleware(
@@ -34,29 +80,199 @@ app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 async def read_index():
     return FileResponse(os.path.join(frontend_path, 'index.html'))
 
-# Initialize the hand tracking system
-system = HandTrackingSystem()
+@app.get("/healthz")
+async def liveness():
+    """
+    Liveness probe: the server answers (it may still be warming up).
+    """
+    return {"status": "ok", "uptime_s": time.perf_counter() - boot}
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness probe: 200 once warm-up is done, 503 with its progress before.
+    """
+    return JSONResponse(startup.report(), status_code=200 if startup.ready else 503)
+
+@app.get("/sessions")
+async def read_sessions():
+    return sessions.stats()
+
+@app.get("/workers")
+async def read_workers():
+    """
+    Frame executor and, in shard mode, each worker process's sessions, load and restarts.
+    """
+    return worker.stats()
+
+@app.get("/metrics/profile")
+async def read_profile(per_session: bool = False):
+    """
+    Rolling per-stage timings across all sessions (and per session if asked).
+    """
+    live = [session for session in sessions.active() if session.system is not None]
+    profilers = [session.system.hand_tracker.profiler for session in live]
+    result = {"enabled": StageProfiler.enabled, "sessions": len(live), **merge_profiles(profilers)}
+    if per_session:
+        result["per_session"] = {session.session_id: profiler.snapshot() for session, profiler in zip(live, profilers)}
+    return result
+
+@app.post("/metrics/profile")
+async def update_profile(enabled: bool, reset: bool = False):
+    """
+    Turn per-stage profiling on or off at runtime, optionally clearing collected data.
+    """
+    StageProfiler.set_enabled(enabled)
+    if reset:
+        for session in sessions.active():
+            if session.system is not None:
+                session.system.hand_tracker.profiler.reset()
+    return {"enabled": StageProfiler.enabled}
+
+def watchable_stream(session_id):
+    """
+    The session's FrameStream, or None if it cannot be watched.
+    """
+    if not STREAM_ENABLED or worker.mode != "thread":
+        return None  # In process mode the frames never reach this process
+    return streams.get(session_id)
+
+@app.get("/streams")
+async def read_streams():
+    return {"enabled": STREAM_ENABLED and worker.mode == "thread", "streams": streams.stats()}
+
+@app.get("/stream/{session_id}.mjpg")
+async def stream_mjpeg(session_id: str, fps: float = STREAM_MAX_FPS):
+    """
+    A session's annotated frames as an MJPEG stream (e.g. for an <img> tag).
+    """
+    stream = watchable_stream(session_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No stream for this session")
+    if fps <= 0:
+        raise HTTPException(status_code=400, detail="fps must be positive")
+
+    async def parts():
+        viewer = stream.attach(max_fps=fps)
+        try:
+            async for jpeg in viewer.frames():
+                yield mjpeg_part(jpeg)
+        finally:
+            stream.detach(viewer)
+
+    return StreamingResponse(parts(), media_type=MJPEG_MEDIA_TYPE, headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/ws/stream/{session_id}")
+async def stream_websocket(websocket: WebSocket, session_id: str, fps: float = STREAM_MAX_FPS):
+    """
+    A session's annotated frames as binary WebSocket messages, one JPEG each.
+    """
+    stream = watchable_stream(session_id)
+    await websocket.accept()
+    if stream is None or fps <= 0:
+        await websocket.close(code=1008, reason="No stream for this session")
+        return
+    viewer = stream.attach(max_fps=fps)
+    try:
+        async for jpeg in viewer.frames():
+            await websocket.send_bytes(jpeg)
+        await websocket.close(code=1001)  # The session ended
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        stream.detach(viewer)
+
+async def negotiate(websocket, slot):
+    """
+    Agree on the frame and reply formats. A client that wants sequence numbers,
+    binary replies or another frame format opens with a JSON hello and gets a
+    welcome back; older clients start sending JPEG frames right away and get
+    unsequenced JSON replies.
+    Returns:
+        ConnectionProtocol: The connection's formats.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("text") is not None:
+        protocol = ConnectionProtocol.from_hello(message["text"])
+        await websocket.send_json(protocol.welcome())
+        return protocol
+    # No hello: the first message is already a frame
+    slot.put((None, time.perf_counter(), message["bytes"]))
+    return ConnectionProtocol()
+
+async def receive_frames(websocket, session, slot, protocol):
+    """
+    Read frames from the client into the session's latest-frame slot.
+    Each slot entry is (seq, receive time, frame bytes).
+    """
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            received = time.perf_counter()
+            if sessions.get(session.session_id) is None:
+                break  # Session was evicted
+            try:
+                seq, data = protocol.split_frame(data)
+            except ValueError:
+                slot.skip()
+                continue
+            slot.put((seq, received, data))
+    finally:
+        slot.close()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     try:
+        session = sessions.acquire()
+    except SessionLimitError as e:
+        print(f"Rejecting client: {e}")
+        await websocket.close(code=1013, reason=str(e))
+        return
+
+    connections[session.session_id] = websocket
+    if RECORD_DIR and worker.mode == "thread":
+        session.system.recorder = FrameRecorder(os.path.join(RECORD_DIR, session.session_id))
+    if LOG_DIR and worker.mode == "thread":
+        session.system.logger = BoundaryLogger(os.path.join(LOG_DIR, session.session_id))
+    if STREAM_ENABLED and worker.mode == "thread":
+        session.system.stream = streams.open(session.session_id)
+    # Frames arriving while one is processed replace each other; only the newest is decoded
+    slot = LatestFrameSlot()
+    receiver = None
+    try:
+        protocol = await negotiate(websocket, slot)
+        receiver = asyncio.create_task(receive_frames(websocket, session, slot, protocol))
         while True:
-            # Receive frame bytes from client
-            data = await websocket.receive_bytes()
-            
-            # Decode image
-            nparr = np.frombuffer(data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            entry = await slot.get()
+            if entry is None:
+                break
+            seq, received, data = entry
+            if session.closed:
+                break  # Session was evicted
+
+            # Decode and process the frame off the event loop
+            result = await worker.submit(session, data, protocol.ingest, protocol.outline)
             
-            if frame is None:
+            if result is None:
+                if session.closed:
+                    break  # Evicted while the frame waited
+                slot.skip()
                 continue
-
-            # Process frame to get data only
-            result = system.process_frame_data(frame)
+            session.frames_processed += 1
+            result.update(slot.stats())
             
-            # Send JSON response
-            await websocket.send_json(result)
+            # Send the packed record or the JSON response
+            reply = protocol.encode(seq, result, (time.perf_counter() - received) * 1000.0)
+            if protocol.binary:
+                await websocket.send_bytes(reply)
+            else:
+                await websocket.send_json(reply)
+
+        # Surface the disconnect (or error) that stopped the receiver
+        await receiver
             
     except WebSocketDisconnect:
         print("Client disconnected")
@@ -66,3 +282,10 @@ async def websocket_endpoint(websocket: WebSocket):
             await websocket.close()
         except:
             pass
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        connections.pop(session.session_id, None)
+        streams.close(session.session_id)
+        worker.cancel(session.session_id)
+        sessions.release(session)  # Closes the recorder and logger, also of an evicted session
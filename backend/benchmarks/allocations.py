@@ -0,0 +1,79 @@
+"""
+Measure the memory the tracking pipeline allocates per frame.
+
+Run from the backend directory:
+    python -m benchmarks.allocations --frames 200 --size 320x240
+    python -m benchmarks.allocations --scale 0.5 --mode lut
+
+NumPy arrays (including OpenCV outputs) are allocated through Python's
+allocator, so tracemalloc sees them. For every frame the benchmark records the
+peak of newly allocated memory (transient buffers) and what is still held
+afterwards (retained), and reports the first frames against the steady state.
+"""
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+from main import HandTrackingSystem
+from modules.hand_tracking import HandTracker
+from modules.resolution import ResolutionController
+from modules.synthetic import SyntheticHandSource
+
+
+def measure(system, frames):
+    """
+    Process frames one by one under tracemalloc.
+    Returns:
+        tuple: (transient bytes, retained bytes) per frame.
+    """
+    transient = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for frame in frames:
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            system.process_frame_data(frame)
+            current, peak = tracemalloc.get_traced_memory()
+            transient.append(peak - start)
+            retained.append(current - start)
+    finally:
+        tracemalloc.stop()
+    return np.array(transient), np.array(retained)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="Frames counted as start-up rather than steady state")
+    parser.add_argument("--size", default="320x240", help="WIDTHxHEIGHT")
+    parser.add_argument("--hands", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1.0, help="Fixed processing scale")
+    parser.add_argument("--mode", default="threshold", help="Segmentation mode: threshold or lut")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    frames = list(SyntheticHandSource(width, height, count=args.frames, hands=args.hands))
+
+    system = HandTrackingSystem()
+    system.hand_tracker = HandTracker(args.mode)
+    system.resolution = ResolutionController(adaptive=False, max_scale=args.scale)
+    system.reset()
+
+    transient, retained = measure(system, frames)
+    arena = system.hand_tracker.arena
+    frame_kb = width * height * 3 / 1024.0
+    warmup = min(args.warmup, len(frames) - 1)
+
+    print(f"{len(frames)} frames {width}x{height}, scale {args.scale}, mode {args.mode} (one frame = {frame_kb:.0f} KB)")
+    print(f"first frame:  transient {transient[0] / 1024.0:8.1f} KB  retained {retained[0] / 1024.0:8.1f} KB")
+    print(f"warm-up mean: transient {transient[:warmup].mean() / 1024.0:8.1f} KB")
+    steady = transient[warmup:]
+    print(f"steady state: transient {steady.mean() / 1024.0:8.1f} KB mean, {np.percentile(steady, 95) / 1024.0:.1f} KB p95;"
+          f" retained {retained[warmup:].mean() / 1024.0:.2f} KB/frame")
+    print(f"arena: {arena.nbytes() / 1024.0:.0f} KB in {len(arena.blocks)} buffers, {arena.allocations} block allocations"
+          f" (OpenCV {cv2.__version__})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare the vectorized smoothing/state banks with the per-session classes.
+
+Run from the backend directory:
+    python -m benchmarks.batch_state --sessions 1 16 256 1024 --ticks 200
+
+Every session gets a random walk of boundary points (with dropouts and sudden
+jumps), and the smoothed point's distance to the circle is turned into a state.
+Each tick, the per-session path calls PointSmoother.smooth and
+DistanceLogic.determine_state once per session; the banked path advances all
+sessions in one SmoothingBank and one StateBank step.
+The outputs are checked to be identical and the time per tick is reported.
+"""
+import argparse
+import time
+import numpy as np
+from config.config import SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA
+from modules.batch_state import SmoothingBank, StateBank, BankedSmoother
+from modules.distance_logic import DistanceLogic, STATES
+from modules.geometry import frame_geometry
+from modules.smoothing_utils import PointSmoother
+
+
+def make_walks(sessions, ticks, width, height, seed):
+    """
+    Random boundary point tracks: (ticks, sessions, 2) ints and a (ticks, sessions) presence mask.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, width * 0.02, (ticks, sessions, 2))
+    jumps = rng.random((ticks, sessions)) < 0.03
+    steps[jumps] += rng.normal(0, width * 0.5, (np.count_nonzero(jumps), 2))
+    start = rng.uniform((0, 0), (width, height), (sessions, 2))
+    points = np.rint(np.abs(np.cumsum(steps, axis=0) + start) % (width, height)).astype(np.int64)
+    present = rng.random((ticks, sessions)) > 0.05
+    return points, present
+
+
+def run_objects(points, present, geometry):
+    """
+    Per-session classes. Returns smoothed points, states and the time per tick.
+    """
+    ticks, sessions = present.shape
+    smoothers = [PointSmoother(SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, geometry.max_displacement) for _ in range(sessions)]
+    logics = [DistanceLogic(geometry) for _ in range(sessions)]
+    center = np.array(geometry.center)
+    smoothed = np.full((ticks, sessions, 2), -1, dtype=np.int64)
+    states = np.zeros((ticks, sessions), dtype=np.int64)
+    start = time.perf_counter()
+    for t in range(ticks):
+        for s in range(sessions):
+            if not present[t, s]:
+                smoothers[s].smooth(None)
+                continue
+            point = smoothers[s].smooth(tuple(points[t, s]))
+            smoothed[t, s] = point
+            dx, dy = point[0] - center[0], point[1] - center[1]
+            distance = np.sqrt(float(dx * dx + dy * dy))
+            states[t, s] = STATES.index(logics[s].determine_state(distance))
+    return smoothed, states, (time.perf_counter() - start) / ticks
+
+
+def run_banked(points, present, geometry):
+    """
+    One SmoothingBank and one StateBank step per tick.
+    """
+    ticks, sessions = present.shape
+    bank = SmoothingBank(sessions)
+    smoothers = [BankedSmoother(bank, geometry.max_displacement) for _ in range(sessions)]
+    rows = np.array([smoother.row for smoother in smoothers])
+    state_bank = StateBank(sessions)
+    state_rows = state_bank.allocate(sessions)
+    center = np.array(geometry.center)
+    smoothed = np.full((ticks, sessions, 2), -1, dtype=np.int64)
+    states = np.zeros((ticks, sessions), dtype=np.int64)
+    start = time.perf_counter()
+    for t in range(ticks):
+        active = present[t]
+        bank.reset(rows[~active])
+        result = bank.step(rows[active], points[t, active])
+        smoothed[t, active] = result
+        offset = result - center
+        distance = np.sqrt(offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1])
+        states[t, active] = state_bank.step(state_rows[active], distance, geometry.radius,
+                                            geometry.warning_band, geometry.hysteresis)
+    return smoothed, states, (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 16, 256, 1024])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--size", default="320x240", help="Frame size, WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    geometry = frame_geometry(width, height)
+    for sessions in args.sessions:
+        points, present = make_walks(sessions, args.ticks, width, height, args.seed)
+        expected_points, expected_states, object_time = run_objects(points, present, geometry)
+        banked_points, banked_states, banked_time = run_banked(points, present, geometry)
+        same = np.array_equal(expected_points, banked_points) and np.array_equal(expected_states, banked_states)
+        print(f"{sessions:5d} sessions: per-session {object_time * 1000:8.3f} ms/tick,"
+              f" banked {banked_time * 1000:7.3f} ms/tick ({object_time / banked_time:5.1f}x),"
+              f" results {'identical' if same else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
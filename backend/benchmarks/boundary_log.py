@@ -0,0 +1,104 @@
+"""
+Time the per-frame cost of boundary logging.
+
+Run from the backend directory:
+    python -m benchmarks.boundary_log --sessions 1 32 --frames 2000
+
+Every session appends one record per frame, either with BoundaryLogger (ring
+buffer, flushed in the background to memory-mapped columns) or with a CSV
+row written and flushed per frame, as a direct per-frame writer would. The
+time spent in the caller per record is reported, along with dropped records.
+--check also confirms that a logger attached to a session evicted by the
+SessionManager is flushed and closed with the session.
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from main import HandTrackingSystem
+from modules.boundary_log import BoundaryLogger, FIELDS, META_FILE, read_log, shared_flusher
+from modules.session_manager import SessionManager
+
+
+def make_records(frames, seed):
+    rng = np.random.default_rng(seed)
+    points = rng.integers(0, 320, (frames, 2))
+    states = rng.choice(["SAFE", "WARNING", "DANGER"], frames)
+    return [((int(x), int(y)), (int(x), int(y)), state, state) for (x, y), state in zip(points, states)]
+
+
+def run_logger(directory, sessions, records):
+    loggers = [BoundaryLogger(os.path.join(directory, f"log_{s}")) for s in range(sessions)]
+    start = time.perf_counter()
+    for record in records:
+        for logger in loggers:
+            logger.log(*record)
+    elapsed = time.perf_counter() - start
+    for logger in loggers:
+        logger.close()
+    dropped = sum(logger.dropped for logger in loggers)
+    assert all(len(read_log(logger.path)) + logger.dropped == len(records) for logger in loggers)
+    return elapsed / (len(records) * sessions), dropped
+
+
+def check_eviction(directory, records):
+    """
+    Log records through a session's pipeline, evict the session as idle and
+    check that the log on disk is complete and final.
+    Returns:
+        bool: Whether every record logged (and not dropped) was flushed.
+    """
+    manager = SessionManager(HandTrackingSystem, pool_size=0, idle_timeout=0.0)
+    session = manager.acquire()
+    logger = session.system.logger = BoundaryLogger(os.path.join(directory, "evicted"))
+    for record in records:
+        logger.log(*record)
+    if manager.evict_idle(now=time.monotonic() + 1.0) != [session]:
+        return False
+    with open(os.path.join(logger.path, META_FILE)) as f:
+        meta = json.load(f)
+    return (logger.closed and logger not in shared_flusher().loggers
+            and meta["count"] + meta["dropped"] == len(records) == len(read_log(logger.path)) + logger.dropped)
+
+
+def run_csv(directory, sessions, records):
+    files = [open(os.path.join(directory, f"log_{s}.csv"), "w", newline="") for s in range(sessions)]
+    writers = [csv.writer(f) for f in files]
+    for writer in writers:
+        writer.writerow(FIELDS)
+    start = time.perf_counter()
+    for index, (raw, smoothed, state_raw, state) in enumerate(records):
+        for f, writer in zip(files, writers):
+            writer.writerow([index, raw[0], raw[1], float(smoothed[0]), float(smoothed[1]), state_raw, state, time.time()])
+            f.flush()
+    elapsed = time.perf_counter() - start
+    for f in files:
+        f.close()
+    return elapsed / (len(records) * sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="Check that an evicted session's log is flushed")
+    args = parser.parse_args()
+
+    records = make_records(args.frames, args.seed)
+    if args.check:
+        with tempfile.TemporaryDirectory() as directory:
+            print(f"Evicted session's log: {'flushed and closed' if check_eviction(directory, records) else 'INCOMPLETE'}")
+    for sessions in args.sessions:
+        with tempfile.TemporaryDirectory() as directory:
+            logger_time, dropped = run_logger(directory, sessions, records)
+            csv_time = run_csv(directory, sessions, records)
+        print(f"{sessions:4d} sessions: BoundaryLogger {logger_time * 1e6:6.2f} us/record ({dropped} dropped),"
+              f" per-frame CSV {csv_time * 1e6:6.2f} us/record ({csv_time / logger_time:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare optical-flow tracking against full detection on every frame.
+
+Run from the backend directory:
+    python -m benchmarks.flow --synthetic 300 --interval 5
+    python -m benchmarks.flow --store recordings/<session_id> --scale 0.5
+
+Both trackers see the same frames. Speed is measured per tracker; accuracy is
+measured on every frame the flow tracker propagated, against what a full
+detection finds in that frame: boundary point distance, state agreement and
+the overlap (IoU) of the hand outlines.
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from main import HandTrackingSystem
+from modules.hand_tracking import HandTracker
+from modules.flow_tracker import FlowTracker
+from modules.frame_store import FrameStore
+from modules.resolution import ResolutionController
+from modules.synthetic import SyntheticHandSource
+
+
+def make_system(tracker, scale):
+    """
+    HandTrackingSystem with the given tracker at a fixed processing scale.
+    """
+    system = HandTrackingSystem()
+    system.hand_tracker = tracker
+    system.resolution = ResolutionController(adaptive=False, max_scale=scale)
+    system.reset()
+    return system
+
+
+def outline_iou(a, b, shape):
+    """
+    Intersection over union of two filled contours.
+    """
+    mask_a = np.zeros(shape, dtype=np.uint8)
+    mask_b = np.zeros(shape, dtype=np.uint8)
+    cv2.drawContours(mask_a, [a], -1, 1, thickness=-1)
+    cv2.drawContours(mask_b, [b], -1, 1, thickness=-1)
+    union = np.count_nonzero(mask_a | mask_b)
+    return np.count_nonzero(mask_a & mask_b) / union if union else 1.0
+
+
+def timed_run(system, frames):
+    """
+    Process all frames and return the results and the elapsed time.
+    """
+    start = time.perf_counter()
+    results = [system.process_frame_data(frame) for frame in frames]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--store", help="Frame store directory recorded with FrameRecorder")
+    source.add_argument("--synthetic", type=int, default=300, help="Number of synthetic frames")
+    parser.add_argument("--size", default="320x240", help="Synthetic frame size, WIDTHxHEIGHT")
+    parser.add_argument("--hands", type=int, default=1)
+    parser.add_argument("--interval", type=int, default=None, help="Frames per full detection (default from config)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Fixed processing scale")
+    parser.add_argument("--mode", default="threshold", help="Segmentation mode: threshold or lut")
+    args = parser.parse_args()
+
+    if args.store:
+        frames = [np.array(frame) for frame in FrameStore(args.store)]
+    else:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        frames = list(SyntheticHandSource(width, height, count=args.synthetic, hands=args.hands))
+    if not frames:
+        parser.error("No frames to compare.")
+
+    flow_tracker = FlowTracker(args.mode) if args.interval is None else FlowTracker(args.mode, detect_interval=args.interval)
+    # Speed: each tracker on its own, motion gate off so every frame is tracked
+    for tracker in (flow_tracker,):
+        tracker.motion_gate = False
+    detect = make_system(HandTracker(args.mode), args.scale)
+    detect.hand_tracker.motion_gate = False
+    flow = make_system(flow_tracker, args.scale)
+    for system in (detect, flow):
+        timed_run(system, frames[:10])
+        system.reset()
+    detect_results, detect_time = timed_run(detect, frames)
+    flow_tracker.detections = flow_tracker.propagated = flow_tracker.rejected = 0
+    flow.reset()
+
+    # Accuracy: step both side by side and compare on propagated frames
+    detect.reset()
+    point_errors, ious = [], []
+    agree = compared = 0
+    flow_time = 0.0
+    for frame in frames:
+        before = flow_tracker.propagated
+        start = time.perf_counter()
+        flow_result = flow.process_frame_data(frame)
+        flow_time += time.perf_counter() - start
+        contour = flow_tracker.last_result[0]
+        detect_result = detect.process_frame_data(frame)
+        if flow_tracker.propagated == before:
+            continue
+        compared += 1
+        agree += flow_result["state"] == detect_result["state"]
+        reference = detect.hand_tracker.last_result[0]
+        if flow_result["point"] is not None and detect_result["point"] is not None:
+            point_errors.append(np.hypot(flow_result["point"][0] - detect_result["point"][0],
+                                         flow_result["point"][1] - detect_result["point"][1]))
+        if contour is not None and reference is not None:
+            ious.append(outline_iou(contour, reference, frame.shape[:2]))
+
+    stats = flow_tracker.stats()
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames {width}x{height}, scale {args.scale}, mode {args.mode},"
+          f" detect interval {flow_tracker.detect_interval}")
+    print(f"full detection: {len(frames) / detect_time:8.1f} fps ({detect_time / len(frames) * 1000:.3f} ms/frame)")
+    print(f"optical flow:   {len(frames) / flow_time:8.1f} fps ({flow_time / len(frames) * 1000:.3f} ms/frame),"
+          f" {stats['propagated_rate']:.1%} propagated, {stats['rejected']} rejected")
+    if compared:
+        errors = np.array(point_errors) if point_errors else np.zeros(1)
+        print(f"vs full detection on {compared} propagated frames: state agreement {agree / compared:.1%},"
+              f" point error mean {errors.mean():.2f} px, p95 {np.percentile(errors, 95):.2f} px, max {errors.max():.2f} px,"
+              f" outline IoU mean {np.mean(ious) if ious else 0:.3f}, min {np.min(ious) if ious else 0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
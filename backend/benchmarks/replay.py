@@ -0,0 +1,240 @@
+"""
+Replay recorded or synthetic frames through the pipeline headlessly and report
+throughput, latency percentiles and time per stage.
+
+Run from the backend directory:
+    python -m benchmarks.replay --synthetic 300 --output run.json
+    python -m benchmarks.replay --store recordings/<session_id> --jpeg 50
+    python -m benchmarks.replay --synthetic 300 --baseline run.json
+    python -m benchmarks.replay --synthetic 50 --hold 6   # mostly static scene
+    python -m benchmarks.replay --size 640x480 --raw i420 --full-decode
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from main import HandTrackingSystem
+from modules.frame_ingest import ENCODED, RAW_FORMATS, decode_scaled, encode_raw
+from modules.frame_store import FrameStore
+from modules.synthetic import SyntheticHandSource
+from modules.profiler import StageProfiler
+from modules.resolution import ResolutionController
+
+
+class StageTimer:
+    def __init__(self):
+        """
+        Collect durations (seconds) per named stage.
+        """
+        self.samples = {}
+
+    def wrap(self, name, func):
+        """
+        Return func wrapped so every call is timed under `name`.
+        """
+        samples = self.samples.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+
+def percentiles_ms(samples):
+    """
+    Mean and p50/p95/p99 of a list of durations, in milliseconds.
+    """
+    if not samples:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def load_frames(args):
+    """
+    Materialize the input frames so source I/O is not part of the measurement.
+    Returns:
+        tuple: (frames, description)
+    """
+    if args.store:
+        store = FrameStore(args.store)
+        frames = [np.array(frame) for frame in store]
+        return frames, {"source": "store", "path": os.path.abspath(args.store), "frames": len(frames)}
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    source = SyntheticHandSource(width, height, count=args.synthetic, hands=args.hands, seed=args.seed)
+    frames = [frame for frame in source for _ in range(args.hold)]
+    return frames, {"source": "synthetic", "size": [width, height], "hands": args.hands,
+                    "seed": args.seed, "frames": len(frames), "hold": args.hold}
+
+
+def run(frames, jpeg_quality=None, raw_format=None, decode_at_scale=True, scale=None, warmup=10, profile=False):
+    """
+    Push frames through HandTrackingSystem.process_frame_data and time it.
+    Args:
+        frames (list): BGR frames.
+        jpeg_quality (int): If set, frames are JPEG-encoded up front and the
+            decode is timed as its own stage, like the WebSocket path.
+        raw_format (str): If set (and no jpeg_quality), frames are packed in this
+            raw ingest format up front and unpacked in the timed decode stage.
+        decode_at_scale (bool): Let the decode stage reduce frames to the processing scale.
+        scale (float): Fixed processing scale; None lets the resolution controller choose.
+        warmup (int): Frames processed before measuring.
+        profile (bool): Also collect the tracker's fine-grained stage timings
+            (reported under "profile"; adds a little overhead).
+    Returns:
+        dict: Throughput, latency percentiles and per-stage timings.
+    """
+    system = HandTrackingSystem()
+    system.decode_at_scale = decode_at_scale
+    if scale is not None:
+        system.resolution = ResolutionController(adaptive=False, max_scale=scale)
+        system.reset()
+    timer = StageTimer()
+    system.hand_tracker.detect_hand = timer.wrap("detect_hand", system.hand_tracker.detect_hand)
+    system.build_result = timer.wrap("state", system.build_result)
+
+    fmt = None
+    if jpeg_quality is not None:
+        fmt = ENCODED
+        params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        inputs = [cv2.imencode(".jpg", frame, params)[1].tobytes() for frame in frames]
+    elif raw_format is not None:
+        fmt = raw_format
+        inputs = [encode_raw(frame, raw_format) for frame in frames]
+    else:
+        inputs = frames
+    decode = timer.wrap("decode", decode_scaled) if fmt is not None else None
+
+    def process(item):
+        if fmt is None:
+            return system.process_frame_data(item)
+        return system.process_frame_data(*decode(item, fmt, system.decode_scale()))
+
+    for item in inputs[:warmup]:
+        process(item)
+    system.reset()
+    for samples in timer.samples.values():
+        samples.clear()
+    StageProfiler.set_enabled(profile)
+    # Keep every sample for the final report
+    system.hand_tracker.profiler.window = len(inputs)
+
+    latencies = []
+    detections = 0
+    gated = 0
+    start = time.perf_counter()
+    for item in inputs:
+        frame_start = time.perf_counter()
+        result = process(item)
+        latencies.append(time.perf_counter() - frame_start)
+        detections += result["point"] is not None
+        gated += system.hand_tracker.gated
+    elapsed = time.perf_counter() - start
+    StageProfiler.set_enabled(False)
+
+    result = {
+        "frames": len(inputs),
+        "fps": len(inputs) / elapsed if elapsed > 0 else 0.0,
+        "detection_rate": detections / len(inputs) if inputs else 0.0,
+        "gated_rate": gated / len(inputs) if inputs else 0.0,
+        "latency_ms": percentiles_ms(latencies),
+        "stages_ms": {name: percentiles_ms(samples) for name, samples in timer.samples.items()},
+        "resolution": system.resolution.stats(),
+    }
+    if profile:
+        result["profile"] = system.hand_tracker.profiler.snapshot()
+    return result
+
+
+def compare(result, baseline, max_regression):
+    """
+    Print the change against a baseline run.
+    Returns:
+        bool: True if throughput or p95 latency regressed beyond max_regression.
+    """
+    fps_change = result["fps"] / baseline["fps"] - 1.0 if baseline["fps"] else 0.0
+    p95_change = result["latency_ms"]["p95"] / baseline["latency_ms"]["p95"] - 1.0 if baseline["latency_ms"]["p95"] else 0.0
+    print(f"vs baseline: fps {fps_change:+.1%}, p95 latency {p95_change:+.1%}")
+    for name, stats in result["stages_ms"].items():
+        before = baseline.get("stages_ms", {}).get(name)
+        if before and before["mean"]:
+            print(f"  {name:<20} mean {stats['mean'] / before['mean'] - 1.0:+.1%}")
+    return fps_change < -max_regression or p95_change > max_regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--store", help="Frame store directory recorded with FrameRecorder")
+    source.add_argument("--synthetic", type=int, default=300, help="Number of synthetic frames")
+    parser.add_argument("--size", default="320x240", help="Synthetic frame size, WIDTHxHEIGHT")
+    parser.add_argument("--hands", type=int, default=1, help="Synthetic hands per frame")
+    parser.add_argument("--hold", type=int, default=1, help="Repeat each synthetic frame this often (static scenes)")
+    parser.add_argument("--seed", type=int, default=0)
+    ingest = parser.add_mutually_exclusive_group()
+    ingest.add_argument("--jpeg", type=int, metavar="QUALITY", help="Include JPEG decode at this quality")
+    ingest.add_argument("--raw", choices=RAW_FORMATS, help="Include unpacking frames sent in this raw format")
+    parser.add_argument("--full-decode", action="store_true", help="Always decode frames at full size")
+    parser.add_argument("--scale", type=float, help="Fixed processing scale instead of the adaptive one")
+    parser.add_argument("--profile", action="store_true", help="Report the tracker's fine-grained stages")
+    parser.add_argument("--threads", type=int, default=0, help="OpenCV threads (0 keeps the default)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Fail if fps drops or p95 latency grows by more than this fraction")
+    args = parser.parse_args()
+
+    if args.threads:
+        cv2.setNumThreads(args.threads)
+    frames, description = load_frames(args)
+    if not frames:
+        parser.error("No frames to replay.")
+
+    result = run(frames, jpeg_quality=args.jpeg, raw_format=args.raw, decode_at_scale=not args.full_decode,
+                 scale=args.scale, profile=args.profile)
+    result["input"] = description
+    result["jpeg_quality"] = args.jpeg
+    result["raw_format"] = args.raw
+    result["decode_at_scale"] = not args.full_decode
+    result["environment"] = {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+    result["timestamp"] = time.time()
+
+    latency = result["latency_ms"]
+    print(f"{result['frames']} frames, {result['fps']:.1f} fps, detection rate {result['detection_rate']:.1%},"
+          f" motion-gated {result['gated_rate']:.1%}")
+    print(f"latency ms: p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  p99 {latency['p99']:.3f}")
+    for name, stats in result["stages_ms"].items():
+        print(f"  {name:<20} mean {stats['mean']:.3f} ms  p95 {stats['p95']:.3f} ms")
+    for name, stats in result.get("profile", {}).get("stages", {}).items():
+        print(f"    {name:<18} mean {stats['mean']:.3f} ms  p95 {stats['p95']:.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.max_regression):
+            print("Regression beyond threshold.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
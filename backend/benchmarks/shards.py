@@ -0,0 +1,65 @@
+"""
+Compare frame throughput of the thread, process and shard executors.
+
+Run from the backend directory:
+    python -m benchmarks.shards --sessions 8 --frames 200 --workers 4
+
+Every session sends synthetic JPEG frames one after another, as a WebSocket
+client waiting for each reply would, and all sessions run at once. Reported
+are the total frame rate and the mean latency per frame; in shard mode also
+the per-worker load.
+"""
+import argparse
+import asyncio
+import time
+import cv2
+from main import HandTrackingSystem
+from modules.frame_worker import FrameWorker
+from modules.session_manager import SessionManager
+from modules.startup import warmup_frames
+from modules.synthetic import SyntheticHandSource
+
+
+async def run_mode(mode, workers, sessions, frames):
+    worker = FrameWorker(HandTrackingSystem, mode=mode, workers=workers)
+    manager = SessionManager(HandTrackingSystem, pool_size=0)
+    clients = [manager.acquire() for _ in range(sessions)]
+    try:
+        await worker.warm_up(((320, 240),), warmup_frames(((320, 240),)))
+        latencies = []
+
+        async def client(session):
+            for data in frames:
+                start = time.perf_counter()
+                await worker.submit(session, data)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for session in clients))
+        elapsed = time.perf_counter() - start
+        return len(latencies) / elapsed, sum(latencies) * 1000.0 / len(latencies), worker.stats()
+    finally:
+        worker.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["thread", "process", "shard"])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--frames", type=int, default=200, help="Frames per session")
+    parser.add_argument("--workers", type=int, default=0, help="0 uses one per CPU core")
+    parser.add_argument("--size", default="320x240")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    frames = [cv2.imencode(".jpg", frame)[1].tobytes() for frame in SyntheticHandSource(width, height, count=args.frames)]
+    for mode in args.modes:
+        fps, latency, stats = asyncio.run(run_mode(mode, args.workers, args.sessions, frames))
+        print(f"{mode:8s} {stats['workers']} workers: {fps:7.1f} fps, {latency:6.2f} ms per frame")
+        for shard in stats.get("shards", ()):
+            print(f"    shard {shard['shard']}: {shard['sessions']} sessions, {shard['frames']} frames,"
+                  f" {shard['mean_ms']:.2f} ms per frame, {shard['restarts']} restarts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare the threshold and lookup-table skin segmentation engines.
+
+Run from the backend directory:
+    python -m benchmarks.skin_lut --frames 200 --size 320x240
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from config.config import HSV_LOWER, HSV_UPPER, YCRCB_LOWER, YCRCB_UPPER, MORPH_KERNEL
+from modules.skin_lut import SkinLUT, threshold_skin_mask
+
+
+def make_frames(count, width, height, noise=8.0, seed=0):
+    """
+    Camera-like test frames: a smooth colored background with sensor noise and
+    a few skin-toned ellipses.
+    """
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    frames = []
+    for _ in range(count):
+        base = rng.uniform(30, 220, 3)
+        slope = rng.uniform(-60, 60, (2, 3))
+        frame = base + xs[..., None] / width * slope[0] + ys[..., None] / height * slope[1]
+        frame += rng.normal(0, noise, frame.shape)
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        for _ in range(3):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            axes = (int(rng.integers(width // 10, width // 3)), int(rng.integers(height // 10, height // 3)))
+            color = tuple(int(c) for c in rng.integers((60, 100, 150), (140, 170, 240)))
+            cv2.ellipse(frame, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1)
+        frames.append(cv2.GaussianBlur(frame, (7, 7), 0))
+    return frames
+
+
+def clean(mask, kernel):
+    """
+    The tracker's morphological cleanup, applied before contours are searched.
+    """
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=2)
+
+
+def time_per_frame(segment, frames, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            segment(frame)
+    return (time.perf_counter() - start) / (repeats * len(frames)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--size", default="320x240", help="WIDTHxHEIGHT")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=8.0, help="Sensor noise sigma of the test frames")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads (0 keeps the default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        cv2.setNumThreads(args.threads)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    frames = make_frames(args.frames, width, height, noise=args.noise)
+    thresholds = tuple(np.array(v, dtype=np.uint8) for v in (HSV_LOWER, HSV_UPPER, YCRCB_LOWER, YCRCB_UPPER))
+
+    start = time.perf_counter()
+    lut = SkinLUT(exact=True)
+    print(f"LUT ready in {(time.perf_counter() - start) * 1000.0:.1f} ms ({lut.table.size} cells, key {lut.cache_key()})")
+    approx = SkinLUT(exact=False)
+
+    reference = [threshold_skin_mask(frame, *thresholds) for frame in frames]
+    exact_match = np.mean([np.mean(lut.apply(f) == m) for f, m in zip(frames, reference)])
+    approx_match = np.mean([np.mean(approx.apply(f) == m) for f, m in zip(frames, reference)])
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, MORPH_KERNEL)
+    cleaned_match = np.mean([np.mean(clean(approx.apply(f), kernel) == clean(m, kernel))
+                             for f, m in zip(frames, reference)])
+
+    threshold_ms = time_per_frame(lambda f: threshold_skin_mask(f, *thresholds), frames, args.repeats)
+    lut_ms = time_per_frame(lut.apply, frames, args.repeats)
+    approx_ms = time_per_frame(approx.apply, frames, args.repeats)
+
+    print(f"threshold:   {threshold_ms:.3f} ms/frame")
+    print(f"lut (exact): {lut_ms:.3f} ms/frame  speedup {threshold_ms / lut_ms:.2f}x  match {exact_match * 100:.3f}%")
+    print(f"lut (major): {approx_ms:.3f} ms/frame  speedup {threshold_ms / approx_ms:.2f}x  match {approx_match * 100:.3f}%"
+          f" ({cleaned_match * 100:.3f}% after cleanup)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Sweep smoothing and state-logic parameters over recorded boundary logs.
+
+Run from the backend directory:
+    python -m benchmarks.sweep                        # logs/*.csv, default grid
+    python -m benchmarks.sweep LOG_DIR other.csv --window 3 5 --alpha 0.3 0.6 --debounce 1 3 5
+    python -m benchmarks.sweep --kalman-q 0.01 0.1 --kalman-r 1 4 --sort time_to_danger_ms --out sweep.csv
+
+The raw boundary points of every log (CSV in the logs/boundary_log_*.csv schema,
+or a BoundaryLogger directory) are replayed through the median/EMA smoother and
+the legacy KalmanPoint filter, and the smoothed points through the hysteresis
+and debounce logic, for every combination in the grid. Work is split into one
+task per log and (window, alpha, debounce) or (debounce) for the Kalman filter,
+run in a process pool. Inside a task all jump limits share one SmoothingBank
+and all jump limits and hysteresis values one StateBank, so every frame is a
+single vectorized step for the whole slice of the grid (the banks give the
+same results as PointSmoother and DistanceLogic; --check verifies this).
+
+Logs may hold a point only every few frames (the rows in between are blank).
+Blank runs of up to --max-gap rows are unsampled frames: the filters carry
+across them and the states hold. Longer runs, and blank rows before the first
+or after the last point, are a loss of tracking: the filters restart, as
+PointSmoother.smooth(None) does, and the state is SAFE.
+
+Reported per configuration, over all logs:
+    jitter        mean frame-to-frame movement of the smoothed point (px)
+    error         mean distance between the smoothed and the raw point (px)
+    lag           shift (frames) of the raw track that best matches the smoothed one
+    flips         changes of the debounced state per 100 frames with a point
+    time to DANGER  frames (and ms) from the raw point entering a hazard zone to
+                  the debounced state reporting DANGER; entries it never
+                  reports are counted as missed
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+from config.config import (FRAME_WIDTH, FRAME_HEIGHT, SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MAX_DISPLACEMENT,
+                           DEBOUNCE_FRAMES, STATE_HYSTERESIS)
+from modules.batch_state import SmoothingBank, StateBank, SAFE, DANGER
+from modules.boundary_log import read_log, load_csv, instant_state
+from modules.distance_logic import DistanceLogic, STATES
+from modules.geometry import frame_geometry
+from modules.hazard_zones import hazard_field
+from modules.smoothing_utils import PointSmoother
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(ROOT, "legacy"))
+from smoothing_utils import KalmanPoint  # noqa: E402  (legacy/smoothing_utils.py)
+
+METRICS = ("jitter", "error", "lag", "flips", "time_to_danger", "time_to_danger_ms", "missed")
+
+
+def load_trajectory(path, max_gap=None):
+    """
+    Raw points of a boundary log.
+    Args:
+        path (str): CSV log or BoundaryLogger directory.
+        max_gap (int): Longest run of blank rows taken as unsampled frames rather than
+            a loss of tracking; defaults to twice the usual spacing of the points.
+    Returns:
+        dict: name, raw (T, 2) float points (NaN without a point), present (T,) bool,
+            lost (T,) bool (blank rows where tracking was lost), segment (T,) int
+            (count of losses so far), stride (usual frames between points) and
+            interval_ms (median time between frames).
+    """
+    log = read_log(path) if os.path.isdir(path) else load_csv(path)
+    raw = log.points("raw")
+    timestamps = np.asarray(log["timestamp"], dtype=np.float64)
+    interval = float(np.median(np.diff(timestamps))) * 1000.0 if len(timestamps) > 1 else 0.0
+    present = ~np.isnan(raw[:, 0])
+    indices = np.flatnonzero(present)
+    stride = int(np.median(np.diff(indices))) if len(indices) > 1 else 1
+    if max_gap is None:
+        max_gap = 2 * stride
+
+    # Blank rows before the first point, after the last one and in runs longer than max_gap are lost
+    lost = ~present
+    if len(indices):
+        lost[indices[0]:indices[-1]] = False
+        for start, end in zip(indices[:-1], indices[1:]):
+            if end - start - 1 > max_gap:
+                lost[start + 1:end] = True
+    segment = np.cumsum(lost & ~np.concatenate(([False], lost[:-1])))
+    return {"name": os.path.basename(path.rstrip(os.sep)), "raw": raw, "present": present, "lost": lost,
+            "segment": segment, "stride": stride, "interval_ms": interval}
+
+
+def hold(values, present, lost, fill):
+    """
+    Carry each frame's value across the unsampled frames after it; `fill` on lost frames.
+    Args:
+        values (numpy.ndarray): (T, ...) values, meaningful where present.
+    """
+    carried = np.maximum.accumulate(np.where(present, np.arange(len(values)), 0))
+    held = values[carried]
+    held[lost | (np.cumsum(present) == 0)] = fill
+    return held
+
+
+def replay_bank(trajectory, window, alpha, displacements):
+    """
+    Median/EMA smoothing of one trajectory for several jump limits at once.
+    Returns:
+        numpy.ndarray: (T, len(displacements), 2) smoothed points (NaN without a point).
+    """
+    raw, present, lost = trajectory["raw"], trajectory["present"], trajectory["lost"]
+    count = len(displacements)
+    bank = SmoothingBank(count, window, alpha)
+    rows = np.array([bank.allocate(displacement) for displacement in displacements])
+    smoothed = np.full((len(raw), count, 2), np.nan)
+    for t in range(len(raw)):
+        if present[t]:
+            smoothed[t] = bank.step(rows, np.repeat(raw[t][None], count, axis=0))
+        elif lost[t] and (t == 0 or not lost[t - 1]):
+            bank.reset(rows)  # As PointSmoother.smooth(None)
+    return smoothed
+
+
+def replay_kalman(trajectory, noises):
+    """
+    KalmanPoint filtering of one trajectory for several (process, measurement) noise levels.
+    The filter restarts at the first point after every loss of tracking.
+    Returns:
+        numpy.ndarray: (T, len(noises), 2) filtered points (NaN without a point).
+    """
+    raw, present, lost = trajectory["raw"], trajectory["present"], trajectory["lost"]
+    smoothed = np.full((len(raw), len(noises), 2), np.nan)
+    for k, (process_noise, measurement_noise) in enumerate(noises):
+        kalman = None
+        for t in range(len(raw)):
+            if not present[t]:
+                if lost[t]:
+                    kalman = None
+                continue
+            if kalman is None:
+                kalman = KalmanPoint()
+                kalman.process_noise = np.eye(4) * process_noise
+                kalman.measurement_noise = np.eye(2) * measurement_noise
+                kalman.state[:2] = raw[t]
+            smoothed[t, k] = kalman.update(raw[t])
+    return smoothed
+
+
+def replay_states(smoothed, present, lost, debounce, hysteresis_values, geometry):
+    """
+    Debounced state of the smoothed tracks for several hysteresis values at once.
+    The state holds across unsampled frames; as in the pipeline, frames where
+    tracking is lost are SAFE and leave the history alone.
+    Args:
+        smoothed (numpy.ndarray): (T, S, 2) smoothed points.
+        present (numpy.ndarray): (T,) frames with a point.
+        lost (numpy.ndarray): (T,) frames where tracking is lost.
+        debounce (int): Debounce history length.
+        hysteresis_values (list): Hysteresis in pixels.
+        geometry (FrameGeometry): Geometry giving the warning band.
+    Returns:
+        numpy.ndarray: (T, S, H) state codes, most severe over the hazard zones.
+    """
+    field = hazard_field(geometry.width, geometry.height)
+    steps, tracks = smoothed.shape[:2]
+    hysteresis_count, zones = len(hysteresis_values), len(field.names)
+    bank = StateBank(tracks * hysteresis_count * zones, debounce)
+    rows = bank.allocate(tracks * hysteresis_count * zones)  # Row order: track, hysteresis, zone
+    hysteresis = np.tile(np.repeat(np.asarray(hysteresis_values, dtype=np.float64), zones), tracks)
+    states = np.zeros((steps, tracks, hysteresis_count), dtype=np.int8)
+    for t in np.flatnonzero(present):
+        distances = field.lookup(np.rint(smoothed[t]).astype(np.int64))  # (S, Z)
+        distances = np.repeat(distances[:, None, :], hysteresis_count, axis=1).ravel()
+        codes = bank.step(rows, distances, 0.0, geometry.warning_band, hysteresis)
+        states[t] = codes.reshape(tracks, hysteresis_count, zones).max(axis=2)
+    return hold(states, present, lost, SAFE)
+
+
+def raw_states(trajectory, geometry):
+    """
+    Single-frame state of the raw points (see instant_state), as codes, held across
+    unsampled frames; -1 where tracking is lost.
+    """
+    field = hazard_field(geometry.width, geometry.height)
+    codes = np.full(len(trajectory["raw"]), -1, dtype=np.int8)
+    present = trajectory["present"]
+    if present.any():
+        distances = field.lookup(trajectory["raw"][present].astype(np.int64)).min(axis=1)
+        codes[present] = [STATES.index(instant_state(d, geometry.warning_band)) for d in distances.tolist()]
+    return hold(codes, present, trajectory["lost"], -1)
+
+
+def track_metrics(trajectory, smoothed, max_lag):
+    """
+    Sums for jitter, error and lag of each smoothed track (vectorized over tracks).
+    Movement and lag are measured between the points of the log, within stretches
+    of tracking, and scaled to frames by the log's stride.
+    Returns:
+        dict: (S,) arrays.
+    """
+    present, stride = trajectory["present"], trajectory["stride"]
+    raw, smoothed, segment = trajectory["raw"][present], smoothed[present], trajectory["segment"][present]
+    tracks, points = smoothed.shape[1], len(raw)
+    steady = segment[1:] == segment[:-1]
+    movement = np.linalg.norm(smoothed[1:][steady] - smoothed[:-1][steady], axis=-1) / stride
+    error = np.linalg.norm(smoothed - raw[:, None], axis=-1)
+
+    # Lag: the shift k (in points) for which smoothed[i] is closest to raw[i - k]
+    lag_error = np.full((max_lag + 1, tracks), np.inf)
+    for k in range(min(max_lag, points - 1) + 1):
+        both = segment[k:] == segment[:points - k]
+        if both.any():
+            lag_error[k] = np.linalg.norm(smoothed[k:][both] - raw[:points - k][both][:, None], axis=-1).mean(axis=0)
+    return {
+        "frames": np.full(tracks, points),
+        "jitter_sum": movement.sum(axis=0),
+        "jitter_count": np.full(tracks, len(movement)),
+        "error_sum": error.sum(axis=0),
+        "lag_sum": lag_error.argmin(axis=0) * stride * points if points else np.zeros(tracks),
+    }
+
+
+def state_metrics(states, present, raw_codes, interval_ms):
+    """
+    Sums for state flips and time to DANGER of each (track, hysteresis) pair.
+    Flips are counted between consecutive points of the log only, so they share
+    the denominator of the other metrics (frames with a point).
+    Returns:
+        dict: (S, H) arrays.
+    """
+    shape = states.shape[1:]
+    sampled = states[present]
+    flips = np.count_nonzero(sampled[1:] != sampled[:-1], axis=0)
+    in_danger = raw_codes == DANGER
+    onsets = np.flatnonzero(in_danger & ~np.concatenate(([False], in_danger[:-1])))
+    delay_sum, reached = np.zeros(shape), np.zeros(shape, dtype=np.int64)
+    for onset in onsets:
+        # The raw point's stay in the zone (or the rest of the log) bounds the wait
+        after = np.flatnonzero(~in_danger[onset:])
+        end = onset + (after[0] if len(after) else len(raw_codes) - onset)
+        hits = states[onset:end] == DANGER
+        found = hits.any(axis=0)
+        delay = hits.argmax(axis=0)
+        delay_sum += np.where(found, delay, 0)
+        reached += found
+    return {
+        "flips": flips,
+        "onsets": np.full(shape, len(onsets)),
+        "delay_sum": delay_sum,
+        "delay_ms_sum": delay_sum * interval_ms,
+        "reached": reached,
+    }
+
+
+def run_task(task):
+    """
+    Replay one log through one slice of the grid (runs in a worker process).
+    Returns:
+        list: (config key, sums) per configuration.
+    """
+    kind, trajectory, params, width, height, max_lag = task
+    geometry = frame_geometry(width, height)
+    if kind == "median_ema":
+        window, alpha, debounce, displacements, hysteresis_values = params
+        smoothed = replay_bank(trajectory, window, alpha, [d * width for d in displacements])
+        keys = [("median_ema", window, alpha, d) for d in displacements]
+    else:
+        debounce, noises, hysteresis_values = params
+        smoothed = replay_kalman(trajectory, noises)
+        keys = [("kalman", q, r, None) for q, r in noises]
+    states = replay_states(smoothed, trajectory["present"], trajectory["lost"], debounce,
+                           [h * width for h in hysteresis_values], geometry)
+    tracks = track_metrics(trajectory, smoothed, max_lag)
+    flips = state_metrics(states, trajectory["present"], raw_states(trajectory, geometry), trajectory["interval_ms"])
+
+    results = []
+    for s, key in enumerate(keys):
+        for h, hysteresis in enumerate(hysteresis_values):
+            sums = {name: float(values[s]) for name, values in tracks.items()}
+            sums.update({name: float(values[s, h]) for name, values in flips.items()})
+            results.append((key + (debounce, hysteresis), sums))
+    return results
+
+
+def summarize(sums):
+    """
+    Metrics of one configuration from its summed counters.
+    """
+    frames = sums["frames"]
+    return {
+        "jitter": sums["jitter_sum"] / sums["jitter_count"] if sums["jitter_count"] else float("nan"),
+        "error": sums["error_sum"] / frames if frames else float("nan"),
+        "lag": sums["lag_sum"] / frames if frames else float("nan"),
+        "flips": 100.0 * sums["flips"] / frames if frames else float("nan"),
+        "time_to_danger": sums["delay_sum"] / sums["reached"] if sums["reached"] else float("nan"),
+        "time_to_danger_ms": sums["delay_ms_sum"] / sums["reached"] if sums["reached"] else float("nan"),
+        "missed": int(sums["onsets"] - sums["reached"]),
+    }
+
+
+def check(trajectory, width, height):
+    """
+    Replay a log through PointSmoother and DistanceLogic with the configured
+    parameters and compare with the banked replay used by the sweep.
+    """
+    geometry = frame_geometry(width, height)
+    field = hazard_field(width, height)
+    smoother = PointSmoother(SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MAX_DISPLACEMENT * width)
+    logics = [DistanceLogic(geometry) for _ in field.names]
+    for logic in logics:
+        logic.set_geometry(geometry, radius=0.0)
+    expected = []
+    for point, present, lost in zip(trajectory["raw"], trajectory["present"], trajectory["lost"]):
+        if not present:
+            if lost or not expected:
+                smoother.smooth(None)
+                expected.append(SAFE)
+            else:
+                expected.append(expected[-1])  # Unsampled frame: the state holds
+            continue
+        smoothed = smoother.smooth((int(point[0]), int(point[1])))
+        distances = field.lookup(np.array([smoothed], dtype=np.int64))[0].tolist()
+        expected.append(max(STATES.index(logic.determine_state(d)) for logic, d in zip(logics, distances)))
+    smoothed = replay_bank(trajectory, SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, [MAX_DISPLACEMENT * width])
+    states = replay_states(smoothed, trajectory["present"], trajectory["lost"], DEBOUNCE_FRAMES,
+                           [STATE_HYSTERESIS * width], geometry)
+    return np.array_equal(states[:, 0, 0], expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("logs", nargs="*", help="CSV logs or BoundaryLogger directories (default: logs/*.csv)")
+    parser.add_argument("--size", default=f"{FRAME_WIDTH}x{FRAME_HEIGHT}", help="Frame size of the logs, WIDTHxHEIGHT")
+    parser.add_argument("--window", type=int, nargs="+", default=[3, 5, 7])
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.2, 0.4, 0.6, 0.8])
+    parser.add_argument("--max-displacement", type=float, nargs="+", default=[0.15, MAX_DISPLACEMENT, 0.5],
+                        help="Jump limits, fractions of the frame width")
+    parser.add_argument("--debounce", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--hysteresis", type=float, nargs="+", default=[0.0, STATE_HYSTERESIS, 0.03125],
+                        help="Hysteresis, fractions of the frame width")
+    parser.add_argument("--kalman-q", type=float, nargs="*", default=[0.01, 0.1], help="KalmanPoint process noise")
+    parser.add_argument("--kalman-r", type=float, nargs="*", default=[1.0, 10.0], help="KalmanPoint measurement noise")
+    parser.add_argument("--max-lag", type=int, default=10, help="Largest lag (points of the log) searched")
+    parser.add_argument("--max-gap", type=int, help="Longest run of blank rows carried across as unsampled frames"
+                                                     " (default: twice the usual spacing of a log's points)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sort", default="jitter", choices=METRICS)
+    parser.add_argument("--top", type=int, default=20, help="Configurations printed")
+    parser.add_argument("--out", help="CSV file for all configurations")
+    parser.add_argument("--check", action="store_true", help="Compare the banked replay with PointSmoother/DistanceLogic")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    paths = args.logs or sorted(glob.glob(os.path.join(ROOT, "logs", "*.csv")))
+    trajectories = [trajectory for trajectory in (load_trajectory(path, args.max_gap) for path in paths) if trajectory["present"].any()]
+    if not trajectories:
+        parser.error("No log with boundary points found")
+    print(f"{len(trajectories)} logs with points, {sum(int(t['present'].sum()) for t in trajectories)} frames with a point")
+    if args.check:
+        same = all(check(trajectory, width, height) for trajectory in trajectories)
+        print(f"Banked replay vs PointSmoother/DistanceLogic: {'identical' if same else 'DIFFER'}")
+
+    tasks = []
+    noises = list(product(args.kalman_q, args.kalman_r))
+    for trajectory in trajectories:
+        for window, alpha, debounce in product(args.window, args.alpha, args.debounce):
+            params = (window, alpha, debounce, args.max_displacement, args.hysteresis)
+            tasks.append(("median_ema", trajectory, params, width, height, args.max_lag))
+        if noises:
+            for debounce in args.debounce:
+                tasks.append(("kalman", trajectory, (debounce, noises, args.hysteresis), width, height, args.max_lag))
+
+    start = time.perf_counter()
+    totals = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for results in pool.map(run_task, tasks, chunksize=max(1, len(tasks) // (4 * max(1, args.workers)))):
+            for key, sums in results:
+                total = totals.setdefault(key, dict.fromkeys(sums, 0.0))
+                for name, value in sums.items():
+                    total[name] += value
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for (kind, a, b, c, debounce, hysteresis), sums in totals.items():
+        if kind == "median_ema":
+            config = {"filter": kind, "window": a, "alpha": b, "max_displacement": c}
+            current = (a, b, c, debounce, hysteresis) == (SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MAX_DISPLACEMENT,
+                                                          DEBOUNCE_FRAMES, STATE_HYSTERESIS)
+        else:
+            config = {"filter": kind, "kalman_q": a, "kalman_r": b}
+            current = False
+        config.update({"debounce": debounce, "hysteresis": hysteresis, "current": current})
+        config.update(summarize(sums))
+        rows.append(config)
+    rows.sort(key=lambda row: (np.isnan(row[args.sort]), row[args.sort]))
+    print(f"{len(rows)} configurations in {elapsed:.2f} s ({len(tasks)} tasks, {args.workers} workers)")
+
+    print(f"{'filter':<34} {'deb':>3} {'hyst':>8} {'jitter':>7} {'error':>7} {'lag':>5} {'flips':>6} {'ttd':>6} {'ttd ms':>7} {'miss':>4}")
+    for row in rows[:args.top]:
+        if row["filter"] == "median_ema":
+            name = f"median_ema w={row['window']} a={row['alpha']:g} d={row['max_displacement']:g}"
+        else:
+            name = f"kalman q={row['kalman_q']:g} r={row['kalman_r']:g}"
+        print(f"{name:<34} {row['debounce']:>3} {row['hysteresis']:>8.5f} {row['jitter']:>7.2f} {row['error']:>7.2f}"
+              f" {row['lag']:>5.2f} {row['flips']:>6.2f} {row['time_to_danger']:>6.2f} {row['time_to_danger_ms']:>7.1f}"
+              f" {row['missed']:>4}{'  (current)' if row['current'] else ''}")
+
+    if args.out:
+        fields = ["filter", "window", "alpha", "max_displacement", "kalman_q", "kalman_r", "debounce", "hysteresis",
+                  "current", *METRICS]
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,88 @@
+import time
 import cv2
+import numpy as np
 from modules.hand_tracking import HandTracker
-from modules.distance_logic import DistanceLogic
+from modules.flow_tracker import FlowTracker
+from modules.multi_hand import MultiHandTracker
+from modules.hazard_zones import ZoneStates, hazard_field
+from modules.distance_logic import SEVERITY
+from modules.batch_state import BankedSmoother, BankedZoneStates, shared_smoothing_bank, shared_state_bank
 from modules.overlay import Overlay
-from config.config import CIRCLE_CENTER
+from modules.resolution import ResolutionController
+from modules.outline import OutlineEncoder
+from modules.boundary_log import instant_state
+from config.config import DECODE_AT_SCALE, TRACKING_MODE, VECTORIZED_STATE, MAX_HANDS, CAPTURE_SOURCE
 
 class HandTrackingSystem:
     def __init__(self):
         """
         Initialize the hand tracking system components.
         """
-        self.hand_tracker = HandTracker()
-        self.distance_logic = DistanceLogic()
+        if TRACKING_MODE not in ("detect", "flow"):
+            raise ValueError(f"Unknown tracking mode: {TRACKING_MODE}")
+        if MAX_HANDS > 1:
+            if TRACKING_MODE == "flow":
+                raise ValueError("Optical-flow tracking follows a single hand; set MAX_HANDS = 1")
+            self.hand_tracker = MultiHandTracker()
+        else:
+            self.hand_tracker = FlowTracker() if TRACKING_MODE == "flow" else HandTracker()
+            if VECTORIZED_STATE:
+                # Smoothing in arrays shared by all pipelines, advanced together per batch
+                self.hand_tracker.smoother = BankedSmoother(shared_smoothing_bank(), self.hand_tracker.smoother.max_displacement)
+        self.zone_states = self.new_zone_states()  # SAFE/WARNING/DANGER per hazard zone
+        self.hand_states = {}  # Hand ID -> zone states, when tracking several hands
         self.overlay = Overlay()
+        self.resolution = ResolutionController()  # Picks the tracker's processing scale from measured frame time
+        self.recorder = None  # Optional FrameRecorder capturing every input frame
+        self.logger = None  # Optional BoundaryLogger of every frame's points and states
+        self.stream = None  # Optional FrameStream; annotated frames are rendered for it while it has viewers
+        self.decode_at_scale = DECODE_AT_SCALE  # Let the decoder drop detail the processing scale discards
+        self.outline_encoder = OutlineEncoder()  # Delta-encoded hand outline for clients that draw it
+
+    def reset(self):
+        """
+        Clear all per-stream state so the system can serve a new client.
+        """
+        self.hand_tracker.reset()
+        self.zone_states.reset()
+        self.hand_states = {}
+        self.resolution.reset()
+        self.outline_encoder.reset()
+        self.hand_tracker.scale = self.resolution.scale
+        self.close()
+
+    def close(self):
+        """
+        Close the recorder and logger (flushing them) and detach the stream.
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.logger is not None:
+            self.logger.close()
+            self.logger = None
+        self.stream = None
+
+    def new_zone_states(self):
+        """
+        Zone states for one hand; with VECTORIZED_STATE they are rows of the shared state arrays.
+        """
+        return BankedZoneStates(shared_state_bank()) if VECTORIZED_STATE else ZoneStates()
+
+    @property
+    def multi_hand(self):
+        """
+        Whether the tracker follows several hands.
+        """
+        return isinstance(self.hand_tracker, MultiHandTracker)
+
+    def memory_footprint(self):
+        """
+        Estimate the bytes of frame data currently held by the pipeline.
+        Returns:
+            int: Size of the cached arrays in bytes.
+        """
+        return self.hand_tracker.arena.nbytes()
 
     def process_frame(self, frame):
         """
@@ -21,84 +92,284 @@ class HandTrackingSystem:
         Returns:
             tuple: (processed_frame, state)
         """
+        analysis = self.analyze_frame(frame)
+        return self.draw_frame(frame, analysis), analysis[1]
+
+    def analyze_frame(self, frame):
+        """
+        Detect the hand(s) and compute the state, without drawing (the detect
+        stage of LocalPipeline; frames must come in order).
+        Args:
+            frame (numpy.ndarray): Input BGR frame.
+        Returns:
+            tuple: ([(contour, hull, point) per hand to draw], state)
+        """
+        if self.recorder is not None:
+            self.recorder.record(frame)
+
         # Detect hand and boundary point
         hand_data = self.hand_tracker.detect_hand(frame)
-        largest_contour, hull, boundary_point = hand_data
 
-        # Reset ROI if tracking is lost (boundary_point is None)
-        if boundary_point is None:
-            self.hand_tracker.roi = None
+        # Compute state (resets the ROI if tracking is lost)
+        state = self.build_result(hand_data)["state"]
+        return self.drawn_hands(hand_data), state
 
-        # Compute state
-        if boundary_point is not None:
-            distance = self.distance_logic.calculate_distance(boundary_point, CIRCLE_CENTER)
-            state = self.distance_logic.determine_state(distance)
-        else:
-            state = "SAFE"
+    def drawn_hands(self, hand_data):
+        """
+        (contour, hull, point) of every tracked hand, for draw_frame.
+        Args:
+            hand_data (tuple): The tracker's (primary) hand data for the frame.
+        """
+        return [track.result() for track in self.hand_tracker.hands] if self.multi_hand else [hand_data]
 
-        # Draw overlays
+    def draw_frame(self, frame, analysis):
+        """
+        Draw the overlays for a frame's analysis (see analyze_frame); the render stage of LocalPipeline.
+        Returns:
+            numpy.ndarray: The frame, drawn on in place.
+        """
+        hands, state = analysis
         frame = self.overlay.draw_virtual_object(frame)
-        frame = self.overlay.draw_boundary_point(frame, boundary_point, contour=largest_contour, hull=hull, debug=True)
+        for largest_contour, hull, boundary_point in hands:
+            frame = self.overlay.draw_boundary_point(frame, boundary_point, contour=largest_contour, hull=hull, debug=True)
         # frame = self.overlay.draw_state(frame, state) # Disabled for web UI
 
-        return frame, state
+        return frame
 
-    def process_frame_data(self, frame):
+    def decode_scale(self):
+        """
+        Smallest size, relative to the client's frame, that incoming frames may be decoded at.
+        Recordings and watched streams keep the frames as sent.
+        """
+        if not self.decode_at_scale or self.recorder is not None or self.streaming:
+            return 1.0
+        return self.resolution.scale
+
+    def process_frame_data(self, frame, frame_scale=1.0, outline=False):
         """
         Process a frame and return data only (no drawing).
+        Args:
+            frame (numpy.ndarray): Decoded BGR frame.
+            frame_scale (float): Size of frame relative to the client's frame
+                (see decode_scale); the point is always in the client's pixels.
+            outline (bool): Add the delta-encoded hand outline (see build_result).
         Returns:
-            dict: {'state': str, 'point': tuple|None}
+            dict: {'state': str, 'point': tuple|None, 'zones': dict, 'reused': bool}
         """
+        if self.recorder is not None:
+            self.recorder.record(frame)
+
         # Detect hand and boundary point
-        hand_data = self.hand_tracker.detect_hand(frame)
+        start = time.perf_counter()
+        hand_data = self.hand_tracker.detect_hand(frame, frame_scale)
+        result = self.build_result(hand_data, outline)
+        self.adapt((time.perf_counter() - start) * 1000.0)
+        if self.streaming and frame_scale == 1.0:  # A viewer that just attached gets the next full-size frame
+            self.stream_frame(frame, hand_data, result["state"])
+        return result
+
+    @property
+    def streaming(self):
+        """
+        Whether annotated frames are rendered for stream viewers.
+        """
+        return self.stream is not None and self.stream.watched
+
+    def stream_frame(self, frame, hand_data, state):
+        """
+        Publish an annotated copy of a processed frame to the stream's viewers
+        (the frame itself is left as decoded).
+        Args:
+            frame (numpy.ndarray): Decoded BGR frame, at the client's size.
+            hand_data (tuple): (contour, hull, point) the tracker returned for it.
+            state (str): The frame's state.
+        """
+        analysis = (self.drawn_hands(hand_data), state)
+        self.stream.render(frame, lambda canvas: self.draw_frame(canvas, analysis))
+
+    def adapt(self, frame_ms):
+        """
+        Report how long a frame took so the processing scale can follow the load.
+        The point and state stay in input pixels whatever the scale.
+        Args:
+            frame_ms (float): Processing time of the frame in milliseconds.
+        """
+        # Frames answered by the motion gate say nothing about the cost at the current scale
+        if not self.hand_tracker.gated:
+            self.hand_tracker.scale = self.resolution.update(frame_ms)
+
+    def evaluate_zones(self, boundary_point):
+        """
+        Update the state of every hazard zone.
+        Args:
+            boundary_point (tuple): Smoothed boundary point from the tracker, or None.
+        Returns:
+            tuple: (most severe state, {zone name: state})
+        """
+        distances = self.zone_distances(boundary_point)
+        if distances is None:
+            return self.zone_states.safe()
+        return self.zone_states.update(distances, self.hand_tracker.geometry)
+
+    def zone_distances(self, boundary_point, hand=None):
+        """
+        Signed distance of the hand to every hazard zone.
+        Each zone's distance is taken at the contour point closest to it, moved by
+        the same smoothing correction as the boundary point (so with the single
+        default zone it is the smoothed point's distance, as for the circle).
+        Args:
+            boundary_point (tuple): Smoothed boundary point, or None.
+            hand (HandTrack): Hand the point belongs to; defaults to the tracker's (primary) hand.
+        Returns:
+            numpy.ndarray: Distance per zone, or None without a hand.
+        """
+        source = self.hand_tracker if hand is None else hand
+        if boundary_point is None or source.last_point is None:
+            return None
+        geometry = self.hand_tracker.geometry
+        field = hazard_field(geometry.width, geometry.height)
+        correction = (boundary_point[0] - source.last_point[0], boundary_point[1] - source.last_point[1])
+        return field.distances_at(source.zone_points + np.array(correction))
+
+    def evaluate_hands(self):
+        """
+        Update the zone states of every hand the MultiHandTracker sees.
+        Hands keep their states (and debounce history) while their ID lives.
+        Returns:
+            tuple: (most severe state, {zone name: most severe state over the hands},
+                [{'id', 'state', 'point', 'zones'} per visible hand])
+        """
+        tracker = self.hand_tracker
+        live = {track.hand_id for track in tracker.tracks}
+        self.hand_states = {hand_id: states for hand_id, states in self.hand_states.items() if hand_id in live}
+        hands = []
+        for track in tracker.hands:
+            states = self.hand_states.get(track.hand_id)
+            if states is None:
+                states = self.hand_states[track.hand_id] = self.new_zone_states()
+            distances = self.zone_distances(track.point, track)
+            state, zones = states.safe() if distances is None else states.update(distances, tracker.geometry)
+            point = (int(track.point[0]), int(track.point[1])) if track.point is not None else None
+            hands.append({"id": track.hand_id, "state": state, "point": point, "zones": zones})
+        if not hands:
+            return self.zone_states.safe() + ([],)
+        state = max((hand["state"] for hand in hands), key=SEVERITY.get)
+        zones = {name: max((hand["zones"][name] for hand in hands), key=SEVERITY.get) for name in hands[0]["zones"]}
+        return state, zones, hands
+
+    def build_result(self, hand_data, outline=False, zones=None):
+        """
+        Compute the state for already detected hand data (see HandTracker.detect_hand).
+        Args:
+            hand_data (tuple): (contour, hull, point) from the tracker.
+            outline (bool): Also return the simplified contour and hull, delta-encoded
+                against the previous outline of this pipeline (see OutlineEncoder).
+            zones (tuple): Zone states already computed for this frame (see
+                update_zone_states); evaluated here if None.
+        Returns:
+            dict: {'state': str, 'point': tuple|None, 'zones': dict, 'reused': bool[, 'hands': list][, 'outline': dict]}
+                With several hands, 'state' and 'zones' are the most severe over all
+                hands, 'point' is the hand closest to a hazard zone and 'hands' lists each one.
+        """
         largest_contour, hull, boundary_point = hand_data
+        profiler = self.hand_tracker.profiler
+        profiler.begin()
 
         # Reset ROI if tracking is lost (boundary_point is None)
         if boundary_point is None:
             self.hand_tracker.roi = None
 
         # Compute state
+        hands = None
+        if self.multi_hand:
+            state, zones, hands = self.evaluate_hands()
+        elif zones is None:
+            state, zones = self.evaluate_zones(boundary_point)
+        else:
+            state, zones = zones
         if boundary_point is not None:
-            distance = self.distance_logic.calculate_distance(boundary_point, CIRCLE_CENTER)
-            state = self.distance_logic.determine_state(distance)
             # Ensure native Python types for JSON serialization
             point = (int(boundary_point[0]), int(boundary_point[1]))
         else:
-            state = "SAFE"
             point = None
+        profiler.lap("state")
 
-        return {
+        result = {
             "state": state,
-            "point": point
+            "point": point,
+            "zones": zones,
+            "reused": self.hand_tracker.gated  # Answered by the motion gate
         }
+        if hands is not None:
+            result["hands"] = hands
+        if outline:
+            result["outline"] = self.outline_encoder.encode(largest_contour, hull, self.hand_tracker.geometry)
+            profiler.lap("outline")
+        if self.logger is not None:
+            self.log_result(result)
+            profiler.lap("log")
+        return result
+
+    def log_result(self, result):
+        """
+        Append a frame's raw and smoothed points and states to the boundary log.
+        The raw state is the one the unsmoothed point gives on its own, without hysteresis or debounce.
+        """
+        tracker = self.hand_tracker
+        raw_point = tracker.last_point if result["point"] is not None else None
+        distance = None
+        if raw_point is not None:
+            geometry = tracker.geometry
+            field = hazard_field(geometry.width, geometry.height)
+            distance = float(field.lookup(np.array([raw_point])).min())
+        state_raw = instant_state(distance, tracker.geometry.warning_band)
+        state = result["state"] if result["point"] is not None else None
+        self.logger.log(raw_point, result["point"], state_raw, state)
 
 def main():
     """
     Main function to run the real-time hand tracking pipeline locally.
     """
+    import argparse
     from modules.camera import Camera
+    from modules.frame_store import FrameRecorder
+    from modules.boundary_log import BoundaryLogger
+    from modules.pipeline import LocalPipeline, format_stats, window_sink
+
+    parser = argparse.ArgumentParser(description="Run the hand tracking pipeline on the local camera.")
+    parser.add_argument("--source", default=CAPTURE_SOURCE,
+                        help="Camera index, video file, image directory, frame store directory or synthetic[:frames]")
+    parser.add_argument("--record", help="Directory to record the camera frames to (frame store)")
+    parser.add_argument("--log", help="Directory to log the boundary points and states to")
+    parser.add_argument("--headless", action="store_true", help="Run without a window (e.g. in CI)")
+    parser.add_argument("--every-frame", action="store_true",
+                        help="Deliver every frame of file sources, as fast as they are processed")
+    parser.add_argument("--frames", type=int, help="Stop after this many frames")
+    parser.add_argument("--stats", type=float, default=None, help="Seconds between per-stage stats readouts")
+    args = parser.parse_args()
     
     # Initialize modules
-    camera = Camera()
+    camera = Camera(source=args.source, drop_stale=not args.every_frame)
     system = HandTrackingSystem()
+    if args.record:
+        system.recorder = FrameRecorder(args.record)
+    if args.log:
+        system.logger = BoundaryLogger(args.log)
 
+    # Capture, detection and drawing/display run as overlapping stages
+    pipeline = LocalPipeline(system.analyze_frame, system.draw_frame, camera.capture,
+                             None if args.headless else window_sink())
     try:
-        while True:
-            # Capture frame from the camera
-            frame = camera.get_frame()
-
-            # Process frame
-            processed_frame, state = system.process_frame(frame)
-
-            # Display the frame
-            cv2.imshow("Hand Tracking", processed_frame)
-
-            # Exit on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+        stats = pipeline.run(max_frames=args.frames, stats_interval=args.stats)
+        print(format_stats(stats))
     finally:
         camera.release()
-        cv2.destroyAllWindows()
+        if system.recorder is not None:
+            system.recorder.close()
+        if system.logger is not None:
+            system.logger.close()
+        if not args.headless:
+            cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+import cv2
+import numpy as np
+from config.config import CACHE_DIR
+
+
+def config_key(*parts):
+    """
+    Short hash identifying an artifact by the config it is derived from and the OpenCV version.
+    Args:
+        parts: repr()-able values the artifact depends on.
+    """
+    config = repr(parts + (cv2.__version__,))
+    return hashlib.sha1(config.encode()).hexdigest()[:16]
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        """
+        Derived arrays (lookup tables, distance fields, ...) persisted as .npy files
+        named after the config they were built from, so a new process loads them
+        instead of rebuilding them. Entries are written atomically; a corrupt or
+        unreadable entry is rebuilt.
+        Args:
+            cache_dir (str): Directory of the cache, or None to always build.
+        """
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}_{key}.npy")
+
+    def load_or_build(self, name, key, build):
+        """
+        Load an artifact, or build and store it.
+        Args:
+            name (str): Kind of artifact, e.g. "skin_lut".
+            key (str): Config hash (see config_key).
+            build (callable): Returns the artifact as a numpy array.
+        Returns:
+            numpy.ndarray: The artifact.
+        """
+        path = None
+        if self.cache_dir:
+            path = self.path(name, key)
+            if os.path.exists(path):
+                try:
+                    array = np.load(path)
+                    self._count(hit=True)
+                    return array
+                except (OSError, ValueError):
+                    pass  # Corrupt cache entry; rebuild it
+
+        array = build()
+        self._count(hit=False)
+        if path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Could not cache {name}: {e}")
+        return array
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        return {"dir": self.cache_dir, "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def artifact_cache():
+    """
+    ArtifactCache of CACHE_DIR shared by this process.
+    """
+    return ArtifactCache()
@@ -0,0 +1,199 @@
+import asyncio
+import time
+import cv2
+import numpy as np
+from config.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from modules.frame_ingest import ENCODED, decode_scaled
+from modules.hand_tracking import HandTracker
+from modules.batch_state import shared_smoothing_bank, collect_smoothed, update_zone_states
+
+
+def segment_batch(trackers, frames, frame_scales=None):
+    """
+    Detect hands in frames belonging to several trackers with one segmentation pass.
+    Frames the motion gate lets through are answered from their tracker's cache.
+    Blur and morphology look at neighbouring pixels, so they still run per frame.
+    The per-pixel skin segmentation runs once over all remaining frames laid out
+    back to back in a single one-pixel-high row image, which works for any mix
+    of ROI sizes.
+    Trackers with their own tracking strategy (see FlowTracker) decide per frame
+    whether to detect, so their frames go through track() on their own.
+    All trackers are expected to share the same segmentation settings.
+    Args:
+        trackers (list): HandTracker per frame.
+        frames (list): BGR frames, one per tracker.
+        frame_scales (list): Size of each frame relative to its client's frame (default 1.0).
+    Returns:
+        list: (global_contour, hull, smoothed_point) per frame.
+    """
+    if frame_scales is None:
+        frame_scales = [1.0] * len(frames)
+    results = [None] * len(trackers)
+    active = []
+    for i, (tracker, frame) in enumerate(zip(trackers, frames)):
+        tracker.profiler.begin()
+        tracker.profiler.count("frames")
+        if tracker.check_motion(frame, frame_scales[i]):
+            results[i] = tracker.reuse_result()
+        elif type(tracker).track is not HandTracker.track:
+            tracker.last_result = tracker.track(frame, frame_scales[i])
+            results[i] = tracker.last_result
+        else:
+            active.append(i)
+    if not active:
+        return results
+
+    prepared = [trackers[i].prepare_frame(frames[i], frame_scales[i]) for i in active]
+    total = sum(frame.shape[0] * frame.shape[1] for frame, _ in prepared)
+    row = np.empty((1, total, 3), dtype=np.uint8)
+    layout = []
+    offset = 0
+    for i, (frame, _) in zip(active, prepared):
+        h, w = frame.shape[:2]
+        # Blur each frame straight into its slice of the shared row
+        cv2.GaussianBlur(frame, trackers[i].blur_kernel, 0, dst=row[0, offset:offset + h * w].reshape(h, w, 3))
+        layout.append((offset, h, w))
+        offset += h * w
+
+    # The shared pass is profiled on the first session's profiler
+    first = trackers[active[0]]
+    first.profiler.begin()
+    mask = first.segment_bgr(row)
+
+    for i, (_, roi_offset), (offset, h, w) in zip(active, prepared, layout):
+        tracker = trackers[i]
+        tracker.last_result = tracker.locate_hand(mask[0, offset:offset + h * w].reshape(h, w), roi_offset)
+        results[i] = tracker.last_result
+    return results
+
+
+def process_batch(systems, datas, formats=None, outlines=None):
+    """
+    Decode and process one frame per pipeline, segmenting them together.
+    Args:
+        systems (list): HandTrackingSystem per frame.
+        datas (list): Frame bytes as sent by the clients.
+        formats (list): Ingest format per frame (default ENCODED).
+        outlines (list): Whether to include the hand outline, per frame (default False).
+    Returns:
+        list: Result dict per frame, or None for frames that could not be decoded.
+    """
+    if formats is None:
+        formats = [ENCODED] * len(datas)
+    if outlines is None:
+        outlines = [False] * len(datas)
+    decoded = [decode_scaled(data, fmt, system.decode_scale()) for system, data, fmt in zip(systems, datas, formats)]
+    frames = [frame for frame, _ in decoded]
+    frame_scales = [frame_scale for _, frame_scale in decoded]
+    valid = [i for i, frame in enumerate(frames) if frame is not None]
+    for i in valid:
+        if systems[i].recorder is not None:
+            systems[i].recorder.record(frames[i])
+    results = [None] * len(frames)
+    if not valid:
+        return results
+
+    start = time.perf_counter()
+    trackers = [systems[i].hand_tracker for i in valid]
+    # Banked smoothers (VECTORIZED_STATE) are advanced together once the batch is segmented
+    with shared_smoothing_bank().deferred():
+        hand_data = segment_batch(trackers, [frames[i] for i in valid], [frame_scales[i] for i in valid])
+    hand_data = [collect_smoothed(tracker, data) for tracker, data in zip(trackers, hand_data)]
+    # Multi-hand pipelines evaluate each of their hands in build_result
+    single = [k for k, i in enumerate(valid) if not systems[i].multi_hand]
+    zones = [None] * len(valid)
+    stepped = update_zone_states([systems[valid[k]].zone_states for k in single],
+                                 [systems[valid[k]].zone_distances(hand_data[k][2]) for k in single],
+                                 [trackers[k].geometry for k in single])
+    for k, zone_result in zip(single, stepped):
+        zones[k] = zone_result
+    for i, data, zone_result in zip(valid, hand_data, zones):
+        results[i] = systems[i].build_result(data, outlines[i], zone_result)
+    # Each pipeline is charged its share of the batch
+    frame_ms = (time.perf_counter() - start) * 1000.0 / len(valid)
+    for i in valid:
+        systems[i].adapt(frame_ms)
+    for i, data in zip(valid, hand_data):
+        if systems[i].streaming and frame_scales[i] == 1.0:
+            systems[i].stream_frame(frames[i], data, results[i]["state"])
+    return results
+
+
+class BatchScheduler:
+    def __init__(self, executor, max_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        """
+        Collect frames from many sessions and process them as one batch.
+        A batch is flushed when it is full or when its first frame has waited
+        max_wait_ms, which caps the latency batching can add.
+        Args:
+            executor (Executor): Pool the batches run on.
+            max_size (int): Maximum frames per batch.
+            max_wait_ms (float): Longest a frame waits for others to join its batch.
+        """
+        self.executor = executor
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = []  # (system, data, fmt, outline, future)
+        self.timer = None
+        self.batches = 0
+        self.frames = 0
+
+    async def submit(self, system, data, fmt=ENCODED, outline=False):
+        """
+        Queue one frame (one per session at a time) and wait for its result.
+        Args:
+            system (HandTrackingSystem): The session's pipeline.
+            data (bytes): Frame as sent by the client.
+            fmt (str): Ingest format of the frame.
+            outline (bool): Include the delta-encoded hand outline.
+        Returns:
+            dict: The pipeline result, or None if the frame could not be decoded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((system, data, fmt, outline, future))
+
+        if len(self.pending) >= self.max_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def stats(self):
+        """
+        Number of batches run and the average batch size.
+        """
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        # Frames of sessions that were cancelled meanwhile are not processed
+        batch = [item for item in self.pending if not item[-1].done()]
+        self.pending = []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.frames += len(batch)
+        loop = asyncio.get_running_loop()
+        systems, datas, formats, outlines, _ = zip(*batch)
+        task = loop.run_in_executor(self.executor, process_batch, list(systems), list(datas), list(formats), list(outlines))
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+
+    def _resolve(self, batch, done):
+        error = done.exception()
+        results = done.result() if error is None else [None] * len(batch)
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,433 @@
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+import numpy as np
+from config.config import SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, DEBOUNCE_FRAMES, MAX_SESSIONS
+from modules.distance_logic import STATES
+from modules.hazard_zones import zone_specs
+
+SAFE, WARNING, DANGER = range(len(STATES))
+
+
+class SmoothingBank:
+    def __init__(self, capacity=MAX_SESSIONS, window_size=SMOOTHING_WINDOW_SIZE, alpha=SMOOTHING_ALPHA):
+        """
+        PointSmoother state of many streams in preallocated arrays (one row per
+        stream), advanced for all of them in one vectorized step.
+        Each row holds a ring buffer of the last window_size points, the EMA point
+        and the stream's jump limit; the results equal PointSmoother's.
+        Args:
+            capacity (int): Rows allocated up front; the arrays double when full.
+            window_size (int): Number of points for median smoothing.
+            alpha (float): Smoothing factor for EMA.
+        """
+        self.window_size = window_size
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.local = threading.local()  # Deferred steps of the current thread
+        self.free = []
+        self.rows = 0
+        self._allocate_arrays(max(1, capacity))
+
+    def _allocate_arrays(self, capacity):
+        """
+        (Re)allocate the arrays, keeping the rows in use.
+        """
+        old = getattr(self, "window", None)
+        arrays = {
+            "window": np.zeros((capacity, self.window_size, 2), dtype=np.float64),
+            "count": np.zeros(capacity, dtype=np.intp),  # Points in the window
+            "head": np.zeros(capacity, dtype=np.intp),  # Ring position of the next point
+            "ema": np.zeros((capacity, 2), dtype=np.float64),
+            "has_ema": np.zeros(capacity, dtype=bool),
+            "max_displacement": np.zeros(capacity, dtype=np.float64),
+        }
+        if old is not None:
+            for name, array in arrays.items():
+                array[:self.rows] = getattr(self, name)[:self.rows]
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def allocate(self, max_displacement):
+        """
+        Reserve a row for a new stream.
+        Returns:
+            int: The row.
+        """
+        with self.lock:
+            if self.free:
+                row = self.free.pop()
+            else:
+                if self.rows == self.capacity:
+                    self._allocate_arrays(2 * self.capacity)
+                row = self.rows
+                self.rows += 1
+            self._reset(row)
+            self.max_displacement[row] = max_displacement
+            return row
+
+    def release(self, row):
+        """
+        Return a stream's row to the bank.
+        """
+        with self.lock:
+            self.free.append(row)
+
+    def reset(self, row):
+        """
+        Clear a stream's smoothing history.
+        """
+        with self.lock:
+            self._reset(row)
+
+    def _reset(self, rows):
+        self.count[rows] = 0
+        self.head[rows] = 0
+        self.has_ema[rows] = False
+
+    def set_max_displacement(self, row, value):
+        with self.lock:
+            self.max_displacement[row] = value
+
+    def step(self, rows, points):
+        """
+        Smooth one new point for each of several streams.
+        Args:
+            rows (numpy.ndarray): (K,) distinct stream rows.
+            points (numpy.ndarray): (K, 2) raw points.
+        Returns:
+            numpy.ndarray: (K, 2) int smoothed points (the raw point after a jump).
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        with self.lock:
+            ema = self.ema[rows]
+            has_ema = self.has_ema[rows]
+
+            # Sudden jumps restart the window at the new point
+            offset = points - ema
+            displacement = np.sqrt(offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1])
+            jump = has_ema & (displacement > self.max_displacement[rows])
+            self._reset(rows[jump])
+
+            # Append to the ring buffers
+            head = self.head[rows]
+            self.window[rows, head] = points
+            self.head[rows] = (head + 1) % self.window_size
+            count = np.minimum(self.count[rows] + 1, self.window_size)
+            self.count[rows] = count
+
+            # Median over the filled part of each window (filled from position 0 after a reset)
+            window = self.window[rows]
+            filled = np.arange(self.window_size) < count[:, None]
+            ordered = np.sort(np.where(filled[:, :, None], window, np.inf), axis=1)
+            k = np.arange(len(rows))
+            median = (ordered[k, (count - 1) // 2] + ordered[k, count // 2]) / 2
+
+            smoothed = np.where(has_ema[:, None], self.alpha * median + (1 - self.alpha) * ema, median)
+            smoothed[jump] = points[jump]
+            self.ema[rows] = smoothed
+            self.has_ema[rows] = True
+
+        result = smoothed.astype(np.int64)
+        result[jump] = points[jump].astype(np.int64)
+        return result
+
+    @contextmanager
+    def deferred(self):
+        """
+        Collect the points smoothed by this thread's BankedSmoothers and run them
+        as one step at the end of the block. Inside it, smooth() returns the raw
+        point; afterwards pending() gives each smoother's result.
+        """
+        self.local.queue = {}
+        try:
+            yield
+        finally:
+            queue, self.local.queue = self.local.queue, None
+            self.local.results = {}
+            if queue:
+                rows = list(queue)
+                smoothed = self.step(rows, [queue[row] for row in rows]).tolist()
+                self.local.results = {row: tuple(point) for row, point in zip(rows, smoothed)}
+
+    def queue(self):
+        """
+        Points waiting for this thread's deferred step, or None outside deferred().
+        """
+        return getattr(self.local, "queue", None)
+
+    def pending(self, row):
+        """
+        Result of a stream's point in this thread's last deferred step.
+        """
+        return getattr(self.local, "results", {}).get(row)
+
+
+class BankedSmoother:
+    def __init__(self, bank, max_displacement=50):
+        """
+        PointSmoother whose state lives in a row of a SmoothingBank, so that many
+        streams can be smoothed in one step (see SmoothingBank.deferred).
+        Args:
+            bank (SmoothingBank): Shared state arrays.
+            max_displacement (float): Maximum allowed displacement between points.
+        """
+        self.bank = bank
+        self.row = bank.allocate(max_displacement)
+        weakref.finalize(self, bank.release, self.row)
+
+    @property
+    def window_size(self):
+        return self.bank.window_size
+
+    @property
+    def alpha(self):
+        return self.bank.alpha
+
+    @property
+    def max_displacement(self):
+        return float(self.bank.max_displacement[self.row])
+
+    @max_displacement.setter
+    def max_displacement(self, value):
+        self.bank.set_max_displacement(self.row, value)
+
+    def reset(self):
+        """
+        Clear the smoothing history so the smoother can be reused.
+        """
+        self.bank.reset(self.row)
+
+    def smooth(self, point):
+        """
+        Smooth the given point (see PointSmoother.smooth). Inside the bank's
+        deferred() block, the point is queued and returned unsmoothed.
+        """
+        if point is None:
+            self.reset()
+            return None
+        queue = self.bank.queue()
+        if queue is not None:
+            queue[self.row] = point
+            return point
+        return tuple(self.bank.step([self.row], [point])[0].tolist())
+
+
+def collect_smoothed(tracker, hand_data):
+    """
+    Put the result of a deferred smoothing step into a tracker's hand data.
+    Args:
+        tracker (HandTracker): Tracker that produced hand_data inside SmoothingBank.deferred().
+        hand_data (tuple): (contour, hull, point) with the point still unsmoothed.
+    Returns:
+        tuple: (contour, hull, smoothed point), also stored as the tracker's last_result.
+    """
+    smoother = tracker.smoother
+    contour, hull, point = hand_data
+    if point is None or not isinstance(smoother, BankedSmoother):
+        return hand_data
+    smoothed = smoother.bank.pending(smoother.row)
+    if smoothed is None:
+        return hand_data  # Smoothed right away (outside the deferred step)
+    tracker.last_result = (contour, hull, smoothed)
+    return tracker.last_result
+
+
+class StateBank:
+    def __init__(self, capacity=MAX_SESSIONS, debounce_frames=DEBOUNCE_FRAMES):
+        """
+        DistanceLogic state of many zones (rows) in preallocated arrays:
+        hysteresis state and a debounce ring buffer per row, advanced for all of
+        them in one vectorized step. Results equal DistanceLogic.determine_state,
+        including its tie-break (the more severe state).
+        Args:
+            capacity (int): Rows allocated up front; the arrays double when full.
+            debounce_frames (int): Length of the debounce history.
+        """
+        self.debounce_frames = debounce_frames
+        self.lock = threading.Lock()
+        self.free = []
+        self.rows = 0
+        self._allocate_arrays(max(1, capacity))
+
+    def _allocate_arrays(self, capacity):
+        old = getattr(self, "history", None)
+        arrays = {
+            "history": np.zeros((capacity, self.debounce_frames), dtype=np.int8),
+            "count": np.zeros(capacity, dtype=np.intp),  # States in the history
+            "head": np.zeros(capacity, dtype=np.intp),  # Ring position of the next state
+            "last": np.zeros(capacity, dtype=np.int8),  # Most recent (undebounced) state
+        }
+        if old is not None:
+            for name, array in arrays.items():
+                array[:self.rows] = getattr(self, name)[:self.rows]
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def allocate(self, n):
+        """
+        Reserve n rows (one per zone of a stream).
+        Returns:
+            numpy.ndarray: The rows.
+        """
+        with self.lock:
+            rows = [self.free.pop() for _ in range(min(n, len(self.free)))]
+            needed = n - len(rows)
+            while self.rows + needed > self.capacity:
+                self._allocate_arrays(2 * self.capacity)
+            rows.extend(range(self.rows, self.rows + needed))
+            self.rows += needed
+            rows = np.array(rows, dtype=np.intp)
+            self._reset(rows)
+            return rows
+
+    def release(self, rows):
+        with self.lock:
+            self.free.extend(rows.tolist())
+
+    def reset(self, rows):
+        """
+        Clear the debounce history of some rows.
+        """
+        with self.lock:
+            self._reset(rows)
+
+    def _reset(self, rows):
+        self.count[rows] = 0
+        self.head[rows] = 0
+        self.last[rows] = SAFE
+
+    def step(self, rows, distances, radius, warning_band, hysteresis):
+        """
+        Advance several rows by one distance each.
+        Args:
+            rows (numpy.ndarray): (K,) distinct rows.
+            distances (numpy.ndarray): (K,) distances.
+            radius, warning_band, hysteresis: Thresholds (scalars or (K,) arrays, see DistanceLogic).
+        Returns:
+            numpy.ndarray: (K,) debounced state codes (indices into STATES).
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        distance = np.asarray(distances, dtype=np.float64)
+        danger = distance <= radius
+        warning = distance <= radius + warning_band
+        leave_warning = distance > radius + warning_band + hysteresis
+        leave_danger = distance > radius + hysteresis
+        with self.lock:
+            current = self.last[rows]
+            new = current.copy()
+            is_safe = current == SAFE
+            is_warning = current == WARNING
+            is_danger = current == DANGER
+            new[is_safe & warning] = WARNING
+            new[is_warning & leave_warning] = SAFE
+            new[(is_safe | is_warning) & danger] = DANGER
+            new[is_danger & leave_danger] = np.where(leave_warning, SAFE, WARNING)[is_danger & leave_danger]
+
+            head = self.head[rows]
+            self.history[rows, head] = new
+            self.head[rows] = (head + 1) % self.debounce_frames
+            count = np.minimum(self.count[rows] + 1, self.debounce_frames)
+            self.count[rows] = count
+            self.last[rows] = new
+            history = self.history[rows]
+
+        # Most frequent state in the history; ties go to the more severe state
+        filled = np.arange(self.debounce_frames) < count[:, None]
+        votes = np.stack([np.count_nonzero((history == code) & filled, axis=1) for code in range(len(STATES))], axis=1)
+        return np.argmax(votes * len(STATES) + np.arange(len(STATES)), axis=1)
+
+
+class BankedZoneStates:
+    def __init__(self, bank, names=None):
+        """
+        ZoneStates whose per-zone hysteresis and debounce live in rows of a
+        StateBank, so the zones of many streams advance in one step (see update_zone_states).
+        Args:
+            bank (StateBank): Shared state arrays.
+            names (list): Zone names; defaults to the configured zones.
+        """
+        self.bank = bank
+        self.names = [zone["name"] for zone in zone_specs()] if names is None else list(names)
+        self.rows = bank.allocate(len(self.names))
+        weakref.finalize(self, bank.release, self.rows)
+
+    def reset(self):
+        """
+        Clear every zone's debounce history.
+        """
+        self.bank.reset(self.rows)
+
+    def safe(self):
+        """
+        States while no hand is tracked.
+        """
+        return "SAFE", dict.fromkeys(self.names, "SAFE")
+
+    def update(self, distances, geometry):
+        """
+        Advance every zone's state (see ZoneStates.update).
+        """
+        codes = self.bank.step(self.rows, distances, 0.0, geometry.warning_band, geometry.hysteresis)
+        return self.states(codes)
+
+    def states(self, codes):
+        """
+        (most severe state, {zone name: state}) for the zones' state codes.
+        """
+        codes = codes.tolist()
+        return STATES[max(codes)], {name: STATES[code] for name, code in zip(self.names, codes)}
+
+
+def update_zone_states(zone_states, distances, geometries):
+    """
+    Advance the zone states of several streams; streams sharing a StateBank
+    are advanced together in one step.
+    Args:
+        zone_states (list): ZoneStates or BankedZoneStates per stream.
+        distances (list): Per-zone distances per stream, or None for streams without a hand.
+        geometries (list): FrameGeometry per stream.
+    Returns:
+        list: (most severe state, {zone name: state}) per stream.
+    """
+    results = [None] * len(zone_states)
+    banked = {}
+    for i, (states, zone_distances, geometry) in enumerate(zip(zone_states, distances, geometries)):
+        if zone_distances is None:
+            results[i] = states.safe()
+        elif isinstance(states, BankedZoneStates):
+            banked.setdefault(id(states.bank), []).append(i)
+        else:
+            results[i] = states.update(zone_distances, geometry)
+
+    for members in banked.values():
+        bank = zone_states[members[0]].bank
+        sizes = [len(zone_states[i].rows) for i in members]
+        rows = np.concatenate([zone_states[i].rows for i in members])
+        values = np.concatenate([distances[i] for i in members])
+        bands = np.repeat([geometries[i].warning_band for i in members], sizes)
+        hystereses = np.repeat([geometries[i].hysteresis for i in members], sizes)
+        codes = bank.step(rows, values, 0.0, bands, hystereses)
+        for i, part in zip(members, np.split(codes, np.cumsum(sizes)[:-1])):
+            results[i] = zone_states[i].states(part)
+    return results
+
+
+@lru_cache(maxsize=None)
+def shared_smoothing_bank():
+    """
+    SmoothingBank shared by the pipelines of this process.
+    """
+    return SmoothingBank()
+
+
+@lru_cache(maxsize=None)
+def shared_state_bank():
+    """
+    StateBank shared by the pipelines of this process.
+    """
+    return StateBank()
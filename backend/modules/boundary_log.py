@@ -0,0 +1,327 @@
+import csv
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from config.config import LOG_BUFFER_RECORDS, LOG_FLUSH_INTERVAL
+from modules.distance_logic import STATES
+
+META_FILE = "meta.json"
+# Columns of a boundary log, in the order of the CSV schema of logs/boundary_log_*.csv
+COLUMNS = (
+    ("frame_index", "<i8"),
+    ("raw_x", "<f4"),  # NaN without a hand
+    ("raw_y", "<f4"),
+    ("smoothed_x", "<f4"),
+    ("smoothed_y", "<f4"),
+    ("state_raw", "i1"),  # Index into STATES, -1 without a hand
+    ("state_smoothed", "i1"),
+    ("timestamp", "<f8"),  # Seconds since the epoch
+)
+FIELDS = tuple(name for name, _ in COLUMNS)
+RECORD_DTYPE = np.dtype(list(COLUMNS))
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def column_path(path, name, dtype):
+    """
+    File of one column in a log directory, e.g. raw_x.f4.
+    """
+    return os.path.join(path, f"{name}.{np.dtype(dtype).str[1:]}")
+
+
+def instant_state(distance, warning_band):
+    """
+    State of a single frame, without hysteresis or debounce (see DistanceLogic).
+    Args:
+        distance (float): Signed distance to the nearest hazard zone, or None.
+        warning_band (float): Width of the warning band in pixels.
+    """
+    if distance is None:
+        return None
+    if distance <= 0.0:
+        return "DANGER"
+    return "WARNING" if distance <= warning_band else "SAFE"
+
+
+class BoundaryLogger:
+    def __init__(self, path, capacity=LOG_BUFFER_RECORDS):
+        """
+        Per-frame log of a pipeline's raw and smoothed boundary points and states.
+        log() only fills the next slot of a preallocated ring buffer; the shared
+        LogFlusher thread copies the filled slots, in batches, to one memory-mapped
+        file per column. If the flusher falls a whole buffer behind, records are
+        dropped (and counted) rather than making the caller wait.
+        Args:
+            path (str): Directory of the log (created if needed).
+            capacity (int): Records the ring buffer holds.
+        """
+        self.path = path
+        self.ring = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.capacity = capacity
+        self.written = 0  # Records put in the ring (advanced by the caller only)
+        self.flushed = 0  # Records copied to disk (advanced by the flusher only)
+        self.dropped = 0
+        self.count = 0  # Records in the files
+        self.allocated = 0  # Records the column files have room for
+        self.columns = {}
+        self.closed = False
+        self.lock = threading.Lock()  # Serializes flushes from the flusher and close()
+        os.makedirs(path, exist_ok=True)
+        for name, dtype in COLUMNS:
+            open(column_path(path, name, dtype), "wb").close()
+        self._write_meta()
+        shared_flusher().register(self)
+
+    def log(self, raw_point, smoothed_point, state_raw, state_smoothed, timestamp=None):
+        """
+        Append one frame's record.
+        Args:
+            raw_point (tuple): Boundary point before smoothing, or None.
+            smoothed_point (tuple): Smoothed boundary point, or None.
+            state_raw (str): State of this frame alone, or None.
+            state_smoothed (str): Debounced state, or None.
+            timestamp (float): Seconds since the epoch; defaults to now.
+        """
+        index = self.written
+        if self.closed:
+            return
+        if index - self.flushed >= self.capacity:
+            self.dropped += 1
+            return
+        nan = np.nan
+        self.ring[index % self.capacity] = (
+            index,
+            nan if raw_point is None else raw_point[0],
+            nan if raw_point is None else raw_point[1],
+            nan if smoothed_point is None else smoothed_point[0],
+            nan if smoothed_point is None else smoothed_point[1],
+            STATES.index(state_raw) if state_raw is not None else -1,
+            STATES.index(state_smoothed) if state_smoothed is not None else -1,
+            time.time() if timestamp is None else timestamp,
+        )
+        self.written = index + 1  # Publish the slot to the flusher
+        if self.written - self.flushed >= self.capacity // 2:
+            shared_flusher().wake()
+
+    def flush(self):
+        """
+        Copy the records logged since the last flush to the column files.
+        Returns:
+            int: Records written.
+        """
+        with self.lock:
+            start, end = self.flushed, self.written
+            if end == start or self.allocated < 0:
+                return 0
+            self._reserve(self.count + end - start)
+            first, last = start % self.capacity, end % self.capacity
+            parts = [self.ring[first:last]] if first < last else [self.ring[first:], self.ring[:last]]
+            for part in parts:
+                for name, column in self.columns.items():
+                    column[self.count:self.count + len(part)] = part[name]
+                self.count += len(part)
+            self.flushed = end  # The slots can be reused
+            self._write_meta()
+            return end - start
+
+    def _reserve(self, count):
+        """
+        Grow the column files (doubling) so they hold count records.
+        """
+        if count <= self.allocated:
+            return
+        self.allocated = max(count, 2 * self.allocated, self.capacity)
+        self.columns = {}
+        for name, dtype in COLUMNS:
+            filename = column_path(self.path, name, dtype)
+            with open(filename, "r+b") as f:
+                f.truncate(self.allocated * np.dtype(dtype).itemsize)
+            self.columns[name] = np.memmap(filename, dtype=dtype, mode="r+", shape=(self.allocated,))
+
+    def close(self):
+        """
+        Flush the remaining records and trim the column files to them.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        shared_flusher().unregister(self)
+        self.flush()
+        with self.lock:
+            for column in self.columns.values():
+                column.flush()
+            self.columns = {}
+            for name, dtype in COLUMNS:
+                with open(column_path(self.path, name, dtype), "r+b") as f:
+                    f.truncate(self.count * np.dtype(dtype).itemsize)
+            self.allocated = -1  # Nothing more is written
+            self._write_meta()
+
+    def _write_meta(self):
+        meta = {"columns": [[name, dtype] for name, dtype in COLUMNS], "count": self.count, "dropped": self.dropped}
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LogFlusher:
+    def __init__(self, interval=LOG_FLUSH_INTERVAL):
+        """
+        Background thread flushing every open BoundaryLogger, every `interval`
+        seconds or as soon as one of them has half its buffer filled.
+        Args:
+            interval (float): Seconds between flushes.
+        """
+        self.interval = interval
+        self.loggers = weakref.WeakSet()
+        self.event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def register(self, logger):
+        with self.lock:
+            self.loggers.add(logger)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="boundary-log-flusher", daemon=True)
+                self.thread.start()
+
+    def unregister(self, logger):
+        with self.lock:
+            self.loggers.discard(logger)
+
+    def wake(self):
+        self.event.set()
+
+    def _run(self):
+        while True:
+            self.event.wait(self.interval)
+            self.event.clear()
+            with self.lock:
+                loggers = list(self.loggers)
+            for logger in loggers:
+                try:
+                    logger.flush()
+                except OSError as e:
+                    print(f"Boundary log flush failed ({logger.path}): {e}")
+
+
+@lru_cache(maxsize=None)
+def shared_flusher():
+    """
+    LogFlusher shared by the loggers of this process.
+    """
+    return LogFlusher()
+
+
+class BoundaryLog:
+    def __init__(self, columns):
+        """
+        Boundary log records as one array per column (see COLUMNS).
+        Args:
+            columns (dict): Column name -> array, all of the same length.
+        """
+        self.columns = columns
+        self.count = len(columns["frame_index"])
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def points(self, kind="smoothed"):
+        """
+        (N, 2) float points, NaN where there was no hand.
+        Args:
+            kind (str): "raw" or "smoothed".
+        """
+        return np.stack([self.columns[f"{kind}_x"], self.columns[f"{kind}_y"]], axis=1).astype(np.float64)
+
+    def states(self, kind="smoothed"):
+        """
+        State names (None without a hand).
+        Args:
+            kind (str): "raw" or "smoothed".
+        """
+        return [STATES[code] if code >= 0 else None for code in self.columns[f"state_{kind}"].tolist()]
+
+
+def read_log(path):
+    """
+    Memory-mapped, read-only view of a log directory written by BoundaryLogger.
+    Logs that were not closed are readable up to their last flush.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    count = meta["count"]
+    columns = {}
+    for name, dtype in meta["columns"]:
+        filename = column_path(path, name, dtype)
+        columns[name] = np.memmap(filename, dtype=dtype, mode="r", shape=(count,)) if count else np.empty(0, dtype)
+    return BoundaryLog(columns)
+
+
+def export_csv(log, path):
+    """
+    Write a log in the CSV schema of logs/boundary_log_*.csv (empty fields without a hand).
+    Args:
+        log (BoundaryLog): Log to export.
+        path (str): CSV file to write.
+    """
+    raw, smoothed = log.points("raw"), log.points("smoothed")
+    state_raw, state_smoothed = log.states("raw"), log.states("smoothed")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i, (frame_index, timestamp) in enumerate(zip(log["frame_index"].tolist(), log["timestamp"].tolist())):
+            writer.writerow([frame_index, _field(raw[i, 0], int), _field(raw[i, 1], int),
+                             _field(smoothed[i, 0]), _field(smoothed[i, 1]),
+                             state_raw[i] or "", state_smoothed[i] or "",
+                             datetime.fromtimestamp(timestamp).strftime(TIMESTAMP_FORMAT)])
+
+
+def _field(value, cast=None):
+    """
+    CSV field of a coordinate: empty for NaN, raw points as ints, smoothed ones as floats.
+    """
+    if np.isnan(value):
+        return ""
+    return cast(value) if cast is not None else round(float(value), 2)
+
+
+def load_csv(path):
+    """
+    Read a CSV boundary log (logs/boundary_log_*.csv or export_csv output).
+    Returns:
+        BoundaryLog: The records, with NaN points and -1 states for empty fields.
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    for i, row in enumerate(rows):
+        records[i] = (
+            int(row["frame_index"]),
+            *(float(row[name]) if row[name] else np.nan for name in ("raw_x", "raw_y", "smoothed_x", "smoothed_y")),
+            *(STATES.index(row[name]) if row[name] else -1 for name in ("state_raw", "state_smoothed")),
+            datetime.fromisoformat(row["timestamp"]).timestamp(),
+        )
+    return BoundaryLog({name: records[name] for name in FIELDS})
+
+
+if __name__ == "__main__":
+    # Export a log directory to CSV: python -m modules.boundary_log LOG_DIR [CSV]
+    import sys
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.join(source, "boundary_log.csv")
+    export_csv(read_log(source), target)
+    print(f"Wrote {target}")
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class BufferArena:
+    def __init__(self):
+        """
+        Named scratch buffers reused from frame to frame.
+        Each name owns one block of memory that only grows, so a buffer can be
+        requested in whatever shape the current frame needs (ROI crops change size
+        every frame) without allocating once the largest size has been seen.
+        Buffers are handed out as contiguous views, ready for OpenCV dst= arguments
+        and NumPy out= arguments. A buffer's contents are only valid until the same
+        name is requested again.
+        """
+        self.blocks = {}  # name -> flat uint8 block
+        self.allocations = 0  # Blocks created or grown, for diagnostics
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Return the buffer `name` as an uninitialized array of the given shape and dtype.
+        Args:
+            name (str): Buffer name; one live buffer per name.
+            shape (tuple): Array shape.
+            dtype (numpy.dtype): Element type.
+        Returns:
+            numpy.ndarray: Contiguous view into the arena.
+        """
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize
+        for n in shape:
+            size *= n
+        block = self.blocks.get(name)
+        if block is None or block.size < size:
+            # Leave some room so slowly growing ROIs do not reallocate every frame
+            block = self.blocks[name] = np.empty(max(size + size // 4, 64), dtype=np.uint8)
+            self.allocations += 1
+        return block[:size].view(dtype).reshape(shape)
+
+    def nbytes(self):
+        """
+        Total bytes held by the arena.
+        """
+        return sum(block.size for block in self.blocks.values())
+
+    def clear(self):
+        """
+        Release all buffers.
+        """
+        self.blocks = {}
@@ -1,32 +1,36 @@
 import cv2
+from config.config import FRAME_WIDTH, FRAME_HEIGHT, CAPTURE_SOURCE
+from modules.capture import ThreadedCapture, open_source
 
 class Camera:
-    def __init__(self, width=640, height=480):
+    def __init__(self, width=FRAME_WIDTH, height=FRAME_HEIGHT, source=CAPTURE_SOURCE, drop_stale=True):
         """
-        Initialize the camera with the given frame width and height.
+        Initialize the camera (or another frame source) with the given frame width and height.
+        Frames are grabbed on a background thread (see ThreadedCapture), so
+        get_frame returns the newest frame without waiting for the device.
+        Args:
+            width (int): Frame width requested from the device.
+            height (int): Frame height requested from the device.
+            source (str): Camera index, video file, image directory, frame store or "synthetic" (see open_source).
+            drop_stale (bool): Keep only the newest frame (False delivers every frame of file sources).
         """
         self.width = width
         self.height = height
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.capture = ThreadedCapture(open_source(source, width, height), drop_stale)
 
     def get_frame(self):
         """
-        Capture a single frame from the webcam.
+        Take the newest frame from the camera (or other source).
         Returns:
-            frame (numpy.ndarray): The captured frame.
+            frame (numpy.ndarray): The captured frame, or None once a file or synthetic source has ended.
         """
-        ret, frame = self.cap.read()
-        if not ret:
-            raise RuntimeError("Failed to capture frame from camera.")
-        return frame
+        return self.capture.read()
 
     def release(self):
         """
         Release the camera resource.
         """
-        self.cap.release()
+        self.capture.release()
 
 if __name__ == "__main__":
     # Test the camera module
@@ -34,10 +38,12 @@ if __name__ == "__main__":
     try:
         while True:
             frame = camera.get_frame()
+            if frame is None:
+                break
             cv2.imshow("Webcam Feed", frame)
 
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
     finally:
         camera.release()
-        cv2.destroyAllWindows()
\ No newline at end of file
+        cv2.destroyAllWindows()
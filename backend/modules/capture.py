@@ -0,0 +1,276 @@
+import glob
+import os
+import threading
+import time
+import cv2
+from config.config import FRAME_WIDTH, FRAME_HEIGHT, CAPTURE_SOURCE, CAPTURE_FPS
+from modules.frame_store import FrameStore, META_FILE
+from modules.synthetic import SyntheticHandSource
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+class FrameSource:
+    """
+    A stream of BGR frames. read() returns the next frame, or None at the end.
+    fps is the rate the frames were taken at (None for live sources, which
+    deliver frames at their own pace).
+    """
+    fps = None
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class DeviceSource(FrameSource):
+    def __init__(self, index=0, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+        """
+        A camera device.
+        Args:
+            index (int): OpenCV device index.
+            width (int): Requested frame width.
+            height (int): Requested frame height.
+        """
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera device {index}.")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            raise RuntimeError("Failed to capture frame from camera.")
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoSource(FrameSource):
+    def __init__(self, path, loop=False):
+        """
+        A video file.
+        Args:
+            path (str): Video file.
+            loop (bool): Start over at the end.
+        """
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video {path}.")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or CAPTURE_FPS
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, path, fps=CAPTURE_FPS, loop=False):
+        """
+        The images of a directory, in file name order.
+        Args:
+            path (str): Directory.
+            fps (float): Rate the images are played at.
+            loop (bool): Start over at the end.
+        """
+        self.files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise RuntimeError(f"No images in {path}.")
+        self.fps = fps
+        self.loop = loop
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.files):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = cv2.imread(self.files[self.index], cv2.IMREAD_COLOR)
+        self.index += 1
+        return frame
+
+
+class FrameStoreSource(FrameSource):
+    def __init__(self, path, loop=False):
+        """
+        A frame store recorded with FrameRecorder (memory-mapped, no decoding),
+        played at the rate it was recorded at.
+        Args:
+            path (str): Directory of the store.
+            loop (bool): Start over at the end.
+        """
+        self.store = FrameStore(path)
+        if not len(self.store):
+            raise RuntimeError(f"Frame store {path} is empty.")
+        timestamps = self.store.timestamps
+        duration = timestamps[-1] - timestamps[0] if len(timestamps) > 1 else 0.0
+        self.fps = (len(timestamps) - 1) / duration if duration > 0 else CAPTURE_FPS
+        self.loop = loop
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.store):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = self.store[self.index].copy()  # The store is mapped read-only; overlays draw on the frame
+        self.index += 1
+        return frame
+
+
+class SyntheticSource(FrameSource):
+    def __init__(self, width=FRAME_WIDTH, height=FRAME_HEIGHT, count=None, hands=1, fps=CAPTURE_FPS, seed=0):
+        """
+        Frames from SyntheticHandSource, so the pipeline runs without a camera.
+        Args:
+            width (int): Frame width.
+            height (int): Frame height.
+            count (int): Number of frames (None for endless).
+            hands (int): Number of moving blobs.
+            fps (float): Rate the frames are played at.
+            seed (int): Random seed.
+        """
+        self.generator = SyntheticHandSource(width, height, count=count, hands=hands, seed=seed)
+        self.frames = iter(self.generator)
+        self.fps = fps
+
+    def read(self):
+        return next(self.frames, None)
+
+
+def open_source(spec=CAPTURE_SOURCE, width=FRAME_WIDTH, height=FRAME_HEIGHT, loop=False):
+    """
+    Open a frame source from a --source argument.
+    Args:
+        spec (str|int): A camera index ("0"), "synthetic" or "synthetic:<frames>",
+            a frame store directory, a directory of images, or a video file.
+        width (int): Frame size requested from cameras and generated synthetically.
+        height (int): See width.
+        loop (bool): Restart file sources at their end.
+    Returns:
+        FrameSource: The source.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return DeviceSource(int(spec), width, height)
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        count = spec.partition(":")[2]
+        return SyntheticSource(width, height, count=int(count) if count else None)
+    if os.path.isdir(spec):
+        if os.path.exists(os.path.join(spec, META_FILE)):
+            return FrameStoreSource(spec, loop)
+        return ImageDirectorySource(spec, loop=loop)
+    if os.path.isfile(spec):
+        return VideoSource(spec, loop)
+    raise ValueError(f"Unknown frame source: {spec}")
+
+
+class ThreadedCapture:
+    def __init__(self, source, drop_stale=True):
+        """
+        Read a frame source on a background thread, so capture overlaps processing.
+        With drop_stale, the grabber keeps only the newest frame: a frame that is
+        not taken before the next one arrives is dropped, and file sources are
+        played at their frame rate, as a camera would deliver them. Without it,
+        every frame is delivered (one is read ahead) and file sources run as fast
+        as they are consumed.
+        Args:
+            source (FrameSource): Source to read.
+            drop_stale (bool): Keep only the newest frame.
+        """
+        self.source = source
+        self.drop_stale = drop_stale
+        self.condition = threading.Condition()
+        self.frame = None  # Newest frame not yet taken
+        self.sequence = 0  # Frames captured so far
+        self.dropped = 0  # Frames replaced before they were taken
+        self.ended = False
+        self.error = None
+        self.running = True
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._grab, name="capture", daemon=True)
+        self.thread.start()
+
+    def _grab(self):
+        interval = 1.0 / self.source.fps if self.drop_stale and self.source.fps else 0.0
+        next_time = time.perf_counter()
+        try:
+            while self.running:
+                if interval:
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_time = max(next_time + interval, time.perf_counter() - interval)
+                frame = self.source.read()
+                with self.condition:
+                    if frame is None:
+                        break
+                    if not self.drop_stale:
+                        while self.frame is not None and self.running:
+                            self.condition.wait()
+                    elif self.frame is not None:
+                        self.dropped += 1
+                    self.frame = frame
+                    self.sequence += 1
+                    self.condition.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.ended = True
+                self.condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Wait for and take the newest frame.
+        Args:
+            timeout (float): Longest wait in seconds (None waits until a frame comes or the source ends).
+        Returns:
+            numpy.ndarray: The frame, or None at the end of the source (or on timeout).
+        Raises:
+            RuntimeError: If the source failed.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.frame is not None or self.ended, timeout):
+                return None
+            frame, self.frame = self.frame, None
+            self.condition.notify_all()
+        if frame is None and self.error is not None:
+            raise RuntimeError(f"Frame source failed: {self.error}")
+        return frame
+
+    def stats(self):
+        """
+        Frames captured and dropped so far, the capture rate and the frames waiting (0 or 1).
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {"captured": self.sequence, "dropped": self.dropped, "fps": self.sequence / elapsed,
+                "queue": int(self.frame is not None)}
+
+    def release(self):
+        """
+        Stop the grabber and release the source.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=2.0)
+        self.source.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -1,15 +1,41 @@
 import numpy as np
-from config.config import THRESHOLD_SAFE, THRESHOLD_WARNING, CIRCLE_RADIUS, WARNING_BAND, DEBOUNCE_FRAMES
+from collections import deque
+from config.config import THRESHOLD_SAFE, THRESHOLD_WARNING, DEBOUNCE_FRAMES, FRAME_WIDTH, FRAME_HEIGHT
+from modules.geometry import frame_geometry
+
+STATES = ("SAFE", "WARNING", "DANGER")  # In order of severity
+SEVERITY = {state: level for level, state in enumerate(STATES)}
 
 class DistanceLogic:
-    def __init__(self):
+    def __init__(self, geometry=None):
         """
         Initialize the DistanceLogic with predefined thresholds.
+        Args:
+            geometry (FrameGeometry): Pixel geometry of the frames; defaults to FRAME_WIDTH x FRAME_HEIGHT.
         """
         self.threshold_safe = THRESHOLD_SAFE
         self.threshold_warning = THRESHOLD_WARNING
         self.debounce_frames = DEBOUNCE_FRAMES
-        self.state_history = []
+        self.state_history = deque(maxlen=self.debounce_frames)
+        self.set_geometry(geometry or frame_geometry(FRAME_WIDTH, FRAME_HEIGHT))
+
+    def set_geometry(self, geometry, radius=None):
+        """
+        Use the circle radius, warning band and hysteresis of a frame size (distances are in its pixels).
+        Args:
+            geometry (FrameGeometry): Geometry of the frame size.
+            radius (float): Distance at which DANGER starts; defaults to the circle radius
+                (0 for signed distances to a hazard zone's edge).
+        """
+        self.radius = geometry.radius if radius is None else radius
+        self.warning_band = geometry.warning_band
+        self.hysteresis = geometry.hysteresis
+
+    def reset(self):
+        """
+        Clear the debounce history so the logic can be reused.
+        """
+        self.state_history.clear()
 
     def calculate_distance(self, point1, point2):
         """
@@ -34,7 +60,9 @@ class DistanceLogic:
             return "SAFE"
 
         # Hysteresis buffer to prevent flickering
-        hysteresis = 5
+        hysteresis = self.hysteresis
+        radius = self.radius
+        warning_band = self.warning_band
 
         # Get the last state (or default to SAFE)
         current_state = self.state_history[-1] if self.state_history else "SAFE"
@@ -42,30 +70,30 @@ class DistanceLogic:
         new_state = current_state
 
         if current_state == "SAFE":
-            if distance <= CIRCLE_RADIUS:
+            if distance <= radius:
                 new_state = "DANGER"
-            elif distance <= CIRCLE_RADIUS + WARNING_BAND:
+            elif distance <= radius + warning_band:
                 new_state = "WARNING"
         
         elif current_state == "WARNING":
-            if distance <= CIRCLE_RADIUS:
+            if distance <= radius:
                 new_state = "DANGER"
-            elif distance > CIRCLE_RADIUS + WARNING_BAND + hysteresis:
+            elif distance > radius + warning_band + hysteresis:
                 new_state = "SAFE"
         
         elif current_state == "DANGER":
-            if distance > CIRCLE_RADIUS + hysteresis:
-                if distance <= CIRCLE_RADIUS + WARNING_BAND + hysteresis:
+            if distance > radius + hysteresis:
+                if distance <= radius + warning_band + hysteresis:
                     new_state = "WARNING"
                 else:
                     new_state = "SAFE"
 
         self.state_history.append(new_state)
-        if len(self.state_history) > self.debounce_frames:
-            self.state_history.pop(0)
 
         # Debounce logic: return the most frequent state in the last N frames
-        return max(set(self.state_history), key=self.state_history.count)
+        # (on a tie, the more severe one, so the result does not depend on set order)
+        history = self.state_history
+        return max(STATES, key=lambda state: (history.count(state), SEVERITY[state]))
 
 if __name__ == "__main__":
     # Test the DistanceLogic module
@@ -0,0 +1,241 @@
+import cv2
+import numpy as np
+from config.config import SEGMENTATION_MODE, FLOW_DETECT_INTERVAL, FLOW_MIN_CONFIDENCE, FLOW_MAX_POINTS, FLOW_MIN_POINTS
+from modules.hand_tracking import HandTracker
+
+
+class FlowTracker(HandTracker):
+    def __init__(self, segmentation_mode=SEGMENTATION_MODE, detect_interval=FLOW_DETECT_INTERVAL,
+                 min_confidence=FLOW_MIN_CONFIDENCE, max_points=FLOW_MAX_POINTS, min_points=FLOW_MIN_POINTS):
+        """
+        Hand tracker that runs the full detection only every few frames.
+        After a detection, the corners of the hand's outline are picked as features
+        in a grayscale crop around the hand. On the frames in between they are followed
+        with sparse pyramidal Lucas-Kanade optical flow (checked forwards and
+        backwards), a similarity transform is fitted to them with RANSAC, and the
+        last contour and hull are moved along. The moved outline is re-checked by
+        sampling the skin mask just inside it. The crop stays in place until the
+        next detection, which runs after `detect_interval` frames, or at once when
+        the confidence (share of consistently tracked features, and share of skin
+        samples) drops below `min_confidence`.
+        Args:
+            segmentation_mode (str): Skin segmentation used by the full detections.
+            detect_interval (int): Frames per full detection (1 disables optical flow).
+            min_confidence (float): Lowest confidence at which a propagated outline is kept.
+            max_points (int): Features tracked per hand.
+            min_points (int): Fewest consistently tracked features needed to fit the motion.
+        """
+        super().__init__(segmentation_mode)
+        self.detect_interval = detect_interval
+        self.min_confidence = min_confidence
+        self.max_points = max_points
+        self.min_points = min_points
+        self.lk_params = dict(winSize=(11, 11), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.flow_margin = 0.1  # Room around the hand for it to move in until the next detection (fraction of width)
+        self.max_flow_error = 1.0  # Largest forward-backward error (processing pixels) of a kept feature
+        self.skin_samples = 16  # Outline points whose inside is checked for skin
+        self.corner_tolerance = 0.01  # approxPolyDP tolerance picking the outline corners (fraction of width)
+        self.since_detection = 0  # Frames propagated since the last full detection
+        self.confidence = 0.0  # Confidence of the last propagated frame
+        # Counters for error reporting
+        self.detections = 0
+        self.propagated = 0
+        self.rejected = 0
+        self.clear_flow()
+
+    def reset(self):
+        """
+        Drop all per-stream tracking state, including the optical flow state.
+        """
+        super().reset()
+        self.since_detection = 0
+        self.confidence = 0.0
+        self.clear_flow()
+
+    def clear_flow(self):
+        """
+        Forget the features, so the next frame gets a full detection.
+        """
+        self.flow_region = None  # (x, y, w, h) of the flow crop in global coordinates
+        self.flow_key = None  # (scale, frame_scale) the crop was taken at
+        self.flow_reference = None  # Grayscale crop of the previous frame
+        self.flow_points = None  # (N, 1, 2) float32 features in crop coordinates
+        self.flow_contour = None  # Last outline in global coordinates (float32, no rounding drift)
+        self.flow_hull = None
+
+    def stats(self):
+        """
+        Full detections, propagated frames and rejected propagations so far.
+        """
+        frames = self.detections + self.propagated
+        return {
+            "detections": self.detections,
+            "propagated": self.propagated,
+            "rejected": self.rejected,
+            "propagated_rate": self.propagated / frames if frames else 0.0,
+        }
+
+    def track(self, frame, frame_scale=1.0):
+        """
+        Propagate the last outline with optical flow, or run a full detection when
+        one is due or the propagation is not trustworthy.
+        """
+        if self.flow_points is not None and self.since_detection + 1 < self.detect_interval:
+            result = self.propagate(frame, frame_scale)
+            if result is not None:
+                self.since_detection += 1
+                self.propagated += 1
+                return result
+
+        result = self.detect_full(frame, frame_scale)
+        self.since_detection = 0
+        self.detections += 1
+        self.profiler.count("detections")
+        self.start_flow(frame, frame_scale, result[0], result[1])
+        return result
+
+    def gray_region(self, frame, frame_scale, region):
+        """
+        Grayscale crop of a global region at the processing scale.
+        Returns:
+            tuple: (crop, (x, y) offset of the crop in global coordinates)
+        """
+        h_frame, w_frame = frame.shape[:2]
+        x, y, w, h = region
+        x0, y0 = max(0, int(x * frame_scale)), max(0, int(y * frame_scale))
+        x1 = min(w_frame, int(np.ceil((x + w) * frame_scale)))
+        y1 = min(h_frame, int(np.ceil((y + h) * frame_scale)))
+        crop = frame[y0:y1, x0:x1]
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY, dst=self.arena.get("flow_gray", crop.shape[:2]))
+        factor = self.scale / frame_scale
+        if factor != 1.0:
+            h, w = gray.shape
+            small = self.arena.get("flow_small", (max(1, round(h * factor)), max(1, round(w * factor))))
+            gray = cv2.resize(gray, None, dst=small, fx=factor, fy=factor, interpolation=cv2.INTER_LINEAR)
+        return gray, (x0 / frame_scale, y0 / frame_scale)
+
+    def start_flow(self, frame, frame_scale, contour, hull):
+        """
+        Pick the features to follow after a full detection: the corners of the hand's outline.
+        """
+        self.clear_flow()
+        if contour is None or self.roi is None or self.detect_interval <= 1:
+            return
+        x, y, w, h = cv2.boundingRect(contour)
+        margin = int(round(self.flow_margin * self.geometry.width))
+        region = (max(0, x - margin), max(0, y - margin), w + 2 * margin, h + 2 * margin)
+        gray, offset = self.gray_region(frame, frame_scale, region)
+        if gray.size == 0:
+            return
+
+        # The outline's corners (fingertips, valleys) have texture in both directions,
+        # which is what Lucas-Kanade needs; no corner search over the crop is necessary
+        corners = cv2.approxPolyDP(contour, self.corner_tolerance * self.geometry.width, True).reshape(-1, 2)
+        if len(corners) > self.max_points:
+            corners = corners[np.linspace(0, len(corners) - 1, self.max_points).astype(np.intp)]
+        points = ((corners - offset) * self.scale).astype(np.float32).reshape(-1, 1, 2)
+        self.profiler.lap("flow_features")
+        if len(points) < self.min_points:
+            return
+
+        self.flow_region = region
+        self.flow_key = (self.scale, frame_scale)
+        self.flow_reference = self.arena.get("flow_reference", gray.shape)
+        np.copyto(self.flow_reference, gray)
+        self.flow_points = points
+        self.flow_contour = contour.astype(np.float32)
+        self.flow_hull = hull.astype(np.float32)
+
+    def propagate(self, frame, frame_scale):
+        """
+        Move the last outline to this frame with optical flow.
+        Returns:
+            tuple: (global_contour, hull, smoothed_point), or None if a full detection is needed.
+        """
+        profiler = self.profiler
+        if self.flow_key != (self.scale, frame_scale):
+            return None  # Processing or decode scale changed since the features were picked
+        gray, offset = self.gray_region(frame, frame_scale, self.flow_region)
+        if gray.shape != self.flow_reference.shape:
+            return None
+        profiler.lap("flow_crop")
+
+        # Forward and backward flow; features that do not come back to where they started are dropped
+        previous = self.flow_points
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self.flow_reference, gray, previous, None, **self.lk_params)
+        back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.flow_reference, points, None, **self.lk_params)
+        error = np.abs(previous - back).reshape(-1, 2).max(axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (error < self.max_flow_error)
+        profiler.lap("optical_flow")
+        if np.count_nonzero(good) < self.min_points:
+            return self.reject()
+
+        motion, inliers = cv2.estimateAffinePartial2D(previous[good], points[good], method=cv2.RANSAC,
+                                                      ransacReprojThreshold=2.0)
+        if motion is None:
+            return self.reject()
+        inliers = inliers.ravel().astype(bool)
+        tracked = np.count_nonzero(inliers) / len(previous)
+
+        # The motion was fitted in crop pixels; express it in global coordinates
+        linear = motion[:, :2]
+        origin = np.asarray(offset, dtype=np.float64)
+        to_global = np.empty((2, 3), dtype=np.float64)
+        to_global[:, :2] = linear
+        to_global[:, 2] = origin + motion[:, 2] / self.scale - linear @ origin
+        contour_f = cv2.transform(self.flow_contour, to_global)
+        hull_f = cv2.transform(self.flow_hull, to_global)
+        contour = np.rint(contour_f).astype(np.int32)
+        profiler.lap("flow_transform")
+
+        skin = self.skin_fraction(frame, frame_scale, contour_f)
+        profiler.lap("flow_check")
+        self.confidence = min(tracked, skin)
+        if self.confidence < self.min_confidence:
+            return self.reject()
+
+        self.flow_reference = self.arena.get("flow_reference", gray.shape)
+        np.copyto(self.flow_reference, gray)
+        self.flow_points = points[good][inliers].reshape(-1, 1, 2)
+        self.flow_contour = contour_f
+        self.flow_hull = hull_f
+        if len(self.flow_points) < self.min_points:
+            self.since_detection = self.detect_interval  # Too few features left: detect next frame
+
+        closest_point = self.get_closest_boundary_point(contour)
+        self.last_point = closest_point
+        smoothed_point = self.smoother.smooth(closest_point)
+        self.update_roi(contour)
+        profiler.lap("smoothing")
+        profiler.count("propagated")
+        return contour, np.rint(hull_f).astype(np.int32), smoothed_point
+
+    def reject(self):
+        """
+        Count a propagation that was not trusted; the caller falls back to a full detection.
+        """
+        self.rejected += 1
+        self.profiler.count("flow_rejected")
+        self.clear_flow()
+        return None
+
+    def skin_fraction(self, frame, frame_scale, contour):
+        """
+        Share of points just inside the outline whose color passes the skin test.
+        """
+        points = contour.reshape(-1, 2)
+        step = max(1, len(points) // self.skin_samples)
+        samples = points[::step]
+        # Pull the samples a little towards the hand's center
+        center = points.mean(axis=0)
+        direction = center - samples
+        length = np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-6)
+        inside = samples + direction / length * (self.geometry.width * 0.01)
+
+        h_frame, w_frame = frame.shape[:2]
+        xs = np.clip(np.rint(inside[:, 0] * frame_scale).astype(np.intp), 0, w_frame - 1)
+        ys = np.clip(np.rint(inside[:, 1] * frame_scale).astype(np.intp), 0, h_frame - 1)
+        pixels = np.ascontiguousarray(frame[ys, xs].reshape(1, -1, 3))
+        mask = self.segment_bgr(pixels)
+        return cv2.countNonZero(mask) / mask.size
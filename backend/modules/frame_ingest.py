@@ -0,0 +1,189 @@
+import asyncio
+import struct
+import cv2
+import numpy as np
+
+ENCODED = "jpeg"  # Compressed image (JPEG, PNG, ...) read with cv2.imdecode
+RAW_FORMATS = ("bgr", "rgba", "i420")  # Uncompressed frames, each prefixed with RAW_HEADER
+SUPPORTED_FORMATS = (ENCODED,) + RAW_FORMATS
+RAW_HEADER = struct.Struct("<HH")  # width, height
+# JPEG decoders can scale the image down by 2, 4 or 8 while decoding (DCT scaling)
+REDUCED_DECODE = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+
+
+def decode_frame(data):
+    """
+    Decode an encoded image (JPEG/PNG bytes) into a BGR frame.
+    Returns:
+        numpy.ndarray: The decoded frame, or None if the data is not an image.
+    """
+    nparr = np.frombuffer(data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def reduction_factor(scale, size=None):
+    """
+    Largest decode reduction (1, 2, 4 or 8) that keeps at least `scale` of the frame size.
+    With a size, only factors dividing both sides qualify: the decoder rounds
+    other sizes up, and the client's frame size could no longer be told from
+    the decoded one.
+    """
+    for factor, _ in REDUCED_DECODE:
+        if 1.0 / factor >= scale and (size is None or (size[0] % factor == 0 and size[1] % factor == 0)):
+            return factor
+    return 1
+
+
+def jpeg_size(data):
+    """
+    Width and height from the frame header (SOF segment) of a JPEG.
+    Returns:
+        tuple: (width, height), or None if the data is not a JPEG or has no frame header.
+    """
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Segments without a length
+            i += 2
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack_from(">HH", data, i + 5)
+            return width, height
+        if marker in (0xD9, 0xDA):  # End of image or start of scan before any frame header
+            return None
+        i += 2 + length
+    return None
+
+
+def decode_scaled(data, fmt=ENCODED, scale=1.0):
+    """
+    Decode a client frame, skipping the detail a processing scale below 1 would
+    throw away anyway: JPEGs are decoded straight to a half, quarter or eighth of
+    their size, as long as that divides the size in their header. Raw frames are
+    only wrapped and converted to BGR; the tracker downsamples them after
+    cropping to the ROI.
+    Args:
+        data (bytes): Frame as sent by the client.
+        fmt (str): One of SUPPORTED_FORMATS.
+        scale (float): Processing scale the frame will be used at.
+    Returns:
+        tuple: (BGR frame or None if the data is not a valid frame,
+            frame size relative to the client's frame)
+    """
+    if fmt == ENCODED:
+        size = jpeg_size(data) if scale < 1.0 else None
+        factor = reduction_factor(scale, size) if size is not None else 1
+        if factor == 1:
+            return decode_frame(data), 1.0
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), dict(REDUCED_DECODE)[factor])
+        if frame is None:
+            return None, 1.0
+        return frame, frame.shape[1] / size[0]
+    if fmt not in RAW_FORMATS:
+        raise ValueError(f"Unknown ingest format: {fmt}")
+
+    if len(data) < RAW_HEADER.size:
+        return None, 1.0
+    width, height = RAW_HEADER.unpack_from(data)
+    pixels = np.frombuffer(data, np.uint8, offset=RAW_HEADER.size)
+    if fmt == "i420":
+        # Full-resolution luma plane followed by quarter-size U and V planes
+        if width % 2 or height % 2 or pixels.size != width * height * 3 // 2:
+            return None, 1.0
+        return cv2.cvtColor(pixels.reshape(height * 3 // 2, width), cv2.COLOR_YUV2BGR_I420), 1.0
+
+    channels = 3 if fmt == "bgr" else 4
+    if width == 0 or height == 0 or pixels.size != width * height * channels:
+        return None, 1.0
+    frame = pixels.reshape(height, width, channels)
+    if fmt == "rgba":
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    return frame, 1.0
+
+
+def encode_raw(frame, fmt):
+    """
+    Pack a BGR frame the way a client sends it in one of the RAW_FORMATS.
+    Returns:
+        bytes: RAW_HEADER followed by the pixels.
+    """
+    height, width = frame.shape[:2]
+    if fmt == "bgr":
+        pixels = frame
+    elif fmt == "rgba":
+        pixels = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+    elif fmt == "i420":
+        pixels = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+    else:
+        raise ValueError(f"Unknown raw format: {fmt}")
+    return RAW_HEADER.pack(width, height) + np.ascontiguousarray(pixels).tobytes()
+
+
+class LatestFrameSlot:
+    def __init__(self):
+        """
+        Single-slot mailbox holding only the newest undecoded frame of a session.
+        Putting a frame while another is still waiting replaces (drops) the older one,
+        so stale frames are never decoded.
+        """
+        self.data = None
+        self.received = 0  # Frames received so far
+        self.dropped = 0  # Frames replaced before they were processed
+        self.skipped = 0  # Frames taken but not processed (e.g. undecodable)
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def put(self, data):
+        """
+        Store a new frame, dropping any frame that has not been taken yet.
+        """
+        if self.data is not None:
+            self.dropped += 1
+        self.data = data
+        self.received += 1
+        self.ready.set()
+
+    async def get(self):
+        """
+        Wait for and take the newest frame.
+        Returns:
+            bytes: The frame data, or None once the slot is closed and empty.
+        """
+        while self.data is None:
+            if self.closed:
+                return None
+            self.ready.clear()
+            await self.ready.wait()
+
+        data, self.data = self.data, None
+        return data
+
+    def skip(self):
+        """
+        Count a taken frame that produced no result.
+        """
+        self.skipped += 1
+
+    def close(self):
+        """
+        Stop accepting frames and wake any waiting consumer.
+        """
+        self.closed = True
+        self.ready.set()
+
+    def stats(self):
+        """
+        Drop and skip counters reported back to the client.
+        """
+        return {"dropped": self.dropped, "skipped": self.skipped}
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+META_FILE = "meta.json"
+FRAMES_FILE = "frames.u8"
+TIMESTAMPS_FILE = "timestamps.f8"
+
+
+class FrameRecorder:
+    def __init__(self, path, width=None, height=None):
+        """
+        Append frames to an on-disk frame store (see FrameStore).
+        Frames of a different size are resized to the store's size.
+        Args:
+            path (str): Directory of the store (created if needed).
+            width (int): Frame width of the store; defaults to the first frame's.
+            height (int): Frame height of the store; defaults to the first frame's.
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.lock = threading.Lock()  # close() may come from another thread than record()
+        os.makedirs(path, exist_ok=True)
+        self.frames_file = open(os.path.join(path, FRAMES_FILE), "wb")
+        self.timestamps_file = open(os.path.join(path, TIMESTAMPS_FILE), "wb")
+        self._write_meta()
+
+    def record(self, frame, timestamp=None):
+        """
+        Append one BGR frame (ignored once the recorder is closed).
+        """
+        with self.lock:
+            if self.frames_file is None:
+                return
+            if self.width is None or self.height is None:
+                self.height, self.width = frame.shape[:2]
+                self._write_meta()
+            if frame.shape[1] != self.width or frame.shape[0] != self.height:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            self.frames_file.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+            self.timestamps_file.write(np.float64(time.time() if timestamp is None else timestamp).tobytes())
+            self.count += 1
+
+    def close(self):
+        """
+        Flush the frames and finalize the metadata.
+        """
+        with self.lock:
+            if self.frames_file is None:
+                return
+            self.frames_file.close()
+            self.timestamps_file.close()
+            self.frames_file = self.timestamps_file = None
+            self._write_meta()
+
+    def _write_meta(self):
+        meta = {"width": self.width, "height": self.height, "channels": 3, "dtype": "uint8", "count": self.count}
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameStore:
+    def __init__(self, path):
+        """
+        Read-only, memory-mapped view of a recorded frame store.
+        The store is a directory with meta.json, the raw frames (N x H x W x 3
+        uint8) and their capture timestamps (float64 seconds).
+        Args:
+            path (str): Directory of the store.
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+
+        frame_bytes = self.width * self.height * self.meta["channels"]
+        # Trust the file size over the stored count, so unfinished recordings stay readable
+        size = os.path.getsize(os.path.join(path, FRAMES_FILE))
+        self.count = size // frame_bytes
+        shape = (self.count, self.height, self.width, self.meta["channels"])
+        self.frames = np.memmap(os.path.join(path, FRAMES_FILE), dtype=np.uint8, mode="r", shape=shape) if self.count else np.empty(shape, np.uint8)
+
+        timestamps_path = os.path.join(path, TIMESTAMPS_FILE)
+        timestamps = np.fromfile(timestamps_path, dtype=np.float64) if os.path.exists(timestamps_path) else np.empty(0)
+        self.timestamps = timestamps[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.frames[index]
@@ -0,0 +1,194 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config.config import PROCESSING_EXECUTOR, PROCESSING_WORKERS, MAX_QUEUED_FRAMES, BATCH_SEGMENTATION
+from modules.frame_ingest import ENCODED, decode_scaled
+from modules.batch_scheduler import BatchScheduler
+from modules.shard_pool import ShardPool
+
+
+def process_frame_bytes(system, data, fmt=ENCODED, outline=False):
+    """
+    Decode and process one frame with the given pipeline.
+    The frame is decoded no larger than the pipeline's processing scale needs.
+    Args:
+        system (HandTrackingSystem): The session's pipeline.
+        data (bytes): Frame as sent by the client.
+        fmt (str): Ingest format agreed with the client.
+        outline (bool): Include the delta-encoded hand outline.
+    Returns:
+        dict: The pipeline result, or None if the frame could not be decoded.
+    """
+    frame, frame_scale = decode_scaled(data, fmt, system.decode_scale())
+    if frame is None:
+        return None
+    return system.process_frame_data(frame, frame_scale, outline)
+
+
+# Pipelines owned by a worker process, keyed by session id (process mode only)
+_worker_systems = {}
+
+
+def _process_in_worker(factory, session_id, data, fmt, outline):
+    system = _worker_systems.get(session_id)
+    if system is None:
+        system = _worker_systems[session_id] = factory()
+    return process_frame_bytes(system, data, fmt, outline)
+
+
+def _warm_in_worker(factory, sizes, frames):
+    from modules.startup import load_artifacts, warm_pipeline
+    load_artifacts(sizes)
+    warm_pipeline(factory(), frames)
+    return os.getpid()
+
+
+def _drop_in_worker(session_id):
+    _worker_systems.pop(session_id, None)
+
+
+class FrameWorker:
+    def __init__(self, factory, mode=PROCESSING_EXECUTOR, workers=PROCESSING_WORKERS, max_queued=MAX_QUEUED_FRAMES,
+                 batching=BATCH_SEGMENTATION):
+        """
+        Run frame decoding and processing off the event loop.
+        In thread mode frames run on the session's own pipeline in a shared thread
+        pool (OpenCV releases the GIL). In process mode each session is pinned to
+        one single-process executor that keeps the session's pipeline, so
+        stateful tracking stays in order. Shard mode also pins sessions to worker
+        processes, but decodes frames here into shared memory (see ShardPool), and
+        restarts crashed workers. With batching (thread mode only), frames from
+        different sessions are segmented together by a BatchScheduler.
+        Args:
+            factory (callable): Builds a HandTrackingSystem (process and shard modes).
+            mode (str): "thread", "process" or "shard".
+            workers (int): Number of workers; 0 uses one per CPU core.
+            max_queued (int): Maximum frames in flight across all sessions.
+            batching (bool): Segment frames from several sessions in one pass.
+        """
+        if mode not in ("thread", "process", "shard"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.factory = factory
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.slots = None  # Created lazily inside the running event loop
+        self.session_locks = {}  # session_id -> asyncio.Lock, keeps frames in order
+        self.session_futures = {}  # session_id -> set of pending futures
+        self.assignments = {}  # session_id -> process executor index
+        self.next_executor = 0
+
+        self.shards = None
+        if mode == "thread":
+            self.executors = [ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="frame")]
+        elif mode == "process":
+            self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(self.workers)]
+        else:
+            self.executors = []
+            self.shards = ShardPool(factory, self.workers)
+        self.batcher = BatchScheduler(self.executors[0]) if batching and mode == "thread" else None
+
+    async def submit(self, session, data, fmt=ENCODED, outline=False):
+        """
+        Process one frame for a session without blocking the event loop.
+        Waits while the global queue bound is reached, and runs frames of the same
+        session strictly one after another.
+        Args:
+            session (Session): The client's session.
+            data (bytes): Frame as sent by the client.
+            fmt (str): Ingest format agreed with the client.
+            outline (bool): Include the delta-encoded hand outline.
+        Returns:
+            dict: The pipeline result, or None if the frame could not be decoded or
+                the session is closed (e.g. evicted).
+        Raises:
+            asyncio.CancelledError: If the session was cancelled while waiting.
+        """
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_queued)
+        session_id = session.session_id
+        lock = self.session_locks.setdefault(session_id, asyncio.Lock())
+        loop = asyncio.get_running_loop()
+
+        async with self.slots:
+            async with lock:
+                system = session.system
+                if session.closed or system is None:
+                    return None
+                if self.batcher is not None:
+                    future = asyncio.ensure_future(self.batcher.submit(system, data, fmt, outline))
+                elif self.mode == "thread":
+                    future = loop.run_in_executor(self.executors[0], process_frame_bytes, system, data, fmt, outline)
+                elif self.shards is not None:
+                    future = asyncio.ensure_future(self.shards.submit(session_id, data, fmt, outline))
+                else:
+                    executor = self.executors[self._assign(session_id)]
+                    future = loop.run_in_executor(executor, _process_in_worker, self.factory, session_id, data, fmt, outline)
+
+                pending = self.session_futures.setdefault(session_id, set())
+                pending.add(future)
+                try:
+                    return await future
+                finally:
+                    pending.discard(future)
+
+    async def warm_up(self, sizes, frames):
+        """
+        Start every worker process and have it load the artifacts and run warm-up
+        frames (process and shard modes; thread workers share the server's warmed memory).
+        Args:
+            sizes (tuple): (width, height) frame sizes to prepare.
+            frames (list): Warm-up frame bytes (see startup.warmup_frames).
+        Returns:
+            list: Process id of each worker.
+        """
+        if self.shards is not None:
+            return await self.shards.warm_up(sizes, frames)
+        if self.mode != "process":
+            return []
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(loop.run_in_executor(executor, _warm_in_worker, self.factory, sizes, frames)
+                                      for executor in self.executors))
+
+    def cancel(self, session_id):
+        """
+        Cancel a disconnected session's queued frames and drop its worker state.
+        Frames already running finish, but their results are discarded.
+        """
+        for future in self.session_futures.pop(session_id, ()):
+            future.cancel()
+        self.session_locks.pop(session_id, None)
+
+        if self.shards is not None:
+            self.shards.drop(session_id)
+        index = self.assignments.pop(session_id, None)
+        if index is not None:
+            self.executors[index].submit(_drop_in_worker, session_id)
+
+    def shutdown(self):
+        """
+        Stop all workers, cancelling frames that have not started.
+        """
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.shards is not None:
+            self.shards.shutdown()
+
+    def stats(self):
+        """
+        Executor mode and worker count, with each shard's load in shard mode.
+        """
+        stats = {"mode": self.mode, "workers": self.workers}
+        if self.shards is not None:
+            stats["shards"] = self.shards.stats()
+        return stats
+
+    def _assign(self, session_id):
+        """
+        Pin a session to a process executor (round robin on first use).
+        """
+        index = self.assignments.get(session_id)
+        if index is None:
+            index = self.assignments[session_id] = self.next_executor
+            self.next_executor = (self.next_executor + 1) % len(self.executors)
+        return index
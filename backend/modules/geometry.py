@@ -0,0 +1,37 @@
+from functools import lru_cache
+from config.config import CIRCLE_CENTER, CIRCLE_RADIUS, WARNING_BAND, STATE_HYSTERESIS, ROI_MARGIN, MAX_DISPLACEMENT, MIN_AREA
+
+
+class FrameGeometry:
+    def __init__(self, width, height):
+        """
+        Pixel geometry of the virtual object and the tracking limits for one frame size.
+        The config is normalized: x positions and lengths scale with the frame width,
+        y positions with the frame height and areas with the frame area, so the
+        SAFE/WARNING/DANGER boundaries are the same at every resolution.
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+        """
+        self.width = width
+        self.height = height
+        self.center = (int(round(CIRCLE_CENTER[0] * width)), int(round(CIRCLE_CENTER[1] * height)))
+        self.radius = CIRCLE_RADIUS * width
+        self.warning_band = WARNING_BAND * width
+        self.hysteresis = STATE_HYSTERESIS * width
+        self.roi_margin = int(round(ROI_MARGIN * width))
+        self.max_displacement = MAX_DISPLACEMENT * width
+
+    def min_area(self, scale=1.0):
+        """
+        Minimum hand contour area in pixels of the frame processed at `scale`.
+        """
+        return MIN_AREA * self.width * self.height * scale * scale
+
+
+@lru_cache(maxsize=32)
+def frame_geometry(width, height):
+    """
+    Shared FrameGeometry for a frame size.
+    """
+    return FrameGeometry(width, height)
@@ -1,38 +1,118 @@
 import cv2
 import numpy as np
-from config.config import CIRCLE_CENTER, DOWNSAMPLE_RATIO, HSV_LOWER, HSV_UPPER, YCRCB_LOWER, YCRCB_UPPER, ROI_MARGIN, SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MAX_DISPLACEMENT, MIN_AREA, MORPH_KERNEL
+from config.config import FRAME_WIDTH, FRAME_HEIGHT, DOWNSAMPLE_RATIO, HSV_LOWER, HSV_UPPER, YCRCB_LOWER, YCRCB_UPPER, SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MORPH_KERNEL, SEGMENTATION_MODE, MOTION_GATE, MOTION_GATE_WIDTH, MOTION_THRESHOLD, MOTION_GATE_FRACTION, MOTION_GATE_MAX_SKIP
 from modules.smoothing_utils import PointSmoother
+from modules.skin_lut import shared_skin_lut
+from modules.profiler import StageProfiler
+from modules.geometry import frame_geometry
+from modules.hazard_zones import hazard_field
+from modules.buffer_arena import BufferArena
 import threading
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def morph_kernel(size=MORPH_KERNEL):
+    """
+    Elliptical structuring element for the mask cleanup, built once per process.
+    """
+    return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, size)
+
 
 class HandTracker:
-    def __init__(self):
+    def __init__(self, segmentation_mode=SEGMENTATION_MODE):
         """
         Initialize the HandTracker with pre-defined HSV ranges.
+        Args:
+            segmentation_mode (str): "threshold" (HSV + YCrCb inRange) or "lut" (precomputed lookup table).
         """
+        if segmentation_mode not in ("threshold", "lut"):
+            raise ValueError(f"Unknown segmentation mode: {segmentation_mode}")
         self.hsv_lower = np.array(HSV_LOWER, dtype=np.uint8)
         self.hsv_upper = np.array(HSV_UPPER, dtype=np.uint8)
         self.ycrcb_lower = np.array(YCRCB_LOWER, dtype=np.uint8)
         self.ycrcb_upper = np.array(YCRCB_UPPER, dtype=np.uint8)
-        self.smoother = PointSmoother(window_size=SMOOTHING_WINDOW_SIZE, alpha=SMOOTHING_ALPHA, max_displacement=MAX_DISPLACEMENT)
+        self.geometry = frame_geometry(FRAME_WIDTH, FRAME_HEIGHT)  # Pixel geometry of the current input size
+        self.scale = DOWNSAMPLE_RATIO  # Processing scale, adjusted per session by the resolution controller
+        self.frame_scale = 1.0  # Size of the decoded input relative to the client's frame
+        self.smoother = PointSmoother(window_size=SMOOTHING_WINDOW_SIZE, alpha=SMOOTHING_ALPHA, max_displacement=self.geometry.max_displacement)
         self.roi = None  # Region of interest for tracking
-        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, MORPH_KERNEL)  # Cached kernel
-        self.prev_gray = None # For motion fallback
+        self.kernel = morph_kernel()  # Shared by all trackers
+        self.motion_reference = None  # Thumbnail of the last fully processed frame, for the motion gate
+        self.motion_gate = MOTION_GATE  # Reuse the last result while little has moved
+        self.motion_threshold = MOTION_THRESHOLD
+        self.motion_min_fraction = MOTION_GATE_FRACTION
+        self.motion_max_skip = MOTION_GATE_MAX_SKIP
+        self.skipped_frames = 0  # Consecutive frames answered from the cache
+        self.gated = False  # Whether the last frame was answered from the cache
+        self.last_result = (None, None, None)
+        self.last_point = None  # Raw (unsmoothed) boundary point behind last_result
+        self.zone_points = None  # Contour point closest to each hazard zone, behind last_point
+        self.arena = BufferArena()  # Scratch buffers reused across frames
+        self.blur_kernel = (7, 7)
+        self.skin_lut = shared_skin_lut() if segmentation_mode == "lut" else None
+        self.profiler = StageProfiler()  # Per-stage timings, recorded only while profiling is enabled
 
-    def preprocess_frame(self, frame):
+    def reset(self):
         """
-        Preprocess the frame with optional ROI and downsampling.
+        Drop all per-stream tracking state (ROI, motion reference, cached result, smoothing history).
+        """
+        self.roi = None
+        self.frame_scale = 1.0
+        self.motion_reference = None
+        self.skipped_frames = 0
+        self.gated = False
+        self.last_result = (None, None, None)
+        self.last_point = None
+        self.zone_points = None
+        self.smoother.reset()
+        self.profiler.reset()
+
+    def update_input(self, frame, frame_scale=1.0):
+        """
+        Pick up the geometry for the client's frame size.
+        A frame decoded at reduced size still uses the geometry, ROI and points of
+        the client's frame, so results do not depend on how it was decoded.
+        Args:
+            frame (numpy.ndarray): Decoded BGR frame.
+            frame_scale (float): Size of frame relative to the client's frame.
+        """
+        h_frame, w_frame = frame.shape[:2]
+        if frame_scale != 1.0:
+            w_frame, h_frame = int(round(w_frame / frame_scale)), int(round(h_frame / frame_scale))
+        if w_frame != self.geometry.width or h_frame != self.geometry.height:
+            self.geometry = frame_geometry(w_frame, h_frame)
+            self.smoother.max_displacement = self.geometry.max_displacement
+            self.motion_reference = None
+        if frame_scale != self.frame_scale:
+            # Thumbnails of differently decoded frames are not comparable
+            self.frame_scale = frame_scale
+            self.motion_reference = None
+
+    def prepare_frame(self, frame, frame_scale=1.0):
+        """
+        Crop the frame to the tracking ROI and downsample it to the processing scale.
+        Also picks up the geometry for the frame's size.
+        Args:
+            frame (numpy.ndarray): Decoded BGR frame.
+            frame_scale (float): Size of frame relative to the client's frame.
         Returns:
-            hsv_frame: The processed HSV frame.
-            ycrcb_frame: The processed YCrCb frame.
+            frame: The cropped and downsampled frame.
             roi_offset: (x, y) offset of the ROI in global coordinates.
-            gray_frame: Grayscale frame for motion detection.
         """
+        self.update_input(frame, frame_scale)
         roi_offset = (0, 0)
-        
+        h_frame, w_frame = frame.shape[:2]
+
         if self.roi is not None:
             x, y, w, h = self.roi
+            if frame_scale != 1.0:
+                # The ROI is kept in the client's pixels
+                x0, y0 = int(x * frame_scale), int(y * frame_scale)
+                w = int(np.ceil((x + w) * frame_scale)) - x0
+                h = int(np.ceil((y + h) * frame_scale)) - y0
+                x, y = x0, y0
             # Ensure ROI is within frame bounds
-            h_frame, w_frame = frame.shape[:2]
             x = max(0, x)
             y = max(0, y)
             w = min(w, w_frame - x)
@@ -40,140 +120,346 @@ class HandTracker:
             
             if w > 0 and h > 0:
                 frame = frame[y:y+h, x:x+w]
-                roi_offset = (x, y)
+                roi_offset = (x, y) if frame_scale == 1.0 else (x / frame_scale, y / frame_scale)
             else:
                 self.roi = None # Reset invalid ROI
+        self.profiler.lap("roi_crop")
+
+        # Downsample for faster processing (a reduced decode already did part of it)
+        factor = self.scale / frame_scale
+        if factor != 1.0:
+            # Same output size OpenCV derives from fx/fy (rounded to nearest even), so dst is used as is
+            h, w = frame.shape[:2]
+            resized = self.arena.get("resized", (max(1, round(h * factor)), max(1, round(w * factor)), 3))
+            frame = cv2.resize(frame, None, dst=resized, fx=factor, fy=factor, interpolation=cv2.INTER_LINEAR)
+        self.profiler.lap("resize")
+
+        return frame, roi_offset
+
+    def preprocess_frame(self, frame):
+        """
+        Preprocess the frame with optional ROI and downsampling.
+        Returns:
+            hsv_frame: The processed HSV frame.
+            ycrcb_frame: The processed YCrCb frame.
+            roi_offset: (x, y) offset of the ROI in global coordinates.
+            gray_frame: Grayscale frame for motion detection.
+        """
+        frame, roi_offset = self.prepare_frame(frame)
+        shape = frame.shape[:2]
 
-        # Downsample for faster processing
-        frame = cv2.resize(frame, None, fx=DOWNSAMPLE_RATIO, fy=DOWNSAMPLE_RATIO, interpolation=cv2.INTER_LINEAR)
-        
         # Blur to reduce noise
-        blurred = cv2.GaussianBlur(frame, (7, 7), 0)
+        blurred = cv2.GaussianBlur(frame, self.blur_kernel, 0, dst=self.arena.get("blurred", frame.shape))
         
-        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-        ycrcb = cv2.cvtColor(blurred, cv2.COLOR_BGR2YCrCb)
-        gray = cv2.cvtColor(blurred, cv2.COLOR_BGR2GRAY)
+        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV, dst=self.arena.get("hsv", frame.shape))
+        ycrcb = cv2.cvtColor(blurred, cv2.COLOR_BGR2YCrCb, dst=self.arena.get("ycrcb", frame.shape))
+        gray = cv2.cvtColor(blurred, cv2.COLOR_BGR2GRAY, dst=self.arena.get("gray", shape))
         
         return hsv, ycrcb, roi_offset, gray
 
     def transform_to_global(self, contour, roi_offset):
         """
         Transform contour points from local (downsampled + ROI) to global coordinates.
+        The int32 contour is updated in place and returned.
         """
         if contour is None:
             return None
-        
+
+        if self.scale == 1.0 and self.frame_scale == 1.0:
+            contour[:, :, 0] += roi_offset[0]
+            contour[:, :, 1] += roi_offset[1]
+            return contour
+
         # Scale up
-        scale = 1.0 / DOWNSAMPLE_RATIO
-        contour = contour.astype(np.float32) * scale
+        points = self.arena.get("contour", contour.shape, np.float32)
+        np.copyto(points, contour, casting="unsafe")
+        points *= 1.0 / self.scale
         
         # Add ROI offset
-        contour[:, :, 0] += roi_offset[0]
-        contour[:, :, 1] += roi_offset[1]
+        points[:, :, 0] += roi_offset[0]
+        points[:, :, 1] += roi_offset[1]
         
-        return np.round(contour).astype(np.int32)
+        np.rint(points, out=points)
+        np.copyto(contour, points, casting="unsafe")
+        return contour
 
-    def detect_hand(self, frame):
+    def detect_hand(self, frame, frame_scale=1.0):
         """
         Detect the hand and update the ROI for tracking.
+        While the motion gate finds the scene unchanged, the previous result is returned.
+        Args:
+            frame (numpy.ndarray): Decoded BGR frame.
+            frame_scale (float): Size of frame relative to the client's frame; the
+                contour and point are always in the client's pixels.
         """
-        hsv_frame, ycrcb_frame, roi_offset, gray_frame = self.preprocess_frame(frame)
-        
+        self.profiler.begin()
+        self.profiler.count("frames")
+        if self.check_motion(frame, frame_scale):
+            return self.reuse_result()
+        self.last_result = self.track(frame, frame_scale)
+        return self.last_result
+
+    def track(self, frame, frame_scale=1.0):
+        """
+        Locate the hand in a frame the motion gate let through.
+        Tracking strategies (see FlowTracker) override this; here every frame
+        gets a full detection.
+        """
+        return self.detect_full(frame, frame_scale)
+
+    def detect_full(self, frame, frame_scale=1.0):
+        """
+        Segment the (ROI of the) frame and locate the hand in it.
+        Returns:
+            tuple: (global_contour, hull, smoothed_point), all None if no hand is found.
+        """
+        frame, roi_offset = self.prepare_frame(frame, frame_scale)
+        blurred = cv2.GaussianBlur(frame, self.blur_kernel, 0, dst=self.arena.get("blurred", frame.shape))
+        self.profiler.lap("blur")
+        mask = self.segment_bgr(blurred)
+        return self.locate_hand(mask, roi_offset)
+
+    def check_motion(self, frame, frame_scale=1.0):
+        """
+        Motion gate: decide whether the last result can be reused for this frame.
+        A small thumbnail of the frame is differenced against the one taken at the
+        last full detection, inside the ROI while a hand is tracked. The thumbnail
+        keeps its color: skin moving over a background of similar brightness is
+        invisible in grayscale.
+        If too few pixels changed, and the result has not been reused too often
+        in a row, the frame is skipped. Otherwise the thumbnail becomes the new
+        motion reference.
+        Returns:
+            bool: True if the frame needs no detection.
+        """
+        self.gated = False
+        self.update_input(frame, frame_scale)
+        if not self.motion_gate:
+            return False
+        h, w = frame.shape[:2]
+        width = min(MOTION_GATE_WIDTH, w)
+        height = max(1, round(h * width / w))
+        # Bilinear averages enough neighbours to tame sensor noise and is far cheaper than INTER_AREA here
+        small = cv2.resize(frame, (width, height), dst=self.arena.get("motion_small", (height, width, 3)), interpolation=cv2.INTER_LINEAR)
+
+        changed = self.update_motion(small)
+        self.profiler.lap("motion_gate")
+
+        if changed is not None and changed < self.motion_min_fraction and self.skipped_frames < self.motion_max_skip:
+            self.skipped_frames += 1
+            self.gated = True
+            self.profiler.count("gated")
+            return True
+
+        self.skipped_frames = 0
+        self.motion_reference = self.arena.get("reference", small.shape)
+        np.copyto(self.motion_reference, small)
+        return False
+
+    def segment_bgr(self, blurred):
+        """
+        Build the skin mask from a blurred BGR image with the configured engine.
+        Works on any image shape, including several frames stacked together.
+        """
+        arena = self.arena
+        if self.skin_lut is not None:
+            shape = blurred.shape[:2]
+            mask = self.skin_lut.apply(blurred, out=arena.get("mask", shape), arena=arena)
+            self.profiler.lap("lut_mask")
+            return mask
+        hsv_frame = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV, dst=arena.get("hsv", blurred.shape))
+        self.profiler.lap("cvt_hsv")
+        ycrcb_frame = cv2.cvtColor(blurred, cv2.COLOR_BGR2YCrCb, dst=arena.get("ycrcb", blurred.shape))
+        self.profiler.lap("cvt_ycrcb")
+        return self.segment(hsv_frame, ycrcb_frame)
+
+    def segment(self, hsv_frame, ycrcb_frame):
+        """
+        Build the combined HSV and YCrCb skin mask.
+        Works on any image shape, including several frames stacked together.
+        """
+        shape = hsv_frame.shape[:2]
+
         # 1. HSV Mask
-        mask_hsv = cv2.inRange(hsv_frame, self.hsv_lower, self.hsv_upper)
+        mask_hsv = cv2.inRange(hsv_frame, self.hsv_lower, self.hsv_upper, dst=self.arena.get("mask", shape))
+        self.profiler.lap("mask_hsv")
 
         # 2. YCrCb Mask
-        mask_ycrcb = cv2.inRange(ycrcb_frame, self.ycrcb_lower, self.ycrcb_upper)
+        mask_ycrcb = cv2.inRange(ycrcb_frame, self.ycrcb_lower, self.ycrcb_upper, dst=self.arena.get("mask_ycrcb", shape))
+        self.profiler.lap("mask_ycrcb")
 
         # Combine masks
-        mask = cv2.bitwise_and(mask_hsv, mask_ycrcb)
-
-        # 3. Motion Mask Fallback (Simple Frame Differencing)
-        if self.prev_gray is not None and self.prev_gray.shape == gray_frame.shape:
-            diff = cv2.absdiff(self.prev_gray, gray_frame)
-            _, motion_mask = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-            # Combine: Keep skin pixels OR moving pixels that are likely skin
-            # This helps when skin detection is weak but hand is moving
-            # But to avoid noise, we primarily trust HSV, using motion to fill gaps
-            # For now, let's stick to robust HSV + Morphology as requested to avoid over-engineering
-            pass 
-        
-        self.prev_gray = gray_frame
+        mask = cv2.bitwise_and(mask_hsv, mask_ycrcb, dst=mask_hsv)
+        self.profiler.lap("mask_combine")
+        return mask
 
-        # 3. Morphological Cleanup (Stronger)
-        # Close gaps
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel, iterations=2)
-        # Remove speckles
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel, iterations=2)
+    def reuse_result(self):
+        """
+        Result for a frame skipped by the motion gate: the last contour and hull,
+        with the last raw boundary point fed through the smoother again, so the
+        smoothing advances exactly as if the unchanged frame had been processed.
+        """
+        if self.last_point is None:
+            return self.last_result
+        contour, hull, _ = self.last_result
+        self.last_result = (contour, hull, self.smoother.smooth(self.last_point))
+        self.profiler.lap("smoothing")
+        return self.last_result
 
-        # Find contours
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        if not contours:
-            self.roi = None  # Reset ROI if no hand is detected
-            self.smoother.smooth(None) # Reset smoother
-            return None, None, None
+    def update_motion(self, thumbnail):
+        """
+        Difference a motion thumbnail against the motion reference.
+        Only the part covered by the ROI is compared while a hand is tracked.
+        Args:
+            thumbnail (numpy.ndarray): Thumbnail of the full frame (BGR or grayscale).
+        Returns:
+            float: Fraction of compared pixel values that changed, or None without a usable reference.
+        """
+        # 3. Motion Mask (Simple Frame Differencing)
+        if self.motion_reference is None or self.motion_reference.shape != thumbnail.shape:
+            return None
+        reference = self.motion_reference
+        if self.roi is not None:
+            # ROI is in frame pixels; map it onto the thumbnail
+            sx = thumbnail.shape[1] / self.geometry.width
+            sy = thumbnail.shape[0] / self.geometry.height
+            x, y, w, h = self.roi
+            x0, y0 = int(x * sx), int(y * sy)
+            x1 = min(int(np.ceil((x + w) * sx)), thumbnail.shape[1])
+            y1 = min(int(np.ceil((y + h) * sy)), thumbnail.shape[0])
+            if x1 > x0 and y1 > y0:
+                reference = reference[y0:y1, x0:x1]
+                thumbnail = thumbnail[y0:y1, x0:x1]
 
-        # 4. Filter contours by area to remove noise
-        valid_contours = [c for c in contours if cv2.contourArea(c) > MIN_AREA]
+        diff = cv2.absdiff(reference, thumbnail, dst=self.arena.get("motion", thumbnail.shape))
+        _, motion_mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY, dst=diff)
+        # countNonZero wants a single channel; count the color values as one wide image
+        return cv2.countNonZero(motion_mask.reshape(motion_mask.shape[0], -1)) / motion_mask.size
 
-        if not valid_contours:
-            self.roi = None
+    def locate_hand(self, mask, roi_offset):
+        """
+        Clean the skin mask, pick the hand contour and update the ROI.
+        Args:
+            mask (numpy.ndarray): Skin mask of the prepared (cropped, downsampled) frame; overwritten by the cleanup.
+            roi_offset (tuple): (x, y) offset of the ROI in global coordinates.
+        Returns:
+            tuple: (global_contour, hull, smoothed_point), all None if no hand is found.
+        """
+        profiler = self.profiler
+        profiler.begin()
+        contours = self.find_hand_contours(mask)
+        if not contours:
+            self.roi = None  # Reset ROI if no hand is detected
             self.smoother.smooth(None) # Reset smoother
+            self.last_point = None
             return None, None, None
 
         # Find the largest contour
-        largest_contour = max(valid_contours, key=cv2.contourArea)
+        largest_contour = contours[0]
         
         # Check if contour touches the ROI border
-        if self.roi is not None:
-            x, y, w, h = 0, 0, hsv_frame.shape[1], hsv_frame.shape[0]
-            x_min, y_min = np.min(largest_contour[:, 0, :], axis=0)
-            x_max, y_max = np.max(largest_contour[:, 0, :], axis=0)
-            
+        if self.roi is not None and self.touches_border(largest_contour, mask.shape):
             # If touching border, reset ROI for next frame to ensure full capture
-            if x_min <= 1 or y_min <= 1 or x_max >= w - 2 or y_max >= h - 2:
-                self.roi = None
+            self.roi = None
 
         # Transform contour to global coordinates immediately
         global_contour = self.transform_to_global(largest_contour, roi_offset)
+        profiler.lap("to_global")
         
         # Compute hull in global coordinates
         hull = cv2.convexHull(global_contour)
+        profiler.lap("convex_hull")
 
         # Compute the closest boundary point (using global contour)
         closest_point = self.get_closest_boundary_point(global_contour)
+        self.last_point = closest_point
+        profiler.lap("closest_point")
         
         # Smooth the point
         smoothed_point = self.smoother.smooth(closest_point)
+        profiler.lap("smoothing")
 
         # Update ROI based on GLOBAL contour
-        x, y, w, h = cv2.boundingRect(global_contour)
-        self.roi = (
-            max(0, x - ROI_MARGIN), 
-            max(0, y - ROI_MARGIN), 
-            w + 2 * ROI_MARGIN, 
-            h + 2 * ROI_MARGIN
-        )
+        self.update_roi(global_contour)
+        profiler.lap("roi_update")
 
         return global_contour, hull, smoothed_point
 
+    def find_hand_contours(self, mask, count=1):
+        """
+        Clean the skin mask and find the largest hand-sized blobs.
+        Args:
+            mask (numpy.ndarray): Skin mask of the prepared frame; overwritten by the cleanup.
+            count (int): Number of blobs to return at most.
+        Returns:
+            list: Contours (in prepared-frame coordinates) above the minimum area, largest first.
+        """
+        profiler = self.profiler
+
+        # 3. Morphological Cleanup (Stronger)
+        # Close gaps
+        closed = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel, dst=self.arena.get("morph", mask.shape), iterations=2)
+        profiler.lap("morph_close")
+        # Remove speckles
+        mask = cv2.morphologyEx(closed, cv2.MORPH_OPEN, self.kernel, dst=mask, iterations=2)
+        profiler.lap("morph_open")
+
+        # Find contours
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        profiler.lap("find_contours")
+        profiler.count("contours", len(contours))
+        
+        if not contours:
+            profiler.count("no_hand")
+            return []
+
+        # 4. Filter contours by area to remove noise
+        min_area = self.geometry.min_area(self.scale)
+        areas = [cv2.contourArea(c) for c in contours]
+        valid = [i for i, area in enumerate(areas) if area > min_area]
+        # Stable sort: of equally large blobs the first found wins, as with max()
+        valid.sort(key=areas.__getitem__, reverse=True)
+        profiler.lap("filter_contours")
+        if not valid:
+            profiler.count("no_hand")
+        return [contours[i] for i in valid[:count]]
+
+    def touches_border(self, contour, shape):
+        """
+        Whether a contour reaches the edge of the (cropped) frame it was found in.
+        """
+        h, w = shape[:2]
+        x_min, y_min = np.min(contour[:, 0, :], axis=0)
+        x_max, y_max = np.max(contour[:, 0, :], axis=0)
+        return x_min <= 1 or y_min <= 1 or x_max >= w - 2 or y_max >= h - 2
+
+    def update_roi(self, contour):
+        """
+        Set the ROI to the contour's bounding box plus the tracking margin (global coordinates).
+        """
+        x, y, w, h = cv2.boundingRect(contour)
+        margin = self.geometry.roi_margin
+        self.roi = (
+            max(0, x - margin), 
+            max(0, y - margin), 
+            w + 2 * margin, 
+            h + 2 * margin
+        )
+
     def get_closest_boundary_point(self, contour):
         """
-        Compute the closest point on the boundary to the virtual object.
-        Contour is expected to be in GLOBAL coordinates.
+        Compute the point of the contour closest to any hazard zone.
+        Contour is expected to be in GLOBAL coordinates. The closest point to
+        every zone is kept in zone_points for the per-zone states.
         """
         if contour is None:
             return None
 
-        # Calculate distances to the circle center
-        # contour is shape (N, 1, 2)
+        # contour is shape (N, 1, 2); one lookup in the zones' distance fields covers all zones
         points = contour[:, 0, :]
-        diff = points - np.array(CIRCLE_CENTER)
-        distances = np.linalg.norm(diff, axis=1)
-        
-        min_idx = np.argmin(distances)
-        return tuple(points[min_idx])
+        indices, distances = hazard_field(self.geometry.width, self.geometry.height).nearest(points)
+        self.zone_points = points[indices]
+        return tuple(points[indices[np.argmin(distances)]])
 
     def get_centroid(self, contour):
         """
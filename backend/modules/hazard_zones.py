@@ -0,0 +1,263 @@
+import os
+from functools import lru_cache
+import cv2
+import numpy as np
+from config.config import HAZARD_ZONES, ZONE_DIR, CIRCLE_CENTER, CIRCLE_RADIUS
+from modules.distance_logic import DistanceLogic, SEVERITY
+from modules.artifact_cache import artifact_cache, config_key
+
+SHAPES = ("circle", "polygon", "mask")
+
+
+def zone_specs(zones=HAZARD_ZONES):
+    """
+    Validated hazard zone definitions from the config.
+    Without configured zones there is a single circle zone, the virtual object
+    given by CIRCLE_CENTER and CIRCLE_RADIUS.
+    Args:
+        zones (tuple): Zone dicts with a 'name' and a 'shape':
+            circle: 'center' (x, y) and 'radius', normalized like CIRCLE_CENTER/CIRCLE_RADIUS;
+            polygon: 'points', (x, y) vertices as fractions of the frame width and height;
+            mask: 'path' of an image (relative to ZONE_DIR) whose non-zero pixels are the zone.
+    Returns:
+        list: Zone dicts.
+    Raises:
+        ValueError: If a zone is malformed or two zones share a name.
+    """
+    if not zones:
+        return [{"name": "circle", "shape": "circle", "center": tuple(CIRCLE_CENTER), "radius": CIRCLE_RADIUS}]
+    specs = []
+    for zone in zones:
+        shape = zone.get("shape")
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown hazard zone shape: {shape}")
+        if not zone.get("name"):
+            raise ValueError("Hazard zones need a name")
+        if shape == "circle" and ("center" not in zone or "radius" not in zone):
+            raise ValueError(f"Circle zone {zone['name']} needs a center and a radius")
+        if shape == "polygon" and len(zone.get("points", ())) < 3:
+            raise ValueError(f"Polygon zone {zone['name']} needs at least 3 points")
+        if shape == "mask" and not zone.get("path"):
+            raise ValueError(f"Mask zone {zone['name']} needs a path")
+        specs.append(dict(zone))
+    names = [zone["name"] for zone in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Hazard zone names must be unique")
+    return specs
+
+
+def describe_zones(specs=None):
+    """
+    Normalized zone shapes for clients that draw them (mask zones are listed without their pixels).
+    """
+    described = []
+    for zone in zone_specs() if specs is None else specs:
+        entry = {"name": zone["name"], "shape": zone["shape"]}
+        if zone["shape"] == "circle":
+            entry["center"] = list(zone["center"])
+            entry["radius"] = zone["radius"]
+        elif zone["shape"] == "polygon":
+            entry["points"] = [list(point) for point in zone["points"]]
+        described.append(entry)
+    return described
+
+
+def signed_distance(inside, edge=0.5):
+    """
+    Signed distance from every pixel to the edge of a zone mask (negative inside).
+    Args:
+        inside (numpy.ndarray): uint8 mask, non-zero in the zone.
+        edge (float): Where the edge runs, from the centers of the zone's outermost
+            pixels (0) to those of the first background pixels (1).
+    Returns:
+        numpy.ndarray: float32 distances in pixels.
+    """
+    inside = np.where(inside > 0, 255, 0).astype(np.uint8)
+    if not inside.any():
+        # An empty zone is infinitely far away
+        return np.full(inside.shape, np.inf, dtype=np.float32)
+    outside = cv2.bitwise_not(inside)
+    # distanceTransform measures the distance to the nearest zero pixel
+    to_zone = cv2.distanceTransform(outside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    to_background = cv2.distanceTransform(inside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    field = np.where(inside > 0, 1.0 - edge - to_background, to_zone - edge)
+    return field.astype(np.float32)
+
+
+class HazardField:
+    def __init__(self, width, height, specs=None):
+        """
+        Signed distance fields of all hazard zones for one frame size.
+        The fields are computed once (exactly for circles, with a distance
+        transform for polygons and masks) and stacked into one (height, width,
+        zones) array, so the distance of any number of points to every zone is
+        a single lookup, whatever the shapes and however many zones there are.
+        The stacked fields are kept in the artifact cache, keyed by the zones and
+        the frame size, so other processes and later runs load them instead.
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            specs (list): Zone definitions (see zone_specs); defaults to the config.
+        """
+        self.width = width
+        self.height = height
+        specs = zone_specs() if specs is None else specs
+        key = config_key("hazard_field", width, height, [self._stamp(spec) for spec in specs])
+        self.values = artifact_cache().load_or_build("hazard_field", key, lambda: self._build_fields(specs))
+        self.zones = [self._zone(spec, self.values[..., i]) for i, spec in enumerate(specs)]  # With pixel geometry, for drawing
+        self.names = [zone["name"] for zone in self.zones]
+        self.flat = self.values.reshape(-1, len(specs))  # One row of zone distances per pixel
+        self.limit = np.array([width - 1, height - 1], dtype=np.int32)
+
+    def _stamp(self, spec):
+        """
+        What a zone's field depends on: its definition and, for masks, the image file's size and modification time.
+        """
+        if spec["shape"] != "mask":
+            return sorted(spec.items())
+        path = self._mask_path(spec)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError(f"Could not read the mask of hazard zone {spec['name']}: {path}")
+        return sorted(spec.items()) + [stat.st_size, stat.st_mtime_ns]
+
+    def _build_fields(self, specs):
+        return np.ascontiguousarray(np.stack([self._field(spec) for spec in specs], axis=-1))
+
+    def _zone(self, spec, field):
+        """
+        Pixel geometry of one zone (mask zones are read back from their field).
+        """
+        zone = {"name": spec["name"], "shape": spec["shape"]}
+        if spec["shape"] == "circle":
+            zone["center"], zone["radius"] = self._circle(spec)
+        elif spec["shape"] == "polygon":
+            zone["points"] = self._polygon(spec)
+        else:
+            zone["mask"] = field < 0
+        return zone
+
+    def _field(self, spec):
+        """
+        Signed distance field of one zone.
+        """
+        width, height = self.width, self.height
+        if spec["shape"] == "circle":
+            center, radius = self._circle(spec)
+            xs = np.arange(width, dtype=np.float64) - center[0]
+            ys = np.arange(height, dtype=np.float64)[:, None] - center[1]
+            return (np.hypot(xs, ys) - radius).astype(np.float32)
+
+        inside = np.zeros((height, width), dtype=np.uint8)
+        if spec["shape"] == "polygon":
+            cv2.fillPoly(inside, [self._polygon(spec)], 255)
+            # fillPoly covers the pixels on the polygon's sides, so the edge runs through them
+            return signed_distance(inside, edge=0.0)
+        path = self._mask_path(spec)
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Could not read the mask of hazard zone {spec['name']}: {path}")
+        inside = cv2.resize(image, (width, height), interpolation=cv2.INTER_NEAREST)
+        return signed_distance(inside)
+
+    def _circle(self, spec):
+        # Same rounding as FrameGeometry, so the default zone is the virtual object
+        center = (int(round(spec["center"][0] * self.width)), int(round(spec["center"][1] * self.height)))
+        return center, spec["radius"] * self.width
+
+    def _polygon(self, spec):
+        return np.rint(np.asarray(spec["points"], dtype=np.float64) * (self.width, self.height)).astype(np.int32)
+
+    def _mask_path(self, spec):
+        return spec["path"] if os.path.isabs(spec["path"]) else os.path.join(ZONE_DIR, spec["path"])
+
+    def lookup(self, points):
+        """
+        Signed distances of points to every zone.
+        Args:
+            points (numpy.ndarray): (N, 2) int pixel coordinates; points off the frame are clamped to its edge.
+        Returns:
+            numpy.ndarray: (N, zones) float32 distances.
+        """
+        return self.flat.take(self._pixel_index(points), axis=0)
+
+    def _pixel_index(self, points):
+        """
+        Row of self.flat for each point.
+        """
+        clamped = np.maximum(points, 0)  # Cheaper than np.clip on small arrays
+        np.minimum(clamped, self.limit, out=clamped)
+        index = clamped[:, 1] * self.width
+        index += clamped[:, 0]
+        return index
+
+    def nearest(self, points):
+        """
+        For every zone, the point closest to it.
+        Args:
+            points (numpy.ndarray): (N, 2) int pixel coordinates, e.g. a hand contour.
+        Returns:
+            tuple: (indices into points, distances), one per zone.
+        """
+        distances = self.lookup(points)
+        indices = distances.argmin(axis=0)
+        return indices, distances[indices, np.arange(len(indices))]
+
+    def distances_at(self, points):
+        """
+        Distance of the i-th point to the i-th zone.
+        Args:
+            points (numpy.ndarray): (zones, 2) int pixel coordinates.
+        Returns:
+            numpy.ndarray: (zones,) float32 distances.
+        """
+        return self.flat[self._pixel_index(points), np.arange(len(points))]
+
+
+@lru_cache(maxsize=8)
+def hazard_field(width, height):
+    """
+    Shared HazardField of the configured zones for a frame size.
+    """
+    return HazardField(width, height)
+
+
+class ZoneStates:
+    def __init__(self, names=None):
+        """
+        SAFE/WARNING/DANGER state of every hazard zone, each with its own
+        hysteresis and debounce history (see DistanceLogic).
+        Args:
+            names (list): Zone names; defaults to the configured zones.
+        """
+        self.names = [zone["name"] for zone in zone_specs()] if names is None else list(names)
+        self.logics = [DistanceLogic() for _ in self.names]
+
+    def reset(self):
+        """
+        Clear every zone's debounce history.
+        """
+        for logic in self.logics:
+            logic.reset()
+
+    def safe(self):
+        """
+        States while no hand is tracked.
+        """
+        return "SAFE", dict.fromkeys(self.names, "SAFE")
+
+    def update(self, distances, geometry):
+        """
+        Advance every zone's state.
+        Args:
+            distances (numpy.ndarray): Signed distance of the hand to each zone, in pixels.
+            geometry (FrameGeometry): Geometry giving the warning band and hysteresis.
+        Returns:
+            tuple: (most severe state, {zone name: state})
+        """
+        states = {}
+        for name, logic, distance in zip(self.names, self.logics, distances.tolist()):
+            logic.set_geometry(geometry, radius=0.0)
+            states[name] = logic.determine_state(distance)
+        return max(states.values(), key=SEVERITY.get), states
@@ -0,0 +1,209 @@
+import cv2
+import numpy as np
+from config.config import SEGMENTATION_MODE, SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA, MAX_HANDS, HAND_TRACK_PATIENCE, HAND_SEARCH_INTERVAL
+from modules.hand_tracking import HandTracker
+from modules.hazard_zones import hazard_field
+from modules.smoothing_utils import PointSmoother
+
+
+class HandTrack:
+    def __init__(self, hand_id, smoother):
+        """
+        One tracked hand: its ID, smoothing history and latest detection.
+        Args:
+            hand_id (int): ID, stable while the hand stays tracked.
+            smoother (PointSmoother): This hand's boundary point smoother.
+        """
+        self.hand_id = hand_id
+        self.smoother = smoother
+        self.contour = None  # Global contour of the latest detection
+        self.hull = None
+        self.point = None  # Smoothed boundary point
+        self.last_point = None  # Raw boundary point
+        self.zone_points = None  # Contour point closest to each hazard zone
+        self.center = None  # Bounding box center, used for association
+        self.roi = None  # Bounding box plus the tracking margin
+        self.missed = 0  # Consecutive frames without a matching detection
+
+    def result(self):
+        """
+        (global_contour, hull, smoothed_point) of the hand.
+        """
+        return self.contour, self.hull, self.point
+
+    def lose(self):
+        """
+        No detection matched the hand in this frame.
+        """
+        self.missed += 1
+        self.contour = self.hull = self.point = None
+        self.last_point = self.zone_points = None
+        self.smoother.smooth(None)  # Reset smoother, as for a lost single hand
+
+
+class MultiHandTracker(HandTracker):
+    def __init__(self, segmentation_mode=SEGMENTATION_MODE, max_hands=MAX_HANDS,
+                 patience=HAND_TRACK_PATIENCE, search_interval=HAND_SEARCH_INTERVAL):
+        """
+        Hand tracker that follows up to max_hands hands at once.
+        One mask pass per frame yields the largest blobs; each is matched to the
+        nearest tracked hand (bounding box centers, within the smoother's jump
+        distance), so every hand keeps its ID, smoother and ROI. The frame is
+        cropped to the union of the hands' ROIs; while fewer than max_hands are
+        tracked, the whole frame is searched every search_interval frames.
+        detect_hand returns the hand closest to a hazard zone; all visible hands
+        are in `hands`.
+        Args:
+            segmentation_mode (str): Skin segmentation to use.
+            max_hands (int): Hands tracked at once.
+            patience (int): Frames a hand may go undetected and keep its ID.
+            search_interval (int): Frames between full-frame searches for more hands.
+        """
+        super().__init__(segmentation_mode)
+        self.max_hands = max_hands
+        self.patience = patience
+        self.search_interval = search_interval
+        self.tracks = []  # HandTracks, including recently missed ones
+        self.next_id = 0
+        self.since_search = 0  # Frames since the whole frame was last segmented
+
+    def reset(self):
+        """
+        Drop all per-stream tracking state, including the tracked hands.
+        """
+        super().reset()
+        self.tracks = []
+        self.next_id = 0
+        self.since_search = 0
+
+    @property
+    def hands(self):
+        """
+        Hands detected in the latest frame, by ID.
+        """
+        return [track for track in self.tracks if track.missed == 0]
+
+    def update_input(self, frame, frame_scale=1.0):
+        """
+        Pick up the geometry for the client's frame size (see HandTracker.update_input).
+        """
+        geometry = self.geometry
+        super().update_input(frame, frame_scale)
+        if self.geometry is not geometry:
+            for track in self.tracks:
+                track.smoother.max_displacement = self.geometry.max_displacement
+
+    def locate_hand(self, mask, roi_offset):
+        """
+        Clean the skin mask, match the largest blobs to the tracked hands and update the ROI.
+        Returns:
+            tuple: (global_contour, hull, smoothed_point) of the hand closest to a
+                hazard zone, all None if no hand is found.
+        """
+        profiler = self.profiler
+        profiler.begin()
+        searched = self.roi is None
+        contours = self.find_hand_contours(mask, self.max_hands)
+        border = self.roi is not None and any(self.touches_border(contour, mask.shape) for contour in contours)
+
+        detections = []
+        for contour in contours:
+            global_contour = self.transform_to_global(contour, roi_offset)
+            hull = cv2.convexHull(global_contour)
+            point = self.get_closest_boundary_point(global_contour)
+            detections.append((global_contour, hull, point, self.zone_points, cv2.boundingRect(global_contour)))
+        profiler.lap("closest_point")
+
+        self.associate(detections)
+        profiler.lap("association")
+
+        hands = self.hands
+        self.since_search = 0 if searched else self.since_search + 1
+        if border or not hands or (len(hands) < self.max_hands and self.since_search >= self.search_interval):
+            self.roi = None  # Whole frame next time
+        else:
+            x0 = min(track.roi[0] for track in hands)
+            y0 = min(track.roi[1] for track in hands)
+            x1 = max(track.roi[0] + track.roi[2] for track in hands)
+            y1 = max(track.roi[1] + track.roi[3] for track in hands)
+            self.roi = (x0, y0, x1 - x0, y1 - y0)
+        profiler.lap("roi_update")
+        return self.primary()
+
+    def associate(self, detections):
+        """
+        Match detections to tracked hands (greedily, closest centers first) and
+        smooth each hand's point; unmatched detections start new hands.
+        Args:
+            detections (list): (global_contour, hull, raw_point, zone_points, bounding_rect) per blob.
+        """
+        centers = [(x + w / 2.0, y + h / 2.0) for *_, (x, y, w, h) in detections]
+        gate = self.geometry.max_displacement
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, center in enumerate(centers):
+                distance = np.hypot(center[0] - track.center[0], center[1] - track.center[1])
+                if distance <= gate:
+                    pairs.append((distance, t, d))
+        pairs.sort()
+
+        matched_tracks, matched = set(), {}
+        for _, t, d in pairs:
+            if t not in matched_tracks and d not in matched:
+                matched_tracks.add(t)
+                matched[d] = self.tracks[t]
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.lose()
+        for d, detection in enumerate(detections):
+            track = matched.get(d)
+            if track is None:
+                track = HandTrack(self.next_id, PointSmoother(SMOOTHING_WINDOW_SIZE, SMOOTHING_ALPHA,
+                                                              self.geometry.max_displacement))
+                self.next_id += 1
+                self.tracks.append(track)
+            track.contour, track.hull, track.last_point, track.zone_points, (x, y, w, h) = detection
+            track.point = track.smoother.smooth(track.last_point)
+            track.center = centers[d]
+            margin = self.geometry.roi_margin
+            track.roi = (max(0, x - margin), max(0, y - margin), w + 2 * margin, h + 2 * margin)
+            track.missed = 0
+
+        # Forget hands missing for too long, and keep at most 2 * max_hands (visible ones first)
+        self.tracks = [track for track in self.tracks if track.missed <= self.patience]
+        self.tracks.sort(key=lambda track: (track.missed, track.hand_id))
+        del self.tracks[2 * self.max_hands:]
+        self.tracks.sort(key=lambda track: track.hand_id)
+
+    def primary(self):
+        """
+        The visible hand closest to a hazard zone, which also becomes the
+        tracker's last_point and zone_points.
+        """
+        hands = self.hands
+        if not hands:
+            self.last_point = self.zone_points = None
+            return None, None, None
+        if len(hands) == 1:
+            hand = hands[0]
+        else:
+            points = np.array([track.last_point for track in hands])
+            distances = hazard_field(self.geometry.width, self.geometry.height).lookup(points).min(axis=1)
+            hand = hands[int(np.argmin(distances))]
+        self.last_point, self.zone_points = hand.last_point, hand.zone_points
+        return hand.result()
+
+    def reuse_result(self):
+        """
+        Result for a frame skipped by the motion gate: every hand's last raw
+        point is fed through its smoother again (see HandTracker.reuse_result).
+        """
+        hands = self.hands
+        if not hands:
+            return self.last_result
+        for track in hands:
+            track.point = track.smoother.smooth(track.last_point)
+        self.profiler.lap("smoothing")
+        self.last_result = self.primary()
+        return self.last_result
@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+from config.config import OUTLINE_TOLERANCE
+
+SHAPES = ("contour", "hull")
+
+
+def encode_delta(points, previous, snap):
+    """
+    Delta-encode a polygon against the polygon sent for the previous frame.
+    The previous polygon is first moved by the hand's overall shift (median
+    displacement to the nearest previous vertex). New vertices within `snap`
+    pixels of a shifted previous vertex are replaced by it, so the parts of the
+    outline that only moved along are sent as references.
+    The result is a flat list of ints, starting with the shift:
+        dx, dy        shift applied to every copied vertex
+        x, y          a new vertex (x >= 0)
+        -(i + 1), n   copy n consecutive vertices of the previous polygon from index i
+    Args:
+        points (numpy.ndarray): (N, 2) int vertices of the new polygon.
+        previous (numpy.ndarray): (M, 2) int vertices of the previous polygon, or None.
+        snap (float): Largest distance at which a vertex counts as unchanged.
+    Returns:
+        tuple: (flat int list, the polygon as the client reconstructs it)
+    """
+    n = len(points)
+    if previous is None or not len(previous) or not n:
+        return [0, 0] + points.ravel().tolist(), points
+
+    points = points.astype(np.int32)
+    _, nearest = _nearest(points, previous)
+    # Lower median of the displacements: robust against the vertices that really changed
+    moves = np.sort(points - previous[nearest], axis=0)
+    shift = moves[(n - 1) // 2]
+
+    shifted = previous + shift
+    distances, nearest = _nearest(points, shifted)
+    close = distances <= snap * snap
+    refs = np.where(close, nearest, -1)
+    points[close] = shifted[nearest[close]]
+
+    # Runs of consecutive references collapse into one copy; new vertices stand alone
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = (refs[1:] < 0) | (refs[:-1] < 0) | (refs[1:] != refs[:-1] + 1)
+    bounds = np.flatnonzero(starts).tolist() + [n]
+    refs = refs.tolist()
+    flat = points.tolist()
+    values = shift.tolist()
+    for i, j in zip(bounds, bounds[1:]):
+        if refs[i] < 0:
+            values.extend(flat[i])
+        else:
+            values.extend((-refs[i] - 1, j - i))
+    return values, points
+
+
+def _nearest(points, reference):
+    """
+    Squared distance to, and index of, the nearest reference vertex for every point.
+    """
+    distances, indices = cv2.batchDistance(points.astype(np.float32), reference.astype(np.float32), cv2.CV_32F,
+                                           normType=cv2.NORM_L2SQR, K=1)
+    return distances.ravel(), indices.ravel()
+
+
+def decode_delta(values, previous):
+    """
+    Rebuild a polygon from encode_delta output and the previous polygon.
+    Returns:
+        numpy.ndarray: (N, 2) int vertices.
+    """
+    dx, dy = values[0], values[1]
+    points = []
+    for k in range(2, len(values), 2):
+        a, b = values[k], values[k + 1]
+        if a >= 0:
+            points.append((a, b))
+        else:
+            start = -a - 1
+            points.extend((x + dx, y + dy) for x, y in previous[start:start + b])
+    return np.array(points, dtype=np.int32).reshape(-1, 2)
+
+
+class OutlineEncoder:
+    def __init__(self, tolerance=OUTLINE_TOLERANCE):
+        """
+        Turn the hand contour and hull into small per-frame updates for the client.
+        Both are simplified with approxPolyDP and delta-encoded against what was
+        sent for the previous frame, so the client keeps one polygon per shape
+        and applies each update to it.
+        Args:
+            tolerance (float): Largest deviation of the simplified outline from the
+                contour, and the snapping distance, as a fraction of the frame width.
+        """
+        self.tolerance = tolerance
+        self.previous = dict.fromkeys(SHAPES)  # Polygons the client currently holds
+
+    def reset(self):
+        """
+        Forget the previous shapes (new client).
+        """
+        self.previous = dict.fromkeys(SHAPES)
+
+    def encode(self, contour, hull, geometry):
+        """
+        Encode the outline of one frame.
+        Args:
+            contour (numpy.ndarray): Hand contour in input pixels, or None without a hand.
+            hull (numpy.ndarray): Convex hull of the contour, or None.
+            geometry (FrameGeometry): Geometry of the input frame.
+        Returns:
+            dict: {'contour': list, 'hull': list} of delta values (see encode_delta);
+                shapes without vertices mean no hand.
+        """
+        epsilon = self.tolerance * geometry.width
+        result = {}
+        for name, shape in zip(SHAPES, (contour, hull)):
+            if shape is None:
+                points = np.empty((0, 2), dtype=np.int32)
+            else:
+                points = cv2.approxPolyDP(shape, epsilon, True).reshape(-1, 2)
+            result[name], self.previous[name] = encode_delta(points, self.previous[name], epsilon)
+        return result
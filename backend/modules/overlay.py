@@ -1,17 +1,152 @@
+from functools import lru_cache
 import cv2
-from config.config import FONT, FONT_SCALE, FONT_COLOR, LINE_THICKNESS, CIRCLE_CENTER, CIRCLE_RADIUS
+import numpy as np
+from config.config import FONT, FONT_SCALE, FONT_COLOR, LINE_THICKNESS
+from modules.geometry import frame_geometry
+from modules.hazard_zones import hazard_field
+
+ZONE_COLOR = (255, 0, 0)
+STATE_COLORS = {"SAFE": (0, 255, 0), "WARNING": (0, 255, 255), "DANGER": (0, 0, 255)}  # Green, yellow, red
+DANGER_TINT = 0.3  # Transparency factor of the red DANGER overlay
+CONTOUR_COLOR = (0, 255, 0)
+HULL_COLOR = (255, 0, 0)
+
+
+class Patch:
+    def __init__(self, image, mask, origin):
+        """
+        Pre-rendered pixels of a layer inside its bounding box.
+        Args:
+            image (numpy.ndarray): BGR pixels of the box.
+            mask (numpy.ndarray): (h, w) uint8, non-zero on the pixels the layer covers.
+            origin (tuple): (x, y) of the box in the frame.
+        """
+        self.image = image
+        self.mask = mask
+        self.origin = origin
+
+    def composite(self, frame):
+        """
+        Copy the layer's pixels into the frame, in place and only inside its box.
+        """
+        x, y = self.origin
+        h, w = self.mask.shape
+        roi = frame[y:y + h, x:x + w]
+        blended = cv2.copyTo(self.image, self.mask, roi)
+        if blended is not roi:
+            roi[...] = blended  # OpenCV copies a strided view instead of writing into it
+        return frame
+
+
+def render_patch(box, draw):
+    """
+    Render a layer inside a box of the frame and keep only the part it covers.
+    Args:
+        box (tuple): (x, y, w, h) of the frame the layer lies in.
+        draw (callable): draw(canvas, mask, offset) draws the layer in color on the
+            BGR canvas and in 255 on the mask, moved by offset (frame -> box coordinates).
+    Returns:
+        Patch: The layer, or None if draw covered no pixel.
+    """
+    x, y, w, h = box
+    canvas = np.zeros((h, w, 3), dtype=np.uint8)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    draw(canvas, mask, (-x, -y))
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return None
+    bx, by, bw, bh = cv2.boundingRect(points)
+    inside = (slice(by, by + bh), slice(bx, bx + bw))
+    return Patch(canvas[inside].copy(), mask[inside].copy(), (x + bx, y + by))
+
+
+class OverlayLayers:
+    def __init__(self, width, height):
+        """
+        Static overlay layers of one frame size, rendered once: the hazard zones
+        (as a patch blended only inside their bounding box) and the solid red image
+        the DANGER tint is blended with in place.
+        Args:
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+        """
+        zones = hazard_field(width, height).zones
+
+        def draw_zones(canvas, mask, offset):
+            # The box is the whole frame, so the offset is (0, 0)
+            for target, color in ((canvas, ZONE_COLOR), (mask, 255)):
+                for zone in zones:
+                    if zone["shape"] == "circle":
+                        cv2.circle(target, zone["center"], int(round(zone["radius"])), color, -1)
+                    elif zone["shape"] == "polygon":
+                        cv2.fillPoly(target, [zone["points"]], color)
+                    else:
+                        target[zone["mask"]] = color
+
+        self.zones = render_patch((0, 0, width, height), draw_zones)
+        self.tint = np.empty((height, width, 3), dtype=np.uint8)
+        self.tint[:] = STATE_COLORS["DANGER"]
+
+
+@lru_cache(maxsize=8)
+def overlay_layers(width, height):
+    """
+    Shared OverlayLayers for a frame size.
+    """
+    return OverlayLayers(width, height)
+
+
+class Glyph:
+    def __init__(self, text, font, font_scale, thickness, color):
+        """
+        Anti-aliased text rendered once as coverage (alpha) values, blended into
+        frames only inside its own box.
+        Args:
+            text (str): Text to render.
+            font (int): OpenCV font.
+            font_scale (float): Font scale.
+            thickness (int): Stroke thickness.
+            color (tuple): BGR color.
+        """
+        (w, h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        pad = thickness  # Room for the strokes' anti-aliased edges
+        self.offset = (-pad, -h - pad)  # Box origin relative to the text origin
+        coverage = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+        cv2.putText(coverage, text, (pad, h + pad), font, font_scale, 255, thickness, cv2.LINE_AA)
+        alpha = coverage.astype(np.float32)[..., None] / 255.0
+        self.keep = 1.0 - alpha  # Share of the frame pixel that stays
+        self.ink = alpha * np.array(color, dtype=np.float32)  # Color the text adds
+
+    def draw(self, frame, origin):
+        """
+        Blend the text into the frame at origin (bottom-left of the text, as for cv2.putText).
+        """
+        h_frame, w_frame = frame.shape[:2]
+        x0, y0 = origin[0] + self.offset[0], origin[1] + self.offset[1]
+        h, w = self.keep.shape[:2]
+        # Clip the box to the frame
+        left, top = max(0, -x0), max(0, -y0)
+        right, bottom = min(w, w_frame - x0), min(h, h_frame - y0)
+        if right <= left or bottom <= top:
+            return frame
+        roi = frame[y0 + top:y0 + bottom, x0 + left:x0 + right]
+        blended = roi * self.keep[top:bottom, left:right] + self.ink[top:bottom, left:right]
+        np.copyto(roi, blended + 0.5, casting="unsafe")
+        return frame
 
 class Overlay:
     def __init__(self):
         """
         Initialize the Overlay class for drawing on frames.
+        Static layers (hazard zones, DANGER tint, state text) are rendered once
+        per frame size or text and blended in place, only where they cover the frame.
         """
         self.font = FONT
         self.font_scale = FONT_SCALE
         self.font_color = FONT_COLOR
         self.line_thickness = LINE_THICKNESS
-        self.last_contour = None  # Store the last detected contour for debugging
-        self.last_hull = None  # Store the last detected hull for debugging
+        self.glyphs = {}  # State -> Glyph of its text
+        self.outlines = []  # (contour, hull, Patch or None) of recent drawings, reused for unchanged results
 
     def draw_state(self, frame, state):
         """
@@ -22,37 +157,49 @@ class Overlay:
         Returns:
             numpy.ndarray: The frame with the state overlay.
         """
-        if state == "SAFE":
-            color = (0, 255, 0)  # Green
-        elif state == "WARNING":
-            color = (0, 255, 255)  # Yellow
-        else:  # DANGER
-            color = (0, 0, 255)  # Red
-
         # Draw the state text
-        cv2.putText(frame, state, (10, 50), self.font, self.font_scale, color, self.line_thickness, cv2.LINE_AA)
+        glyph = self.glyphs.get(state)
+        if glyph is None:
+            color = STATE_COLORS.get(state, STATE_COLORS["DANGER"])
+            glyph = self.glyphs[state] = Glyph(state, self.font, self.font_scale, self.line_thickness, color)
+        glyph.draw(frame, (10, 50))
 
-        # Add a flashing overlay for DANGER state
+        # Add a flashing overlay for DANGER state (blended in place with the cached red layer)
         if state == "DANGER":
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, 0), (frame.shape[1], frame.shape[0]), (0, 0, 255), -1)
-            alpha = 0.3  # Transparency factor
-            cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+            tint = overlay_layers(frame.shape[1], frame.shape[0]).tint
+            cv2.addWeighted(tint, DANGER_TINT, frame, 1 - DANGER_TINT, 0, frame)
 
         return frame
 
-    def draw_virtual_object(self, frame, center=CIRCLE_CENTER, radius=CIRCLE_RADIUS):
+    def draw_virtual_object(self, frame, center=None, radius=None):
         """
-        Draw a virtual object (circle) on the frame.
+        Draw the virtual object on the frame: the given circle, or else every hazard zone.
         Args:
             frame (numpy.ndarray): The frame to draw on.
-            center (tuple): The center of the virtual object (x, y).
-            radius (int): The radius of the virtual object.
+            center (tuple): The center of a circle to draw (x, y) instead of the hazard zones.
+            radius (int): The radius of that circle; defaults to the configured geometry.
         Returns:
             numpy.ndarray: The frame with the virtual object drawn.
         """
-        cv2.circle(frame, center, radius, (255, 0, 0), -1)  # Draw the circle (filled/opaque)
-        return frame
+        if center is not None:
+            geometry = frame_geometry(frame.shape[1], frame.shape[0])
+            radius = int(round(geometry.radius)) if radius is None else radius
+            cv2.circle(frame, center, radius, ZONE_COLOR, -1)  # Draw the circle (filled/opaque)
+            return frame
+
+        if radius is not None:
+            # Circle zones at a custom radius are not the cached layer
+            for zone in hazard_field(frame.shape[1], frame.shape[0]).zones:
+                if zone["shape"] == "circle":
+                    cv2.circle(frame, zone["center"], radius, ZONE_COLOR, -1)
+                elif zone["shape"] == "polygon":
+                    cv2.fillPoly(frame, [zone["points"]], ZONE_COLOR)
+                else:
+                    frame[zone["mask"]] = ZONE_COLOR
+            return frame
+
+        zones = overlay_layers(frame.shape[1], frame.shape[0]).zones
+        return zones.composite(frame) if zones is not None else frame
 
     def draw_boundary_point(self, frame, point, contour=None, hull=None, debug=False):
         """
@@ -66,16 +213,50 @@ class Overlay:
                 pass  # Skip drawing if point is invalid
 
         if debug and contour is not None and hull is not None:
-            # Draw contours and hull for debugging
-            cv2.drawContours(frame, [contour], -1, (0, 255, 0), 2)  # Green contour
-            cv2.drawContours(frame, [hull], -1, (255, 0, 0), 2)  # Blue hull
+            self.draw_outline(frame, contour, hull)
 
         return frame
 
+    def draw_outline(self, frame, contour, hull):
+        """
+        Draw the contour (green) and hull (blue) for debugging.
+        Results the tracker reuses (motion gate) bring back the same arrays; from
+        their second drawing on, the outline is a cached patch copied into its box.
+        """
+        for i, (last_contour, last_hull, patch) in enumerate(self.outlines):
+            if last_contour is contour and last_hull is hull:
+                if patch is None:
+                    patch = self._outline_patch(frame, contour, hull)
+                    self.outlines[i] = (contour, hull, patch)
+                if patch is not None:
+                    return patch.composite(frame)
+
+        self._draw_lines(frame, contour, hull, CONTOUR_COLOR, HULL_COLOR)
+        self.outlines = [(contour, hull, None)] + [entry for entry in self.outlines if entry[0] is not contour][:3]
+        return frame
+
+    def _outline_patch(self, frame, contour, hull):
+        """
+        Render an outline into a patch the size of its bounding box (plus the line width).
+        """
+        x, y, w, h = cv2.boundingRect(np.concatenate([contour, hull]))
+        x0, y0 = max(0, x - 2), max(0, y - 2)
+        x1, y1 = min(frame.shape[1], x + w + 2), min(frame.shape[0], y + h + 2)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        def draw(canvas, mask, offset):
+            self._draw_lines(canvas, contour, hull, CONTOUR_COLOR, HULL_COLOR, offset)
+            self._draw_lines(mask, contour, hull, 255, 255, offset)
+        return render_patch((x0, y0, x1 - x0, y1 - y0), draw)
+
+    @staticmethod
+    def _draw_lines(target, contour, hull, contour_color, hull_color, offset=(0, 0)):
+        cv2.drawContours(target, [contour], -1, contour_color, 2, offset=offset)  # Green contour
+        cv2.drawContours(target, [hull], -1, hull_color, 2, offset=offset)  # Blue hull
+
 if __name__ == "__main__":
     # Test the Overlay module
-    import numpy as np
-
     overlay = Overlay()
 
     # Create a blank frame for testing
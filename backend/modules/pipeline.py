@@ -0,0 +1,197 @@
+import threading
+import time
+import cv2
+
+
+class Handoff:
+    def __init__(self):
+        """
+        Bounded (single-slot) handoff between two pipeline stages.
+        Putting an item while the previous one has not been taken replaces it,
+        so the next stage always works on the newest item and never falls behind.
+        """
+        self.condition = threading.Condition()
+        self.item = None
+        self.full = False
+        self.closed = False
+        self.passed = 0  # Items taken by the next stage
+        self.dropped = 0  # Items replaced before they were taken
+
+    def put(self, item):
+        with self.condition:
+            if self.full:
+                self.dropped += 1
+            self.item, self.full = item, True
+            self.condition.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Wait for and take the newest item.
+        Returns:
+            tuple: (True, item), or (False, None) on timeout or once closed and empty.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.full or self.closed, timeout) or not self.full:
+                return False, None
+            item, self.item, self.full = self.item, None, False
+            self.passed += 1
+            return True, item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def depth(self):
+        """
+        Items waiting (0 or 1).
+        """
+        return int(self.full)
+
+
+class StageMeter:
+    def __init__(self):
+        """
+        Throughput and busy time of one pipeline stage.
+        """
+        self.count = 0
+        self.busy = 0.0  # Seconds spent working
+        self.start = time.perf_counter()
+
+    def record(self, seconds):
+        self.count += 1
+        self.busy += seconds
+
+    def snapshot(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "frames": self.count,
+            "fps": self.count / elapsed,
+            "mean_ms": self.busy * 1000.0 / self.count if self.count else 0.0,
+            "utilization": self.busy / elapsed,  # Share of the time the stage was busy
+        }
+
+
+class LocalPipeline:
+    def __init__(self, analyze, draw, capture, show=None):
+        """
+        Local loop split into three stages that run at the same time:
+        capture (the ThreadedCapture grabber thread), detect (a worker thread
+        calling analyze) and render (the calling thread, calling draw and show;
+        OpenCV windows must stay on one thread). Each handoff holds only the
+        newest item, so a slow stage drops frames instead of queueing them, and the
+        frame rate approaches that of the slowest stage. A single detect thread
+        sees the frames in capture order, so stateful tracking stays consistent.
+        Args:
+            analyze (callable): frame -> analysis (e.g. HandTrackingSystem.analyze_frame).
+            draw (callable): (frame, analysis) -> annotated frame.
+            capture (ThreadedCapture): Frame source.
+            show (callable): annotated frame -> False to stop; None runs headless.
+        """
+        self.analyze = analyze
+        self.draw = draw
+        self.capture = capture
+        self.show = show
+        self.rendered = Handoff()  # Detect -> render
+        self.meters = {"detect": StageMeter(), "render": StageMeter()}
+        self.running = False
+        self.error = None
+        self.thread = None
+
+    def _detect(self):
+        capture, meter = self.capture, self.meters["detect"]
+        try:
+            while self.running:
+                frame = capture.read(timeout=0.1)
+                if frame is None:
+                    if capture.ended:
+                        break
+                    continue
+                start = time.perf_counter()
+                analysis = self.analyze(frame)
+                meter.record(time.perf_counter() - start)
+                self.rendered.put((frame, analysis))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.rendered.close()
+
+    def run(self, max_frames=None, stats_interval=None, on_stats=print):
+        """
+        Run until the source ends, show() returns False or max_frames frames were rendered.
+        Args:
+            max_frames (int): Frames to render (None for no limit).
+            stats_interval (float): Seconds between stats readouts (None for none).
+            on_stats (callable): Receives the readout line.
+        Returns:
+            dict: Final stats (see stats).
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self._detect, name="detect", daemon=True)
+        self.thread.start()
+        meter = self.meters["render"]
+        next_stats = time.perf_counter() + stats_interval if stats_interval else None
+        try:
+            while max_frames is None or meter.count < max_frames:
+                ok, item = self.rendered.get(timeout=0.1)
+                if ok:
+                    start = time.perf_counter()
+                    frame = self.draw(*item)
+                    keep_going = self.show is None or self.show(frame) is not False
+                    meter.record(time.perf_counter() - start)
+                    if not keep_going:
+                        break
+                elif self.rendered.closed:
+                    break
+                if next_stats is not None and time.perf_counter() >= next_stats:
+                    on_stats(format_stats(self.stats()))
+                    next_stats += stats_interval
+        finally:
+            self.stop()
+        if self.error is not None:
+            raise RuntimeError(f"Detect stage failed: {self.error}") from self.error
+        return self.stats()
+
+    def stop(self):
+        """
+        Stop the detect thread (the capture is left to its owner).
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+    def stats(self):
+        """
+        Per-stage throughput, busy time and handoff queue depth.
+        Returns:
+            dict: {'capture': {...}, 'detect': {...}, 'render': {...}}
+        """
+        capture = self.capture.stats()
+        stats = {
+            "capture": {"frames": capture["captured"], "fps": capture["fps"], "queue": capture["queue"],
+                        "dropped": capture["dropped"]},
+            "detect": self.meters["detect"].snapshot(),
+            "render": self.meters["render"].snapshot(),
+        }
+        stats["render"].update(queue=self.rendered.depth(), dropped=self.rendered.dropped)
+        return stats
+
+
+def format_stats(stats):
+    """
+    One-line readout of LocalPipeline.stats().
+    """
+    capture, detect, render = stats["capture"], stats["detect"], stats["render"]
+    return (f"capture {capture['fps']:5.1f} fps (queue {capture['queue']}, dropped {capture['dropped']}) | "
+            f"detect {detect['fps']:5.1f} fps {detect['mean_ms']:6.2f} ms ({detect['utilization']:4.0%} busy) | "
+            f"render {render['fps']:5.1f} fps {render['mean_ms']:6.2f} ms (queue {render['queue']}, dropped {render['dropped']})")
+
+
+def window_sink(title="Hand Tracking"):
+    """
+    show() for LocalPipeline that displays frames in an OpenCV window; 'q' stops.
+    """
+    def show(frame):
+        cv2.imshow(title, frame)
+        return cv2.waitKey(1) & 0xFF != ord('q')
+    return show
@@ -0,0 +1,146 @@
+import time
+import numpy as np
+from config.config import PROFILING_ENABLED, PROFILE_WINDOW
+
+# Histogram bucket edges in milliseconds (log spaced, 10 us .. 1 s)
+BUCKET_EDGES_MS = np.logspace(-2, 3, 26)
+
+
+class RollingHistogram:
+    def __init__(self, window=PROFILE_WINDOW):
+        """
+        Keep the most recent `window` durations of one stage.
+        Recording is a single array store; statistics are computed on read.
+        """
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.total = 0  # All samples ever recorded
+
+    def record(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.total += 1
+
+    def values(self):
+        """
+        The samples currently in the window, in seconds.
+        """
+        return self.samples[:min(self.total, len(self.samples))]
+
+    def snapshot(self):
+        """
+        Summary of the window in milliseconds, with histogram bucket counts.
+        """
+        return summarize(self.values(), self.total)
+
+
+def summarize(seconds, total):
+    """
+    Mean, percentiles and non-empty histogram buckets of durations, in milliseconds.
+    """
+    if len(seconds) == 0:
+        return {"count": total, "window": 0}
+    values = np.asarray(seconds) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    counts, _ = np.histogram(np.clip(values, BUCKET_EDGES_MS[0], BUCKET_EDGES_MS[-1]), bins=BUCKET_EDGES_MS)
+    return {
+        "count": total,
+        "window": len(values),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(values.max()),
+        "histogram": [[float(BUCKET_EDGES_MS[i]), int(c)] for i, c in enumerate(counts) if c],
+    }
+
+
+class StageProfiler:
+    # Shared switch for every profiler, flipped at runtime with set_enabled()
+    enabled = PROFILING_ENABLED
+
+    def __init__(self, window=PROFILE_WINDOW):
+        """
+        Per-stage timers and counters for one tracking pipeline.
+        Stages are timed as laps: begin() sets a mark and each lap(stage) records the
+        time since the previous mark. While profiling is disabled every call returns
+        after a single attribute check.
+        Args:
+            window (int): Samples kept per stage for the rolling statistics.
+        """
+        self.window = window
+        self.stages = {}  # stage -> RollingHistogram, in first-seen order
+        self.counters = {}
+        self.mark = 0.0
+
+    @classmethod
+    def set_enabled(cls, enabled):
+        """
+        Turn profiling on or off for all pipelines.
+        """
+        cls.enabled = bool(enabled)
+
+    def begin(self):
+        """
+        Start timing from now.
+        """
+        if self.enabled:
+            self.mark = time.perf_counter()
+
+    def lap(self, stage):
+        """
+        Record the time since the previous mark under `stage`.
+        """
+        if self.enabled:
+            now = time.perf_counter()
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = RollingHistogram(self.window)
+            histogram.record(now - self.mark)
+            self.mark = now
+
+    def count(self, name, amount=1):
+        """
+        Add to a named counter.
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        """
+        Drop all recorded timings and counters.
+        """
+        self.stages = {}
+        self.counters = {}
+
+    def snapshot(self):
+        """
+        Rolling statistics per stage plus the counters.
+        Returns:
+            dict: {'stages': {stage: summary}, 'counters': {name: int}}
+        """
+        return {
+            "stages": {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def merge_profiles(profilers):
+    """
+    Combine several profilers (e.g. all sessions) into one summary.
+    Returns:
+        dict: Same layout as StageProfiler.snapshot().
+    """
+    samples = {}
+    totals = {}
+    counters = {}
+    for profiler in profilers:
+        for stage, histogram in list(profiler.stages.items()):
+            samples.setdefault(stage, []).append(histogram.values())
+            totals[stage] = totals.get(stage, 0) + histogram.total
+        for name, value in list(profiler.counters.items()):
+            counters[name] = counters.get(name, 0) + value
+    return {
+        "stages": {stage: summarize(np.concatenate(parts), totals[stage]) for stage, parts in samples.items()},
+        "counters": counters,
+    }
@@ -0,0 +1,171 @@
+import json
+import struct
+import numpy as np
+from config.config import INGEST_FORMATS, SEND_OUTLINE
+from modules.frame_ingest import ENCODED, RAW_FORMATS, RAW_HEADER
+from modules.hazard_zones import describe_zones
+
+PROTOCOL_VERSION = 1
+STATES = ("SAFE", "WARNING", "DANGER")
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+# Binary result record, little-endian, 22 bytes:
+# seq u32, state u8, flags u8, x i16, y i16, dropped u32, skipped u32, server_ms f32
+RESULT_RECORD = struct.Struct("<IBBhhIIf")
+FLAG_POINT = 1  # x and y hold the boundary point
+FLAG_REUSED = 2  # The motion gate reused the previous result
+FLAG_SEQUENCED = 4  # seq echoes the client's frame number
+FLAG_OUTLINE = 8  # An outline block follows the record
+
+# Outline block after a record: contour and hull value counts (u16 each), then
+# that many int16 delta values per shape (see outline.encode_delta)
+OUTLINE_HEADER = struct.Struct("<HH")
+
+# Once a client has said hello, every frame it sends starts with its sequence number
+FRAME_HEADER = struct.Struct("<I")
+
+
+class ConnectionProtocol:
+    def __init__(self, binary=False, sequenced=False, ingest=ENCODED, outline=False):
+        """
+        Frame and reply formats of one connection, as agreed in the hello/welcome handshake.
+        Args:
+            binary (bool): Send packed RESULT_RECORDs instead of JSON.
+            sequenced (bool): Frames carry a FRAME_HEADER with their sequence number.
+            ingest (str): Format of the frames the client sends (see frame_ingest).
+            outline (bool): Replies carry the delta-encoded hand outline.
+        """
+        self.binary = binary
+        self.sequenced = sequenced
+        self.ingest = ingest
+        self.outline = outline
+
+    @classmethod
+    def from_hello(cls, text, formats=INGEST_FORMATS):
+        """
+        Build the protocol a client asked for in its hello message, e.g.
+        {"type": "hello", "version": 1, "protocol": "binary", "ingest": ["rgba", "jpeg"], "outline": true}.
+        "ingest" lists the frame formats the client can send; the first of the
+        server's `formats` among them is chosen. "outline" asks for the hand
+        outline in every reply (if SEND_OUTLINE allows it). Unknown or unsupported
+        requests fall back to JSON replies and encoded (JPEG) frames.
+        Raises:
+            ValueError: If the message is not a hello.
+        """
+        try:
+            hello = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid hello message: {e}")
+        if not isinstance(hello, dict) or hello.get("type") != "hello":
+            raise ValueError("Expected a hello message")
+        binary = hello.get("protocol") == "binary" and hello.get("version") == PROTOCOL_VERSION
+        offered = hello.get("ingest")
+        if not isinstance(offered, list):
+            offered = [ENCODED]
+        ingest = next((fmt for fmt in formats if fmt in offered), ENCODED)
+        outline = SEND_OUTLINE and hello.get("outline") is True
+        return cls(binary=binary, sequenced=True, ingest=ingest, outline=outline)
+
+    def welcome(self):
+        """
+        Reply to the hello, describing the agreed format.
+        """
+        message = {
+            "type": "welcome",
+            "version": PROTOCOL_VERSION,
+            "protocol": "binary" if self.binary else "json",
+            "frame_header": FRAME_HEADER.format,
+            "states": list(STATES),
+            "ingest": {"format": self.ingest, "formats": list(INGEST_FORMATS)},
+            "outline": self.outline,
+            "zones": describe_zones(),  # Normalized hazard zones, for drawing
+        }
+        if self.ingest in RAW_FORMATS:
+            # Raw frames start with their size, after the sequence number
+            message["ingest"]["header"] = RAW_HEADER.format
+        if self.binary:
+            message["record"] = {
+                "format": RESULT_RECORD.format,
+                "size": RESULT_RECORD.size,
+                "fields": ["seq", "state", "flags", "x", "y", "dropped", "skipped", "server_ms"],
+                "flags": {"point": FLAG_POINT, "reused": FLAG_REUSED, "sequenced": FLAG_SEQUENCED,
+                          "outline": FLAG_OUTLINE},
+            }
+            if self.outline:
+                message["record"]["outline"] = {"header": OUTLINE_HEADER.format, "values": "<h"}
+        return message
+
+    def split_frame(self, data):
+        """
+        Separate the sequence number from the frame data.
+        Returns:
+            tuple: (seq or None, frame bytes in the agreed ingest format)
+        Raises:
+            ValueError: If a sequenced frame is too short to carry its header.
+        """
+        if not self.sequenced:
+            return None, data
+        if len(data) < FRAME_HEADER.size:
+            raise ValueError("Frame too short for its sequence header")
+        return FRAME_HEADER.unpack_from(data)[0], data[FRAME_HEADER.size:]
+
+    def encode(self, seq, result, server_ms):
+        """
+        Build the reply for one processed frame.
+        Args:
+            seq (int): Frame sequence number, or None for unsequenced frames.
+            result (dict): Pipeline result with 'state', 'point' and optionally
+                'reused', 'outline', 'dropped' and 'skipped'.
+            server_ms (float): Time from receiving the frame to replying.
+        Returns:
+            bytes | dict: Packed record (plus outline block) in binary mode, JSON-ready dict otherwise.
+        """
+        if not self.binary:
+            # Clients without a hello get the original JSON replies
+            if self.sequenced:
+                if seq is not None:
+                    result["seq"] = seq
+                result["server_ms"] = round(server_ms, 3)
+            return result
+
+        point = result["point"]
+        flags = 0
+        if point is not None:
+            flags |= FLAG_POINT
+        if result.get("reused"):
+            flags |= FLAG_REUSED
+        if seq is not None:
+            flags |= FLAG_SEQUENCED
+        outline = result.get("outline")
+        if outline is not None:
+            flags |= FLAG_OUTLINE
+        x, y = point if point is not None else (0, 0)
+        record = RESULT_RECORD.pack(
+            (seq or 0) & 0xFFFFFFFF, STATE_CODES[result["state"]], flags, x, y,
+            min(result.get("dropped", 0), 0xFFFFFFFF), min(result.get("skipped", 0), 0xFFFFFFFF), server_ms)
+        if outline is None:
+            return record
+        contour, hull = outline["contour"], outline["hull"]
+        count = len(contour) + len(hull)
+        return record + OUTLINE_HEADER.pack(len(contour), len(hull)) + struct.pack(f"<{count}h", *contour, *hull)
+
+
+def decode_result(data):
+    """
+    Unpack a binary result record (and its outline block) into the JSON reply's layout.
+    """
+    seq, state, flags, x, y, dropped, skipped, server_ms = RESULT_RECORD.unpack_from(data)
+    result = {
+        "seq": seq if flags & FLAG_SEQUENCED else None,
+        "state": STATES[state],
+        "point": (x, y) if flags & FLAG_POINT else None,
+        "reused": bool(flags & FLAG_REUSED),
+        "dropped": dropped,
+        "skipped": skipped,
+        "server_ms": server_ms,
+    }
+    if flags & FLAG_OUTLINE:
+        n_contour, n_hull = OUTLINE_HEADER.unpack_from(data, RESULT_RECORD.size)
+        values = np.frombuffer(data, dtype="<i2", offset=RESULT_RECORD.size + OUTLINE_HEADER.size).tolist()
+        result["outline"] = {"contour": values[:n_contour], "hull": values[n_contour:n_contour + n_hull]}
+    return result
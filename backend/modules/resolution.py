@@ -0,0 +1,78 @@
+from config.config import ADAPTIVE_RESOLUTION, TARGET_FRAME_MS, PROCESSING_SCALES, RESOLUTION_COOLDOWN_FRAMES, DOWNSAMPLE_RATIO
+
+
+class ResolutionController:
+    def __init__(self, target_ms=TARGET_FRAME_MS, scales=PROCESSING_SCALES, max_scale=DOWNSAMPLE_RATIO,
+                 adaptive=ADAPTIVE_RESOLUTION, cooldown=RESOLUTION_COOLDOWN_FRAMES, alpha=0.1, headroom=0.7):
+        """
+        Choose the processing scale of one session from its measured frame time.
+        The scale steps down when the smoothed frame time exceeds the target, and
+        steps up when the cost predicted for the next larger scale (time grows with
+        the pixel count) still fits within headroom * target. After every change the
+        controller waits `cooldown` frames and measures afresh, so it does not oscillate.
+        Args:
+            target_ms (float): Processing budget per frame.
+            scales (tuple): Scales to choose from.
+            max_scale (float): Largest scale allowed; also the starting scale.
+            adaptive (bool): If False the scale stays at max_scale.
+            cooldown (int): Frames to wait after a change.
+            alpha (float): Smoothing factor of the frame time EMA.
+            headroom (float): Fraction of the target a larger scale must fit in.
+        """
+        self.target_ms = target_ms
+        self.scales = sorted({s for s in scales if s <= max_scale} | {max_scale}, reverse=True)
+        self.adaptive = adaptive
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.headroom = headroom
+        self.level = 0  # Index into self.scales, 0 is the largest
+        self.frame_ms = None  # EMA of the measured frame time
+        self.wait = cooldown
+        self.changes = 0
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def reset(self):
+        """
+        Start over at the largest scale.
+        """
+        self.level = 0
+        self.frame_ms = None
+        self.wait = self.cooldown
+
+    def update(self, frame_ms):
+        """
+        Record the time one frame took and return the scale for the next frame.
+        """
+        if not self.adaptive:
+            return self.scale
+        if self.frame_ms is None:
+            self.frame_ms = frame_ms
+        else:
+            self.frame_ms += self.alpha * (frame_ms - self.frame_ms)
+
+        if self.wait > 0:
+            self.wait -= 1
+            return self.scale
+
+        if self.frame_ms > self.target_ms and self.level < len(self.scales) - 1:
+            self._set_level(self.level + 1)
+        elif self.level > 0:
+            ratio = self.scales[self.level - 1] / self.scale
+            if self.frame_ms * ratio * ratio < self.target_ms * self.headroom:
+                self._set_level(self.level - 1)
+        return self.scale
+
+    def stats(self):
+        """
+        Current scale, smoothed frame time and number of scale changes.
+        """
+        return {"scale": self.scale, "frame_ms": self.frame_ms, "changes": self.changes}
+
+    def _set_level(self, level):
+        self.level = level
+        self.frame_ms = None
+        self.wait = self.cooldown
+        self.changes += 1
@@ -0,0 +1,216 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from config.config import MAX_SESSIONS, SESSION_POOL_SIZE, SESSION_IDLE_TIMEOUT, SESSION_MEMORY_LIMIT_MB, FRAME_WIDTH, FRAME_HEIGHT
+
+
+class SessionLimitError(RuntimeError):
+    """
+    Raised when a new session would exceed the session or memory limits.
+    """
+
+
+class TrackingSession:
+    def __init__(self, session_id, system):
+        """
+        A single client's tracking state.
+        Args:
+            session_id (str): Unique identifier of the session.
+            system (HandTrackingSystem): Pipeline owned exclusively by this session.
+        """
+        self.session_id = session_id
+        self.system = system
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.frames_processed = 0
+        self.closed = False
+
+    def touch(self):
+        """
+        Mark the session as active now.
+        """
+        self.last_active = time.monotonic()
+
+    def idle_time(self, now=None):
+        """
+        Seconds since the session last received a frame.
+        """
+        if now is None:
+            now = time.monotonic()
+        return now - self.last_active
+
+    def memory_footprint(self):
+        """
+        Bytes of frame data held by this session's pipeline.
+        """
+        return self.system.memory_footprint() if self.system is not None else 0
+
+
+class SessionManager:
+    def __init__(self, factory, max_sessions=MAX_SESSIONS, pool_size=SESSION_POOL_SIZE,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, memory_limit_mb=SESSION_MEMORY_LIMIT_MB, prefill=True):
+        """
+        Hand out an isolated pipeline per client, recycling pre-built ones.
+        Args:
+            factory (callable): Builds a new HandTrackingSystem.
+            max_sessions (int): Maximum number of concurrent sessions.
+            pool_size (int): Number of idle pipelines kept ready for reuse.
+            idle_timeout (float): Seconds without activity before a session is evicted.
+            memory_limit_mb (float): Upper bound on memory held by all sessions.
+            prefill (bool): Build the pooled pipelines now; otherwise call fill_pool() later (e.g. during warm-up).
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        # Rough per-session cost used before a session has cached any frames
+        self.session_estimate = FRAME_WIDTH * FRAME_HEIGHT
+        self.sessions = OrderedDict()  # session_id -> TrackingSession, least recently used first
+        self.pool = []
+        self.lock = threading.Lock()
+
+        if prefill:
+            self.fill_pool()
+
+    def fill_pool(self, prepare=None):
+        """
+        Build idle pipelines until the pool holds pool_size of them.
+        Args:
+            prepare (callable): Called with each new pipeline before it is pooled (e.g. to warm it up).
+        Returns:
+            int: Pipelines built.
+        """
+        built = 0
+        while True:
+            with self.lock:
+                if len(self.pool) >= self.pool_size:
+                    break
+            system = self.factory()
+            if prepare is not None:
+                prepare(system)
+            with self.lock:
+                self.pool.append(system)
+            built += 1
+        return built
+
+    def acquire(self, session_id=None):
+        """
+        Create a new session backed by a pooled (or freshly built) pipeline.
+        Args:
+            session_id (str): Optional identifier; a random one is generated otherwise.
+        Returns:
+            TrackingSession: The new session.
+        Raises:
+            SessionLimitError: If the session or memory limit is reached.
+        """
+        self.evict_idle()
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitError(f"Session limit reached ({self.max_sessions}).")
+            if self._memory_usage() + self.session_estimate > self.memory_limit:
+                raise SessionLimitError("Session memory limit reached.")
+
+            system = self.pool.pop() if self.pool else None
+
+        if system is None:
+            system = self.factory()
+
+        session = TrackingSession(session_id or uuid.uuid4().hex, system)
+        with self.lock:
+            self.sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id):
+        """
+        Look up a live session and mark it as recently used.
+        """
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                session.touch()
+            return session
+
+    def active(self):
+        """
+        Snapshot of the live sessions.
+        Returns:
+            list: TrackingSession objects, least recently used first.
+        """
+        with self.lock:
+            return list(self.sessions.values())
+
+    def release(self, session):
+        """
+        Close a session and return its pipeline to the pool.
+        """
+        with self.lock:
+            if self.sessions.pop(session.session_id, None) is None:
+                return
+        self._recycle(session)
+
+    def evict_idle(self, now=None):
+        """
+        Remove sessions idle longer than the timeout, then the least recently used
+        ones while the memory limit is exceeded.
+        Returns:
+            list: The evicted sessions (already closed).
+        """
+        if now is None:
+            now = time.monotonic()
+
+        evicted = []
+        with self.lock:
+            for session_id, session in list(self.sessions.items()):
+                if session.idle_time(now) > self.idle_timeout:
+                    evicted.append(self.sessions.pop(session_id))
+
+            while self.sessions and self._memory_usage() > self.memory_limit:
+                _, session = self.sessions.popitem(last=False)
+                evicted.append(session)
+
+        # An evicted session's handler may still be mid-frame, so its pipeline is
+        # dropped rather than handed to the next client.
+        for session in evicted:
+            self._recycle(session, reuse=False)
+        return evicted
+
+    def stats(self):
+        """
+        Summary of the manager's current load.
+        Returns:
+            dict: Active sessions, pooled pipelines and memory usage in bytes.
+        """
+        with self.lock:
+            return {
+                "active_sessions": len(self.sessions),
+                "pooled": len(self.pool),
+                "max_sessions": self.max_sessions,
+                "memory_bytes": self._memory_usage(),
+                "memory_limit_bytes": self.memory_limit,
+            }
+
+    def _memory_usage(self):
+        """
+        Memory held by all live sessions. Caller must hold the lock.
+        """
+        return sum(max(s.memory_footprint(), self.session_estimate) for s in self.sessions.values())
+
+    def _recycle(self, session, reuse=True):
+        """
+        Close a session and keep its (reset) pipeline if the pool has room.
+        A pipeline that is not reused still has its recorder and logger closed.
+        """
+        if session.closed:
+            return
+        session.closed = True
+        system, session.system = session.system, None
+        if not reuse:
+            system.close()
+            return
+        system.reset()
+        with self.lock:
+            if len(self.pool) < self.pool_size:
+                self.pool.append(system)
@@ -0,0 +1,404 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+import cv2
+import numpy as np
+from config.config import SHARD_RING_SLOTS, SHARD_MAX_FRAME_PIXELS, SHARD_RESTART_DELAY
+from modules.frame_ingest import ENCODED, decode_scaled
+
+# Workers are spawned, not forked: the front process runs threads, and Windows can only spawn
+CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _attach(name):
+    """
+    Open a ring created by the front process without taking ownership of it.
+    """
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Spawned workers share the front process's resource tracker, so registering again is harmless
+        return SharedMemory(name=name)
+
+
+def _shard_main(connection, ring_name, slot_bytes, factory):
+    """
+    Worker process: run the frames of its sessions, each session on its own pipeline.
+    Requests are (kind, job, ...) tuples:
+        ("frame", job, session_id, slot, shape, frame_scale, outline): process the frame in a ring slot;
+        ("drop", None, session_id): forget a session;
+        ("warm", job, sizes, frames): load the artifacts and run warm-up frames;
+        None: exit.
+    Replies are (job, ok, result or error text, decode scale for the session's next frame, busy seconds).
+    """
+    ring = _attach(ring_name)
+    systems = {}  # session_id -> HandTrackingSystem
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break  # The front process is gone
+        if message is None:
+            break
+        kind, job = message[0], message[1]
+        start = time.perf_counter()
+        try:
+            if kind == "frame":
+                _, _, session_id, slot, shape, frame_scale, outline = message
+                system = systems.get(session_id)
+                if system is None:
+                    system = systems[session_id] = factory()
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=ring.buf, offset=slot * slot_bytes)
+                result = system.process_frame_data(frame, frame_scale, outline)
+                del frame  # The slot is handed back with the reply
+                reply = (job, True, result, system.decode_scale())
+            elif kind == "drop":
+                systems.pop(message[2], None)
+                continue
+            elif kind == "warm":
+                from modules.startup import load_artifacts, warm_pipeline
+                _, _, sizes, frames = message
+                load_artifacts(sizes)
+                warm_pipeline(factory(), frames)
+                reply = (job, True, os.getpid(), 1.0)
+            else:
+                raise ValueError(f"Unknown shard request: {kind}")
+        except Exception:
+            reply = (job, False, traceback.format_exc(), 1.0)
+        connection.send(reply + (time.perf_counter() - start,))
+    ring.close()
+
+
+class Shard:
+    def __init__(self, index, factory, slots=SHARD_RING_SLOTS, slot_bytes=SHARD_MAX_FRAME_PIXELS * 3):
+        """
+        One worker process and the shared-memory ring its frames are handed over in.
+        The front process decodes a frame straight into a free slot of the ring and
+        sends only the slot number and shape; the worker processes the frame in place
+        and sends back the result record, which frees the slot. A watcher thread
+        reads the replies and restarts the process if it dies; frames it was
+        working on come back as None, and its sessions start over with fresh
+        pipelines on the new process.
+        Args:
+            index (int): Shard number.
+            factory (callable): Builds a HandTrackingSystem in the worker (must be picklable).
+            slots (int): Frames that can be in flight at once.
+            slot_bytes (int): Size of a slot; frames are downscaled to fit.
+        """
+        self.index = index
+        self.factory = factory
+        self.slot_count = slots
+        self.slot_bytes = slot_bytes
+        self.ring = SharedMemory(create=True, size=slots * slot_bytes)
+        self.free = list(range(slots))  # Touched on the event loop only
+        self.slots = None  # asyncio.Semaphore over the free slots, created in the loop
+        self.loop = None
+        self.pending = {}  # job -> (future, slot, generation)
+        self.jobs = itertools.count()
+        self.sessions = set()
+        self.lock = threading.Lock()  # Guards the process, connection and generation
+        self.process = None
+        self.connection = None
+        self.generation = 0  # Process restarts so far; requests are tagged with it
+        self.launched = None
+        self.running = False
+        self.watcher = None
+        self.frames = 0
+        self.busy = 0.0  # Seconds the worker spent processing
+        self.errors = 0
+
+    def start(self):
+        """
+        Start the worker process and its watcher (idempotent).
+        """
+        if self.running:
+            return
+        self._launch(restart=False)
+        self.running = True
+        self.watcher = threading.Thread(target=self._watch, name=f"shard-{self.index}", daemon=True)
+        self.watcher.start()
+
+    def _launch(self, restart=True):
+        front, back = CONTEXT.Pipe()
+        process = CONTEXT.Process(target=_shard_main, args=(back, self.ring.name, self.slot_bytes, self.factory),
+                                  name=f"shard-{self.index}", daemon=True)
+        process.start()
+        back.close()
+        with self.lock:
+            self.process, self.connection = process, front
+            self.launched = time.monotonic()
+            if restart:
+                self.generation += 1
+            return self.generation
+
+    def _watch(self):
+        while True:
+            with self.lock:
+                process, connection = self.process, self.connection
+            ready = wait([connection, process.sentinel])
+            if connection in ready:
+                try:
+                    self._call(self._finish, connection.recv())
+                    continue
+                except (EOFError, OSError):
+                    pass
+            if not self.running:
+                return
+            # The worker died: start a new one, then fail what the old one had
+            process.join(timeout=1.0)
+            print(f"Shard {self.index} worker (pid {process.pid}) exited with code {process.exitcode}; restarting")
+            connection.close()
+            if time.monotonic() - self.launched < SHARD_RESTART_DELAY:
+                time.sleep(SHARD_RESTART_DELAY)  # Do not spin on a worker that crashes at startup
+            self._call(self._fail_pending, self._launch())
+
+    def _call(self, callback, *args):
+        """
+        Run a callback on the event loop (from the watcher thread).
+        """
+        if self.loop is None:
+            return  # Nothing was ever submitted
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # The loop is closed
+
+    def view(self, slot, shape):
+        """
+        A ring slot as a uint8 array of the given shape.
+        """
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.ring.buf, offset=slot * self.slot_bytes)
+
+    def write_frame(self, slot, data, fmt, scale):
+        """
+        Decode a client frame into a ring slot (runs on a decoder thread).
+        Returns:
+            tuple: (shape, frame_scale) of the frame in the slot, or None if the data is not a valid frame.
+        """
+        frame, frame_scale = decode_scaled(data, fmt, scale)
+        if frame is None:
+            return None
+        height, width = frame.shape[:2]
+        capacity = self.slot_bytes // 3
+        if height * width > capacity:
+            factor = (capacity / (height * width)) ** 0.5
+            size = (max(1, int(width * factor)), max(1, int(height * factor)))
+            target = self.view(slot, (size[1], size[0], 3))
+            cv2.resize(frame, size, dst=target, interpolation=cv2.INTER_AREA)
+            return target.shape, frame_scale * size[0] / width
+        np.copyto(self.view(slot, frame.shape), frame)
+        return frame.shape, frame_scale
+
+    async def acquire_slot(self):
+        if self.slots is None:
+            self.loop = asyncio.get_running_loop()
+            self.slots = asyncio.Semaphore(self.slot_count)
+        await self.slots.acquire()
+        return self.free.pop()
+
+    def release_slot(self, slot):
+        self.free.append(slot)
+        self.slots.release()
+
+    def request(self, kind, *args, slot=None):
+        """
+        Send a request to the worker.
+        Args:
+            kind (str): "frame", "drop" or "warm" (see _shard_main).
+            slot (int): Ring slot the request uses; freed when the reply comes.
+        Returns:
+            asyncio.Future: Resolves to (result, decode scale); (None, 1.0) if the worker died.
+        """
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        self.start()
+        job = next(self.jobs)
+        future = self.loop.create_future()
+        with self.lock:
+            self.pending[job] = (future, slot, self.generation)
+            try:
+                self.connection.send((kind, job) + args)
+                return future
+            except (OSError, ValueError):
+                pass  # The worker is gone; the watcher restarts it
+        self._settle(job, (None, 1.0))
+        return future
+
+    def post(self, kind, *args):
+        """
+        Send a request that gets no reply.
+        """
+        if not self.running:
+            return
+        with self.lock:
+            try:
+                self.connection.send((kind, None) + args)
+            except (OSError, ValueError):
+                pass
+
+    def _finish(self, reply):
+        job, ok, payload, decode_scale, busy = reply
+        entry = self.pending.get(job)
+        if entry is None:
+            return
+        if entry[1] is not None:
+            self.frames += 1
+            self.busy += busy
+        if ok:
+            self._settle(job, (payload, decode_scale))
+        else:
+            self.errors += 1
+            self._settle(job, error=RuntimeError(f"Shard {self.index} worker failed:\n{payload}"))
+
+    def _fail_pending(self, generation):
+        """
+        Settle the requests sent to a worker that died (those older than `generation`).
+        """
+        for job, (_, _, sent) in list(self.pending.items()):
+            if sent < generation:
+                self._settle(job, (None, 1.0))
+
+    def _settle(self, job, value=None, error=None):
+        future, slot, _ = self.pending.pop(job)
+        if slot is not None:
+            self.release_slot(slot)
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+    def stats(self, elapsed):
+        """
+        Load of the shard over `elapsed` seconds.
+        """
+        process = self.process
+        return {
+            "shard": self.index,
+            "pid": process.pid if process is not None else None,
+            "alive": process is not None and process.is_alive(),
+            "sessions": len(self.sessions),
+            "in_flight": len(self.pending),
+            "free_slots": len(self.free),
+            "frames": self.frames,
+            "fps": self.frames / elapsed,
+            "mean_ms": self.busy * 1000.0 / self.frames if self.frames else 0.0,
+            "utilization": self.busy / elapsed,
+            "restarts": self.generation,
+            "errors": self.errors,
+        }
+
+    def stop(self):
+        """
+        Stop the worker and free the ring.
+        """
+        if self.running:
+            self.running = False
+            with self.lock:
+                process, connection = self.process, self.connection
+                try:
+                    connection.send(None)
+                except (OSError, ValueError):
+                    pass
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        try:
+            self.ring.close()
+            self.ring.unlink()
+        except (BufferError, FileNotFoundError):
+            pass
+
+
+class ShardPool:
+    def __init__(self, factory, workers, slots=SHARD_RING_SLOTS, max_pixels=SHARD_MAX_FRAME_PIXELS):
+        """
+        Sessions sharded over worker processes, so tracking uses every core while
+        this process keeps the sockets. Each session stays on the shard it was given
+        first (the least loaded one). Frames are decoded here, on a thread pool, into
+        the shard's shared-memory ring (see Shard): frame pixels are never pickled,
+        only a small request and the result record cross the process boundary.
+        Worker processes start on warm-up or on their first frame.
+        Args:
+            factory (callable): Builds a HandTrackingSystem in a worker (must be picklable).
+            workers (int): Number of worker processes.
+            slots (int): Frames in flight per worker.
+            max_pixels (int): Largest frame (width * height) a slot holds.
+        """
+        self.shards = [Shard(index, factory, slots, max_pixels * 3) for index in range(workers)]
+        self.decoder = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-decode")
+        self.assignments = {}  # session_id -> shard index
+        self.decode_scales = {}  # session_id -> decode scale the worker reported with the last result
+        self.started = time.perf_counter()
+
+    def _assign(self, session_id):
+        """
+        Pin a session to the shard with the fewest sessions on first use.
+        """
+        index = self.assignments.get(session_id)
+        if index is None:
+            index = min(range(len(self.shards)), key=lambda i: len(self.shards[i].sessions))
+            self.assignments[session_id] = index
+            self.shards[index].sessions.add(session_id)
+        return index
+
+    async def submit(self, session_id, data, fmt=ENCODED, outline=False):
+        """
+        Decode a frame into its session's shard and wait for the result.
+        Returns:
+            dict: The pipeline result, or None if the frame could not be decoded
+                or its worker died while processing it.
+        """
+        shard = self.shards[self._assign(session_id)]
+        scale = self.decode_scales.get(session_id, 1.0)
+        slot = await shard.acquire_slot()
+        try:
+            decoded = await asyncio.get_running_loop().run_in_executor(self.decoder, shard.write_frame, slot, data, fmt, scale)
+        except BaseException:
+            shard.release_slot(slot)
+            raise
+        if decoded is None:
+            shard.release_slot(slot)
+            return None
+        shape, frame_scale = decoded
+        result, decode_scale = await shard.request("frame", session_id, slot, shape, frame_scale, outline, slot=slot)
+        if session_id in self.assignments:
+            self.decode_scales[session_id] = decode_scale
+        return result
+
+    def drop(self, session_id):
+        """
+        Forget a session here and in its worker.
+        """
+        index = self.assignments.pop(session_id, None)
+        self.decode_scales.pop(session_id, None)
+        if index is not None:
+            shard = self.shards[index]
+            shard.sessions.discard(session_id)
+            shard.post("drop", session_id)
+
+    async def warm_up(self, sizes, frames):
+        """
+        Start every worker and have it load the artifacts and run warm-up frames.
+        Returns:
+            list: Process id of each worker.
+        """
+        replies = await asyncio.gather(*(shard.request("warm", sizes, frames) for shard in self.shards))
+        return [pid for pid, _ in replies]
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return [shard.stats(elapsed) for shard in self.shards]
+
+    def shutdown(self):
+        self.decoder.shutdown(wait=False, cancel_futures=True)
+        for shard in self.shards:
+            shard.stop()
@@ -0,0 +1,120 @@
+import threading
+from functools import lru_cache
+import cv2
+import numpy as np
+from config.config import HSV_LOWER, HSV_UPPER, YCRCB_LOWER, YCRCB_UPPER, SKIN_LUT_EXACT, CACHE_DIR
+from modules.buffer_arena import BufferArena
+from modules.artifact_cache import ArtifactCache, artifact_cache, config_key
+
+AMBIGUOUS = 1  # Exact-table value for cells containing both skin and non-skin colors
+
+
+def threshold_skin_mask(bgr, hsv_lower, hsv_upper, ycrcb_lower, ycrcb_upper):
+    """
+    Reference skin decision: HSV and YCrCb range checks combined.
+    Works on any BGR image shape.
+    """
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    ycrcb = cv2.cvtColor(bgr, cv2.COLOR_BGR2YCrCb)
+    return cv2.bitwise_and(cv2.inRange(hsv, hsv_lower, hsv_upper), cv2.inRange(ycrcb, ycrcb_lower, ycrcb_upper))
+
+
+class SkinLUT:
+    def __init__(self, exact=SKIN_LUT_EXACT, cache_dir=CACHE_DIR,
+                 hsv_lower=HSV_LOWER, hsv_upper=HSV_UPPER, ycrcb_lower=YCRCB_LOWER, ycrcb_upper=YCRCB_UPPER):
+        """
+        Skin segmentation through a precomputed, quantized BGR lookup table.
+        Pixels are quantized to 16-bit BGR565 codes (one SIMD cvtColor call), and
+        the exact table maps each code to 255 (every color in the cell is skin), 0
+        (none is) or AMBIGUOUS. With exact=True, pixels in ambiguous cells are
+        re-checked with the threshold path so the mask matches it bit for bit;
+        otherwise a majority table (cell is skin if most of its colors are) is
+        used and the mask is a single lookup.
+        Args:
+            exact (bool): Re-check pixels in ambiguous cells.
+            cache_dir (str): Directory for the cached table, or None to skip caching.
+        """
+        self.exact = exact
+        self.thresholds = tuple(np.array(v, dtype=np.uint8) for v in (hsv_lower, hsv_upper, ycrcb_lower, ycrcb_upper))
+        self.local = threading.local()  # Scratch buffers; the table is shared across threads
+        self.table, self.majority_table = self._load_or_build(cache_dir)
+
+    def cache_key(self):
+        """
+        Key identifying the table contents: thresholds and OpenCV version.
+        """
+        return config_key("bgr565", [tuple(int(x) for x in t) for t in self.thresholds])
+
+    def apply(self, bgr, out=None, arena=None):
+        """
+        Compute the skin mask of a contiguous BGR image (any shape) with one table lookup.
+        Args:
+            bgr (numpy.ndarray): BGR image.
+            out (numpy.ndarray): Optional uint8 buffer with the image's height and width for the mask.
+            arena (BufferArena): Scratch buffers to use; defaults to a per-thread arena.
+        Returns:
+            numpy.ndarray: uint8 mask (0 or 255) with the image's height and width.
+        """
+        if arena is None:
+            arena = self._arena()
+        shape = bgr.shape[:-1]
+        codes = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGR565, dst=arena.get("lut_codes", shape + (2,)))
+        # np.take converts the indices to intp anyway; doing it into a reused buffer saves the allocation
+        index = arena.get("lut_index", shape, np.intp)
+        np.copyto(index, codes.view(np.uint16)[..., 0])
+        # Codes are always in range; "clip" lets np.take write straight into out
+        if not self.exact:
+            return np.take(self.majority_table, index, out=out, mode="clip")
+
+        mask = np.take(self.table, index, out=out, mode="clip")
+        ambiguous = np.flatnonzero(mask == AMBIGUOUS)
+        if ambiguous.size:
+            pixels = bgr.reshape(-1, 3)[ambiguous].reshape(1, -1, 3)
+            mask.reshape(-1)[ambiguous] = threshold_skin_mask(pixels, *self.thresholds).reshape(-1)
+        return mask
+
+    def _arena(self):
+        """
+        Per-thread scratch buffers for callers that do not bring their own.
+        """
+        arena = getattr(self.local, "arena", None)
+        if arena is None:
+            arena = self.local.arena = BufferArena()
+        return arena
+
+    def _load_or_build(self, cache_dir):
+        cache = artifact_cache() if cache_dir == CACHE_DIR else ArtifactCache(cache_dir)
+        tables = cache.load_or_build("skin_lut", self.cache_key(), self._build)
+        return tables[0], tables[1]
+
+    def _build(self):
+        """
+        Classify every 24-bit BGR color once and reduce the result per BGR565 cell.
+        Returns:
+            numpy.ndarray: (2, 65536) array holding the exact and majority tables.
+        """
+        levels = np.arange(256, dtype=np.uint8)
+        cube = np.empty((256, 256 * 256, 3), dtype=np.uint8)
+        cube.reshape(256, 256, 256, 3)[..., 0] = levels[:, None, None]
+        cube.reshape(256, 256, 256, 3)[..., 1] = levels[None, :, None]
+        cube.reshape(256, 256, 256, 3)[..., 2] = levels[None, None, :]
+        codes = cv2.cvtColor(cube, cv2.COLOR_BGR2BGR565).view(np.uint16).reshape(-1)
+        skin = threshold_skin_mask(cube, *self.thresholds).reshape(-1) > 0
+        del cube
+
+        total = np.bincount(codes, minlength=1 << 16)
+        skin_count = np.bincount(codes[skin], minlength=1 << 16)
+
+        tables = np.zeros((2, 1 << 16), dtype=np.uint8)
+        tables[0][skin_count > 0] = AMBIGUOUS
+        tables[0][skin_count == total] = 255
+        tables[1][2 * skin_count > total] = 255
+        return tables
+
+
+@lru_cache(maxsize=None)
+def shared_skin_lut():
+    """
+    Process-wide SkinLUT for the configured thresholds, built or loaded once.
+    """
+    return SkinLUT()
@@ -16,6 +16,13 @@ class PointSmoother:
         self.points = deque(maxlen=window_size)
         self.ema_point = None
 
+    def reset(self):
+        """
+        Clear the smoothing history so the smoother can be reused.
+        """
+        self.points.clear()
+        self.ema_point = None
+
     def smooth(self, point):
         """
         Smooth the given point using median and EMA smoothing.
@@ -25,8 +32,7 @@ class PointSmoother:
             tuple: The smoothed point (x, y).
         """
         if point is None:
-            self.points.clear()
-            self.ema_point = None
+            self.reset()
             return None
 
         # Handle sudden jumps: if displacement is too large, reset to new point
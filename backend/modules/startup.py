@@ -0,0 +1,134 @@
+import asyncio
+import time
+from contextlib import contextmanager
+import cv2
+from config.config import SEGMENTATION_MODE, WARMUP_FRAME_SIZES, WARMUP_FRAMES, STARTUP_BUDGET_S
+from modules.artifact_cache import artifact_cache
+from modules.geometry import frame_geometry
+from modules.hazard_zones import hazard_field
+from modules.skin_lut import shared_skin_lut
+from modules.synthetic import SyntheticHandSource
+from modules.frame_worker import process_frame_bytes
+
+
+def load_artifacts(sizes=WARMUP_FRAME_SIZES):
+    """
+    Build, or load from the artifact cache, the precomputed data a process
+    shares across its pipelines: the skin lookup table (in "lut" mode) and the
+    geometry and hazard distance fields of every warm-up frame size.
+    """
+    if SEGMENTATION_MODE == "lut":
+        shared_skin_lut()
+    for width, height in sizes:
+        frame_geometry(width, height)
+        hazard_field(width, height)
+
+
+def warmup_frames(sizes=WARMUP_FRAME_SIZES, count=WARMUP_FRAMES):
+    """
+    JPEG frames of a synthetic moving hand, `count` per frame size, as a client would send them.
+    Returns:
+        list: Frame bytes.
+    """
+    frames = []
+    for width, height in sizes:
+        # Without sensor noise: the frames only need to exercise the pipeline, and are built much faster
+        for frame in SyntheticHandSource(width, height, count=count, noise=0.0):
+            ok, data = cv2.imencode(".jpg", frame)
+            frames.append(data.tobytes())
+    return frames
+
+
+def warm_pipeline(system, frames):
+    """
+    Run warm-up frames through a pipeline, so its buffers and the code paths
+    behind it are ready for the first client, then clear its state.
+    """
+    for data in frames:
+        process_frame_bytes(system, data)
+    system.reset()
+
+
+class Startup:
+    def __init__(self, budget=STARTUP_BUDGET_S, started=None):
+        """
+        The server's warm-up phase, as reported by the health probes. The server
+        is live as soon as it answers; it is ready once the artifacts are loaded,
+        the session pool is built and every pooled pipeline (and, in process mode,
+        every worker process) has run the synthetic warm-up frames.
+        Args:
+            budget (float): Seconds the server should take to become ready.
+            started (float): perf_counter() value startup is measured from; defaults to now.
+        """
+        self.budget = budget
+        self.started = time.perf_counter() if started is None else started
+        self.state = "starting"  # starting -> warming -> ready, or failed
+        self.phases = {}  # Phase name -> seconds
+        self.ready_after = None  # Seconds from start to ready
+        self.error = None
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a warm-up phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    async def run(self, sessions, worker, sizes=WARMUP_FRAME_SIZES):
+        """
+        Warm up without blocking the event loop, so liveness probes are answered meanwhile.
+        Args:
+            sessions (SessionManager): Manager whose pool is built (created with prefill=False).
+            worker (FrameWorker): Frame executor; its worker processes are warmed in process mode.
+            sizes (tuple): (width, height) frame sizes to prepare.
+        """
+        self.phases["boot"] = time.perf_counter() - self.started  # Imports and server start
+        self.state = "warming"
+        loop = asyncio.get_running_loop()
+        try:
+            with self.phase("artifacts"):
+                await loop.run_in_executor(None, load_artifacts, sizes)
+            with self.phase("frames"):
+                frames = await loop.run_in_executor(None, warmup_frames, sizes)
+            with self.phase("session_pool"):
+                await loop.run_in_executor(None, sessions.fill_pool, lambda system: warm_pipeline(system, frames))
+            if worker.mode in ("process", "shard"):
+                with self.phase("worker_processes"):
+                    await worker.warm_up(sizes, frames)
+        except Exception as e:
+            self.state, self.error = "failed", e
+            print(f"Warm-up failed: {e}")
+            return
+
+        self.ready_after = time.perf_counter() - self.started
+        self.state = "ready"
+        over = f", over the {self.budget:g} s budget" if self.ready_after > self.budget else ""
+        print(f"Ready after {self.ready_after:.2f} s ({self.summary()}{over})")
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds * 1000.0:.0f} ms" for name, seconds in self.phases.items())
+
+    def report(self):
+        """
+        State and timings for the readiness probe.
+        """
+        report = {
+            "state": self.state,
+            "phases_ms": {name: seconds * 1000.0 for name, seconds in self.phases.items()},
+            "budget_s": self.budget,
+            "artifacts": artifact_cache().stats(),
+        }
+        if self.ready_after is not None:
+            report["ready_after_s"] = self.ready_after
+            report["within_budget"] = self.ready_after <= self.budget
+        if self.error is not None:
+            report["error"] = str(self.error)
+        return report
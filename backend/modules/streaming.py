@@ -0,0 +1,292 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import cv2
+import numpy as np
+from config.config import (STREAM_QUALITY, STREAM_MIN_QUALITY, STREAM_QUALITY_STEP, STREAM_MAX_FPS,
+                           STREAM_ENCODER_WORKERS)
+
+MJPEG_BOUNDARY = "frame"
+MJPEG_MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+SPARE_BUFFERS = 2  # Render buffers a stream keeps for reuse besides the newest frame
+RAISE_AFTER = 15  # Deliveries with headroom before a viewer's quality is raised again
+
+
+@lru_cache(maxsize=None)
+def encoder_pool():
+    """
+    JPEG encoder threads shared by all streams of this process (cv2.imencode releases the GIL).
+    """
+    return ThreadPoolExecutor(max_workers=STREAM_ENCODER_WORKERS, thread_name_prefix="jpeg-encoder")
+
+
+def mjpeg_part(jpeg):
+    """
+    One part of a multipart/x-mixed-replace MJPEG response.
+    """
+    header = f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n"
+    return header.encode("ascii") + jpeg + b"\r\n"
+
+
+class StreamFrame:
+    def __init__(self, image, sequence):
+        """
+        A rendered frame and its JPEG encodes, one per quality asked for.
+        The render buffer is pinned while encodes read it.
+        """
+        self.image = image
+        self.sequence = sequence
+        self.encodes = {}  # Quality -> concurrent.futures.Future of the JPEG bytes
+        self.pins = 0
+
+
+class FrameStream:
+    def __init__(self, name):
+        """
+        Annotated frames of one session for the viewers attached to it.
+        The pipeline renders into a recycled buffer only while somebody watches
+        (see watched). Frames are encoded on the shared encoder pool when a viewer
+        asks for them, once per quality level: viewers at the same quality share
+        the encode, and frames no viewer got to are never encoded.
+        Args:
+            name (str): Session the frames come from.
+        """
+        self.name = name
+        self.lock = threading.Lock()
+        self.viewers = []
+        self.latest = None  # Newest StreamFrame
+        self.sequence = 0  # Frames rendered so far
+        self.spare = []  # Render buffers free for reuse
+        self.frame_interval = 0.0  # Smoothed seconds between rendered frames
+        self.rendered_at = None
+        self.closed = False
+
+    @property
+    def watched(self):
+        """
+        Whether any viewer is attached (the pipeline renders only then).
+        """
+        return bool(self.viewers)
+
+    def attach(self, max_fps=STREAM_MAX_FPS, quality=STREAM_QUALITY):
+        """
+        Add a viewer. Must be called on the event loop the viewer is served from.
+        Returns:
+            StreamViewer: The viewer; iterate over frames() to get its JPEGs.
+        """
+        viewer = StreamViewer(self, asyncio.get_running_loop(), max_fps, quality)
+        with self.lock:
+            self.viewers.append(viewer)
+            if self.latest is not None:
+                viewer.notify()
+        return viewer
+
+    def detach(self, viewer):
+        with self.lock:
+            if viewer in self.viewers:
+                self.viewers.remove(viewer)
+            if not self.viewers:
+                # Nobody watches: drop the last frame and the buffers with it
+                self.latest, self.spare, self.rendered_at = None, [], None
+
+    def render(self, frame, draw):
+        """
+        Publish an annotated copy of a frame to the viewers.
+        Args:
+            frame (numpy.ndarray): BGR frame; left untouched.
+            draw (callable): Draws the overlays on the copy, in place, and returns it.
+        """
+        with self.lock:
+            image = self.spare.pop() if self.spare else None
+        if image is None or image.shape != frame.shape:
+            image = np.empty(frame.shape, dtype=np.uint8)
+        np.copyto(image, frame)
+        image = draw(image)
+
+        now = time.perf_counter()
+        with self.lock:
+            if not self.viewers:
+                return
+            if self.rendered_at is not None:
+                interval = now - self.rendered_at
+                self.frame_interval = 0.9 * self.frame_interval + 0.1 * interval if self.frame_interval else interval
+            self.rendered_at = now
+            previous = self.latest
+            self.sequence += 1
+            self.latest = StreamFrame(image, self.sequence)
+            if previous is not None:
+                self._recycle(previous)
+            for viewer in self.viewers:
+                viewer.notify()
+
+    def encode(self, quality):
+        """
+        JPEG of the newest frame at a quality, encoding it on the pool unless it already is.
+        Returns:
+            tuple: (frame sequence, concurrent.futures.Future of the JPEG bytes), or (0, None) without a frame.
+        """
+        with self.lock:
+            frame = self.latest
+            if frame is None:
+                return 0, None
+            future = frame.encodes.get(quality)
+            if future is None:
+                frame.pins += 1
+                future = frame.encodes[quality] = encoder_pool().submit(self._encode, frame, quality)
+            return frame.sequence, future
+
+    def _encode(self, frame, quality):
+        try:
+            ok, jpeg = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            return jpeg.tobytes()
+        finally:
+            with self.lock:
+                frame.pins -= 1
+                self._recycle(frame)
+
+    def _recycle(self, frame):
+        """
+        Return a superseded frame's buffer for reuse once no encode reads it (lock held).
+        """
+        if frame is self.latest or frame.pins or frame.image is None:
+            return
+        if len(self.spare) < SPARE_BUFFERS and self.viewers:
+            self.spare.append(frame.image)
+        frame.image = None
+
+    def close(self):
+        """
+        End the stream; attached viewers finish their frames() iteration.
+        """
+        with self.lock:
+            self.closed = True
+            for viewer in self.viewers:
+                viewer.notify()
+
+    def stats(self):
+        """
+        Frames rendered, the render rate and each viewer's quality, rate and dropped frames.
+        """
+        with self.lock:
+            viewers = list(self.viewers)
+        return {
+            "frames": self.sequence,
+            "fps": 1.0 / self.frame_interval if self.frame_interval else 0.0,
+            "viewers": [viewer.stats() for viewer in viewers],
+        }
+
+
+class StreamViewer:
+    def __init__(self, stream, loop, max_fps=STREAM_MAX_FPS, quality=STREAM_QUALITY):
+        """
+        One client watching a FrameStream. The viewer takes only the newest frame,
+        and only once the previous one was delivered, so its frame rate follows how
+        fast the client consumes them (up to max_fps). Its JPEG quality steps down
+        while a delivery takes longer than the time between frames, and back up
+        while deliveries keep leaving headroom.
+        Args:
+            stream (FrameStream): Stream to watch.
+            loop (asyncio.AbstractEventLoop): Loop the viewer is served from.
+            max_fps (float): Highest frame rate sent to the client.
+            quality (int): Starting and highest JPEG quality.
+        """
+        if max_fps <= 0:
+            raise ValueError("max_fps must be positive")
+        self.stream = stream
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.interval = 1.0 / max_fps
+        self.max_quality = quality
+        self.quality = quality
+        self.headroom = 0  # Consecutive deliveries well within the frame interval
+        self.sent = 0
+        self.skipped = 0  # Frames rendered while the client was busy with an earlier one
+        self.delivery = 0.0  # Smoothed seconds from taking a frame to the client accepting it
+        self.started = time.perf_counter()
+
+    def notify(self):
+        """
+        Wake the viewer for a new frame (from any thread).
+        """
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass  # The loop is closed
+
+    async def frames(self):
+        """
+        Yield JPEG bytes of the newest frame whenever the client can take one.
+        The time until the next frame is requested counts as delivery time, so
+        send each JPEG before asking for the next. Ends when the stream is closed.
+        """
+        stream = self.stream
+        last_sequence = 0
+        next_time = 0.0
+        while True:
+            await self.event.wait()
+            self.event.clear()
+            if stream.closed:
+                return
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = time.perf_counter()
+            sequence, future = stream.encode(self.quality)
+            if future is None or sequence == last_sequence:
+                continue
+            self.skipped += max(sequence - last_sequence - 1, 0) if last_sequence else 0
+            last_sequence = sequence
+            jpeg = await asyncio.wrap_future(future)
+            yield jpeg
+            self.sent += 1
+            self.adapt(time.perf_counter() - start)
+            next_time = start + self.interval
+
+    def adapt(self, seconds):
+        """
+        Adjust the quality to a delivery that took `seconds`.
+        """
+        self.delivery = 0.8 * self.delivery + 0.2 * seconds if self.delivery else seconds
+        budget = max(self.interval, self.stream.frame_interval)
+        if seconds > budget:
+            self.quality = max(self.quality - STREAM_QUALITY_STEP, STREAM_MIN_QUALITY)
+            self.headroom = 0
+        elif seconds < budget / 2:
+            self.headroom += 1
+            if self.headroom >= RAISE_AFTER:
+                self.quality = min(self.quality + STREAM_QUALITY_STEP, self.max_quality)
+                self.headroom = 0
+        else:
+            self.headroom = 0
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {"quality": self.quality, "fps": self.sent / elapsed, "sent": self.sent,
+                "skipped": self.skipped, "delivery_ms": self.delivery * 1000.0}
+
+
+class StreamRegistry:
+    def __init__(self):
+        """
+        FrameStream of every session that can be watched, by session id.
+        """
+        self.streams = {}
+
+    def open(self, session_id):
+        stream = self.streams[session_id] = FrameStream(session_id)
+        return stream
+
+    def get(self, session_id):
+        return self.streams.get(session_id)
+
+    def close(self, session_id):
+        stream = self.streams.pop(session_id, None)
+        if stream is not None:
+            stream.close()
+
+    def stats(self):
+        return {session_id: stream.stats() for session_id, stream in self.streams.items()}
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+
+class SyntheticHandSource:
+    def __init__(self, width=320, height=240, count=300, hands=1, noise=6.0, seed=0):
+        """
+        Generate camera-like frames with moving skin-colored hand blobs.
+        Each blob is a palm ellipse with a few finger strokes that drifts along a
+        smooth Lissajous path, over a gradient background with sensor noise.
+        Args:
+            width (int): Frame width.
+            height (int): Frame height.
+            count (int): Number of frames to generate (None for endless).
+            hands (int): Number of moving blobs.
+            noise (float): Standard deviation of the sensor noise.
+            seed (int): Random seed, so runs are reproducible.
+        """
+        self.width = width
+        self.height = height
+        self.count = count
+        self.noise = noise
+        rng = np.random.default_rng(seed)
+
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        base = rng.uniform(40, 200, 3)
+        slope = rng.uniform(-50, 50, (2, 3))
+        background = base + xs[..., None] / width * slope[0] + ys[..., None] / height * slope[1]
+        self.background = np.clip(background, 0, 255).astype(np.uint8)
+        self.noise_bank = [rng.normal(0, noise, (height, width, 3)).astype(np.int16) for _ in range(8)] if noise > 0 else None
+
+        self.hands = []
+        for _ in range(hands):
+            self.hands.append({
+                "phase": rng.uniform(0, 2 * np.pi, 2),
+                "speed": rng.uniform(0.02, 0.06, 2),
+                "size": rng.uniform(0.32, 0.38) * min(width, height),
+                "color": tuple(int(c) for c in rng.integers((70, 110, 170), (110, 150, 230))),
+            })
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        index = 0
+        while self.count is None or index < self.count:
+            yield self.frame(index)
+            index += 1
+
+    def hand_positions(self, index):
+        """
+        Ground-truth palm centers (x, y) of all blobs at the given frame.
+        """
+        positions = []
+        for hand in self.hands:
+            t = index * hand["speed"] + hand["phase"]
+            x = self.width * (0.5 + 0.35 * np.sin(t[0]))
+            y = self.height * (0.5 + 0.3 * np.sin(t[1]))
+            positions.append((int(x), int(y)))
+        return positions
+
+    def frame(self, index):
+        """
+        Render frame number `index` (deterministic for a given seed).
+        """
+        frame = self.background.copy()
+        for hand, (x, y) in zip(self.hands, self.hand_positions(index)):
+            size = hand["size"]
+            palm = (int(size * 0.45), int(size * 0.55))
+            cv2.ellipse(frame, (x, y), palm, 0, 0, 360, hand["color"], -1)
+            for k in range(4):
+                angle = np.deg2rad(-60 + 40 * k + 8 * np.sin(index * 0.1 + k))
+                tip = (int(x + size * np.sin(angle)), int(y - size * np.cos(angle)))
+                cv2.line(frame, (x, y), tip, hand["color"], max(2, int(size * 0.14)))
+
+        if self.noise_bank is not None:
+            noisy = frame.astype(np.int16) + self.noise_bank[index % len(self.noise_bank)]
+            frame = np.clip(noisy, 0, 255).astype(np.uint8)
+        return frame
@@ -1,3 +1,4 @@
+import os
 import cv2  # Import OpenCV for font constants
 
 # Configuration file for the HandTracking-POC project
@@ -27,23 +28,127 @@ LINE_THICKNESS = 2
 # Smoothing parameters
 SMOOTHING_WINDOW_SIZE = 3
 SMOOTHING_ALPHA = 0.6
-MAX_DISPLACEMENT = 100
+MAX_DISPLACEMENT = 0.3125  # Jump (fraction of the frame width) that restarts the smoothing
 
 # Circle parameters
-# Backend processes 320x240 images, so these coordinates are scaled down by 2 relative to 640x480
-CIRCLE_CENTER = (160, 120)  # Center of the virtual object (320/2, 240/2)
-CIRCLE_RADIUS = 25          # 50 / 2
-WARNING_BAND = 25           # 50 / 2
+# Geometry is normalized so it holds at any frame or processing resolution:
+# x positions and lengths are fractions of the frame width, y positions fractions of the height.
+CIRCLE_CENTER = (0.5, 0.5)  # Center of the virtual object
+CIRCLE_RADIUS = 0.078125  # 50 px on a 640 px wide frame, 25 px on 320
+WARNING_BAND = 0.078125
+STATE_HYSTERESIS = 0.015625  # Extra distance needed to leave a state (5 px on 320)
+
+# Hazard zones
+# Each zone gets its own SAFE/WARNING/DANGER state from the hand's distance to its edge
+# (WARNING_BAND and STATE_HYSTERESIS apply to all zones). Shapes, normalized like the circle:
+#   {"name": "blade", "shape": "circle", "center": (0.75, 0.3), "radius": 0.05}
+#   {"name": "press", "shape": "polygon", "points": ((0.1, 0.6), (0.3, 0.6), (0.3, 0.95), (0.1, 0.95))}
+#   {"name": "cell", "shape": "mask", "path": "cell.png"}  (non-zero pixels of an image in ZONE_DIR)
+HAZARD_ZONES = ()  # Empty: one zone, the circle above
+ZONE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zones")
 
 # Debounce parameters
 DEBOUNCE_FRAMES = 3
 
+# Smoothing and state engine
+VECTORIZED_STATE = False  # Keep all sessions' smoothing, hysteresis and debounce state in shared arrays, stepped once per batch
+
+# Multi-hand tracking
+MAX_HANDS = 1  # Hands tracked at once; above 1 each hand gets an ID, its own smoother and zone states
+HAND_TRACK_PATIENCE = 5  # Frames a hand may go undetected before its ID is dropped
+HAND_SEARCH_INTERVAL = 10  # Frames between full-frame searches for further hands while fewer than MAX_HANDS are tracked
+
 # ROI and performance parameters
-ROI_MARGIN = 100  # Margin around the detected hand for ROI tracking
-DOWNSAMPLE_RATIO = 1.0  # Downsample ratio for mask processing
+ROI_MARGIN = 0.3125  # Margin around the detected hand for ROI tracking (fraction of the frame width)
+DOWNSAMPLE_RATIO = 1.0  # Largest processing scale; the resolution controller starts here
 
 # Noise reduction parameters
-MIN_AREA = 5000  # Minimum contour area to be considered a hand
+MIN_AREA = 5000 / (320 * 240)  # Minimum contour area to be considered a hand (fraction of the frame area: 5000 px at 320x240, 20000 px at 640x480)
 MORPH_KERNEL = (7, 7)  # Kernel size for morphological operations
 MASK_CONFIDENCE_MIN = 0.5  # Minimum confidence for mask validity
-USE_MOTION_FALLBACK = True  # Enable motion-based fallback mask
\ No newline at end of file
+USE_MOTION_FALLBACK = True  # Enable motion-based fallback mask
+
+# Session management parameters
+MAX_SESSIONS = 32  # Maximum number of concurrent tracking sessions
+SESSION_POOL_SIZE = 4  # Pre-built pipelines kept ready for new connections
+SESSION_IDLE_TIMEOUT = 30.0  # Seconds without a frame before a session is evicted
+SESSION_MEMORY_LIMIT_MB = 256  # Upper bound on memory held by all sessions
+
+# Frame processing executor
+PROCESSING_EXECUTOR = "thread"  # "thread", "process" or "shard" (worker processes fed through shared memory)
+PROCESSING_WORKERS = 0  # Worker count; 0 uses one per CPU core
+MAX_QUEUED_FRAMES = 64  # Frames submitted but not yet finished, across all sessions
+
+# Session sharding (PROCESSING_EXECUTOR = "shard")
+SHARD_RING_SLOTS = 4  # Frames in flight per worker process, each in a slot of the worker's shared-memory ring
+SHARD_MAX_FRAME_PIXELS = 1280 * 720  # Largest decoded frame a slot holds (larger frames are downscaled); rings use /dev/shm
+SHARD_RESTART_DELAY = 1.0  # Seconds before restarting a worker that crashed this soon after starting
+
+# Cross-session batching (thread executor only)
+BATCH_SEGMENTATION = False  # Segment frames from several sessions in one pass
+BATCH_MAX_SIZE = 16  # Maximum frames per batch
+BATCH_MAX_WAIT_MS = 4.0  # Longest a frame waits for others to join its batch
+
+# Skin segmentation engine
+SEGMENTATION_MODE = "threshold"  # "threshold" (HSV + YCrCb inRange) or "lut" (precomputed BGR lookup table)
+SKIN_LUT_EXACT = False  # Re-check pixels whose table cell straddles the skin boundary (False: majority vote per cell)
+
+# On-disk cache for precomputed artifacts (lookup tables, ...)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+
+# Startup
+WARMUP_FRAME_SIZES = ((320, 240), (FRAME_WIDTH, FRAME_HEIGHT))  # Frame sizes (browser, camera) prepared before the server reports ready
+WARMUP_FRAMES = 3  # Synthetic frames per size run through every pooled pipeline (and worker process) during warm-up
+STARTUP_BUDGET_S = 10.0  # Seconds the server should take to become ready; exceeding it is logged and reported
+
+# Local capture
+CAPTURE_SOURCE = "0"  # Default --source: camera index, video file, image directory, frame store directory or "synthetic[:frames]"
+CAPTURE_FPS = 30.0  # Playback rate of image directories and synthetic frames (and videos that do not state one)
+
+# Recording
+RECORD_DIR = None  # If set, every WebSocket session's decoded frames are recorded to RECORD_DIR/<session_id>
+
+# Boundary logging
+LOG_DIR = None  # If set, every WebSocket session's raw/smoothed points and states are logged to LOG_DIR/<session_id>
+LOG_BUFFER_RECORDS = 4096  # Records buffered in memory per log; a log this far behind its flushes drops records
+LOG_FLUSH_INTERVAL = 0.5  # Seconds between flushes of the buffered records to disk
+
+# Annotated video streaming (thread executor only)
+STREAM_ENABLED = False  # Serve each session's annotated frames at /stream/<session_id>.mjpg and /ws/stream/<session_id>
+STREAM_QUALITY = 80  # Starting (and highest) JPEG quality of a viewer
+STREAM_MIN_QUALITY = 30  # Lowest JPEG quality a viewer that cannot keep up is lowered to
+STREAM_QUALITY_STEP = 10  # Quality change per adaptation; viewers at the same quality share encodes
+STREAM_MAX_FPS = 15.0  # Default highest frame rate sent to a viewer (viewers may ask for another with ?fps=)
+STREAM_ENCODER_WORKERS = 2  # JPEG encoder threads shared by all streams
+
+# Profiling
+PROFILING_ENABLED = False  # Per-stage timers in the tracker; can be toggled at runtime
+PROFILE_WINDOW = 512  # Recent samples kept per stage for the rolling statistics
+
+# Adaptive processing resolution
+ADAPTIVE_RESOLUTION = True  # Pick each session's processing scale from its measured frame time
+TARGET_FRAME_MS = 20.0  # Processing budget per frame
+PROCESSING_SCALES = (1.0, 0.75, 0.5, 0.35, 0.25)  # Scales the controller can choose from
+RESOLUTION_COOLDOWN_FRAMES = 30  # Frames to wait after a scale change before the next one
+
+# Motion gating
+MOTION_GATE = True  # Reuse the last result while the scene (or the tracked ROI) is static
+MOTION_GATE_WIDTH = 80  # Width of the thumbnail compared between frames
+MOTION_THRESHOLD = 15  # Change of a thumbnail pixel value (0-255) that counts as motion
+MOTION_GATE_FRACTION = 0.005  # Skip detection while fewer than this fraction of pixels moved
+MOTION_GATE_MAX_SKIP = 5  # Consecutive frames that may reuse a result before a full detection
+
+# Frame ingest
+INGEST_FORMATS = ("jpeg", "i420", "rgba", "bgr")  # Frame formats offered to clients in the welcome, most preferred first
+DECODE_AT_SCALE = True  # Decode frames straight to the processing scale where the format allows it
+
+# Hand outline in replies
+SEND_OUTLINE = True  # Clients may ask for the simplified, delta-encoded contour and hull
+OUTLINE_TOLERANCE = 0.005  # approxPolyDP tolerance and snapping distance, as a fraction of the frame width
+
+# Tracking strategy
+TRACKING_MODE = "detect"  # "detect" (full detection every frame) or "flow" (optical flow between periodic detections)
+FLOW_DETECT_INTERVAL = 5  # Frames per full detection in flow mode
+FLOW_MIN_CONFIDENCE = 0.6  # Below this share of tracked features / skin samples a full detection runs at once
+FLOW_MAX_POINTS = 40  # Features followed per hand
+FLOW_MIN_POINTS = 6  # Fewest tracked features needed to move the outline
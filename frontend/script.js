@@ -4,6 +4,7 @@ const ctx = videoOutput.getContext('2d');
 const statusBadge = document.getElementById('statusBadge');
 const dangerOverlay = document.getElementById('dangerOverlay');
 const fpsValue = document.getElementById('fpsValue');
+const rttValue = document.getElementById('rttValue');
 
 // Navigation elements
 const landingSection = document.getElementById('landing-section');
@@ -26,6 +27,9 @@ const FRAME_WIDTH = 640;
 const FRAME_HEIGHT = 480;
 const SEND_WIDTH = 320; // Downscale for network transmission
 const SEND_HEIGHT = 240;
+const USE_BINARY_PROTOCOL = true; // Ask for packed binary results (falls back to JSON if refused)
+const INGEST_FORMATS = ['jpeg', 'rgba']; // Frame formats we can send; the server picks one
+const SHOW_OUTLINE = true; // Ask for the hand contour and hull and draw them
 
 // Offscreen canvas for downscaling
 const offscreenCanvas = document.createElement('canvas');
@@ -37,9 +41,9 @@ const offscreenCtx = offscreenCanvas.getContext('2d');
 videoOutput.width = FRAME_WIDTH;
 videoOutput.height = FRAME_HEIGHT;
 
-// Virtual Object Config (Must match backend)
-const CIRCLE_CENTER = { x: 320, y: 240 };
-const CIRCLE_RADIUS = 50;
+// Virtual Object Config (Must match backend; normalized to the frame size)
+const CIRCLE_CENTER = { x: 0.5 * FRAME_WIDTH, y: 0.5 * FRAME_HEIGHT };
+const CIRCLE_RADIUS = 0.078125 * FRAME_WIDTH;
 
 // Event Listeners
 enterBtn.addEventListener('click', async () => {
@@ -108,38 +112,70 @@ function stopCamera() {
     dangerOverlay.classList.add('hidden');
 }
 
-let isProcessing = false; // Flow control flag
+// Flow control: the server keeps only the newest frame and reports how many it
+// dropped or skipped, so a frame is in flight until it is answered or reported.
+const MAX_IN_FLIGHT = 2;
+let framesSent = 0;
+let framesAnswered = 0;
+let framesDiscarded = 0;
 let latestState = 'SAFE';
 let latestPoint = null;
 
+// Protocol: the first message is a hello; afterwards every frame starts with a
+// little-endian uint32 sequence number that the server echoes in its result.
+const STATES = ['SAFE', 'WARNING', 'DANGER'];
+const FLAG_POINT = 1;
+const FLAG_SEQUENCED = 4;
+const FLAG_OUTLINE = 8;
+let resultFormat = 'json'; // Agreed in the welcome message
+let ingestFormat = 'jpeg'; // Frame format agreed in the welcome message
+let nextSeq = 0;
+const sendTimes = new Map(); // seq -> performance.now() when sent
+let outline = { contour: [], hull: [] }; // Polygons rebuilt from the server's deltas
+let zones = null; // Hazard zones from the welcome message (null: the default circle)
+
 function connectWebSocket() {
     ws = new WebSocket(WS_URL);
+    ws.binaryType = 'arraybuffer';
     
     ws.onopen = () => {
         console.log('Connected to WebSocket');
-        isProcessing = false;
+        framesSent = 0;
+        framesAnswered = 0;
+        framesDiscarded = 0;
+        resultFormat = 'json';
+        ingestFormat = 'jpeg';
+        sendTimes.clear();
+        outline = { contour: [], hull: [] };
+        zones = null;
+        ws.send(JSON.stringify({
+            type: 'hello',
+            version: 1,
+            protocol: USE_BINARY_PROTOCOL ? 'binary' : 'json',
+            ingest: INGEST_FORMATS,
+            outline: SHOW_OUTLINE
+        }));
         resetWatchdog();
     };
     
     ws.onmessage = (event) => {
         resetWatchdog();
-        isProcessing = false; // Server responded, ready for next frame
         
         try {
-            const data = JSON.parse(event.data);
-            latestState = data.state;
-            latestPoint = data.point;
-            
-            // Update DOM state
-            updateState(latestState);
-            
-            // Calculate FPS (Network FPS)
-            updateFPS();
-            
-            // Trigger next network frame immediately
-            if (isRunning) {
-                processFrame();
+            let data;
+            if (typeof event.data === 'string') {
+                data = JSON.parse(event.data);
+                if (data.type === 'welcome') {
+                    resultFormat = data.protocol;
+                    ingestFormat = data.ingest ? data.ingest.format : 'jpeg';
+                    zones = data.zones || null;
+                    console.log('Result format:', resultFormat, 'ingest format:', ingestFormat);
+                    return;
+                }
+            } else {
+                data = decodeResult(event.data);
             }
+            handleResult(data);
         } catch (e) {
             console.error("Error parsing WS message", e);
         }
@@ -155,23 +191,101 @@ function connectWebSocket() {
     
     ws.onerror = (error) => {
         console.error('WebSocket error:', error);
-        isProcessing = false;
+        clearInFlight();
     };
 }
 
+// Binary result record (see backend/modules/protocol.py):
+// seq u32, state u8, flags u8, x i16, y i16, dropped u32, skipped u32, server_ms f32
+function decodeResult(buffer) {
+    const view = new DataView(buffer);
+    const flags = view.getUint8(5);
+    const result = {
+        seq: (flags & FLAG_SEQUENCED) ? view.getUint32(0, true) : null,
+        state: STATES[view.getUint8(4)],
+        point: (flags & FLAG_POINT) ? [view.getInt16(6, true), view.getInt16(8, true)] : null,
+        dropped: view.getUint32(10, true),
+        skipped: view.getUint32(14, true),
+        server_ms: view.getFloat32(18, true),
+    };
+    // Outline block: contour and hull value counts (u16), then int16 delta values
+    if (flags & FLAG_OUTLINE) {
+        const nContour = view.getUint16(22, true);
+        const nHull = view.getUint16(24, true);
+        const values = [];
+        for (let i = 0; i < nContour + nHull; i++) {
+            values.push(view.getInt16(26 + 2 * i, true));
+        }
+        result.outline = { contour: values.slice(0, nContour), hull: values.slice(nContour) };
+    }
+    return result;
+}
+
+// Apply one delta (see backend/modules/outline.py) to the previous polygon:
+// [dx, dy, then x, y for a new vertex or -(i + 1), n to copy n shifted previous vertices]
+function applyOutlineDelta(values, previous) {
+    const [dx, dy] = values;
+    const points = [];
+    for (let k = 2; k < values.length; k += 2) {
+        if (values[k] >= 0) {
+            points.push([values[k], values[k + 1]]);
+        } else {
+            const start = -values[k] - 1;
+            for (const [x, y] of previous.slice(start, start + values[k + 1])) {
+                points.push([x + dx, y + dy]);
+            }
+        }
+    }
+    return points;
+}
+
+function handleResult(data) {
+    framesAnswered++;
+    framesDiscarded = (data.dropped || 0) + (data.skipped || 0);
+    latestState = data.state;
+    latestPoint = data.point;
+    if (data.outline) {
+        outline = {
+            contour: applyOutlineDelta(data.outline.contour, outline.contour),
+            hull: applyOutlineDelta(data.outline.hull, outline.hull),
+        };
+    }
+
+    // Round trip of the answered frame; older unanswered frames were dropped
+    if (data.seq !== undefined && data.seq !== null && sendTimes.has(data.seq)) {
+        rttValue.textContent = Math.round(performance.now() - sendTimes.get(data.seq));
+        for (const seq of sendTimes.keys()) {
+            if (seq > data.seq) break;
+            sendTimes.delete(seq);
+        }
+    }
+    
+    // Update DOM state
+    updateState(latestState);
+    
+    // Calculate FPS (Network FPS)
+    updateFPS();
+    
+    // Trigger next network frame immediately
+    if (isRunning) {
+        processFrame();
+    }
+}
+
 function renderLoop() {
     if (!isRunning) return;
 
     // 1. Draw the local video feed directly (Zero latency)
     ctx.drawImage(videoInput, 0, 0, FRAME_WIDTH, FRAME_HEIGHT);
     
-    // 2. Draw Virtual Object (Blue Circle)
-    ctx.beginPath();
-    ctx.arc(CIRCLE_CENTER.x, CIRCLE_CENTER.y, CIRCLE_RADIUS, 0, 2 * Math.PI);
-    ctx.fillStyle = 'rgba(0, 0, 255, 1)'; // Opaque blue
-    ctx.fill();
+    // 2. Draw Virtual Object (Blue Circle, or the server's hazard zones)
+    drawZones();
     
-    // 3. Draw Boundary Point if detected
+    // 3. Draw the hand outline (contour green, hull cyan)
+    drawPolygon(outline.contour, 'lime');
+    drawPolygon(outline.hull, 'cyan');
+
+    // 4. Draw Boundary Point if detected
     if (latestPoint) {
         const [x, y] = latestPoint;
         // Scale point if backend processed a different resolution
@@ -195,13 +309,55 @@ function renderLoop() {
         ctx.stroke();
     }
 
-    // 4. Draw State Overlay
+    // 5. Draw State Overlay
     drawStateOverlay(latestState);
     
     // Loop
     requestAnimationFrame(renderLoop);
 }
 
+// Zones are normalized: x and lengths are fractions of the frame width, y of the height.
+// Mask zones have no shape the browser can draw.
+function drawZones() {
+    ctx.fillStyle = 'rgba(0, 0, 255, 1)'; // Opaque blue
+    if (!zones) {
+        ctx.beginPath();
+        ctx.arc(CIRCLE_CENTER.x, CIRCLE_CENTER.y, CIRCLE_RADIUS, 0, 2 * Math.PI);
+        ctx.fill();
+        return;
+    }
+    for (const zone of zones) {
+        ctx.beginPath();
+        if (zone.shape === 'circle') {
+            ctx.arc(zone.center[0] * FRAME_WIDTH, zone.center[1] * FRAME_HEIGHT, zone.radius * FRAME_WIDTH, 0, 2 * Math.PI);
+        } else if (zone.shape === 'polygon') {
+            zone.points.forEach(([x, y], i) => {
+                if (i === 0) ctx.moveTo(x * FRAME_WIDTH, y * FRAME_HEIGHT);
+                else ctx.lineTo(x * FRAME_WIDTH, y * FRAME_HEIGHT);
+            });
+            ctx.closePath();
+        } else {
+            continue;
+        }
+        ctx.fill();
+    }
+}
+
+function drawPolygon(points, color) {
+    if (points.length < 2) return;
+    const scaleX = FRAME_WIDTH / SEND_WIDTH;
+    const scaleY = FRAME_HEIGHT / SEND_HEIGHT;
+    ctx.beginPath();
+    ctx.moveTo(points[0][0] * scaleX, points[0][1] * scaleY);
+    for (let i = 1; i < points.length; i++) {
+        ctx.lineTo(points[i][0] * scaleX, points[i][1] * scaleY);
+    }
+    ctx.closePath();
+    ctx.strokeStyle = color;
+    ctx.lineWidth = 2;
+    ctx.stroke();
+}
+
 function drawStateOverlay(state) {
     ctx.save();
     ctx.font = 'bold 24px Arial';
@@ -235,6 +391,7 @@ function resetWatchdog() {
         watchdogTimer = setTimeout(() => {
             console.warn('Watchdog triggered - restarting frame loop');
             if (ws && ws.readyState === WebSocket.OPEN) {
+                clearInFlight();
                 processFrame();
             }
         }, 2000); // Restart if no response for 2 seconds
@@ -252,26 +409,57 @@ function processFrame() {
         return;
     }
 
-    // Flow control: Don't send if server is still processing
-    if (isProcessing) {
+    // Flow control: Don't send if enough frames are already queued on the server
+    if (framesInFlight() >= MAX_IN_FLIGHT) {
         return;
     }
 
-    isProcessing = true;
+    framesSent++;
 
     // 1. Draw video to offscreen canvas (Downscaled)
     offscreenCtx.drawImage(videoInput, 0, 0, SEND_WIDTH, SEND_HEIGHT);
     
-    // 2. Get blob data (Low quality is fine for tracking)
+    // 2a. Raw pixels: no encoding cost on either side, for fast local links
+    if (ingestFormat === 'rgba') {
+        const pixels = offscreenCtx.getImageData(0, 0, SEND_WIDTH, SEND_HEIGHT).data;
+        const size = new DataView(new ArrayBuffer(4));
+        size.setUint16(0, SEND_WIDTH, true);
+        size.setUint16(2, SEND_HEIGHT, true);
+        sendFrame([size.buffer, pixels.buffer]);
+        return;
+    }
+
+    // 2b. Get blob data (Low quality is fine for tracking)
     offscreenCanvas.toBlob((blob) => {
-        if (blob && ws.readyState === WebSocket.OPEN) {
-             ws.send(blob);
+        if (blob && ws && ws.readyState === WebSocket.OPEN) {
+             sendFrame([blob]);
         } else {
-             isProcessing = false; // Reset if failed
+             framesSent--; // Reset if failed
         }
     }, 'image/jpeg', 0.5);
 }
 
+function sendFrame(parts) {
+    const seq = nextSeq;
+    nextSeq = (nextSeq + 1) >>> 0;
+    const header = new DataView(new ArrayBuffer(4));
+    header.setUint32(0, seq, true);
+    sendTimes.set(seq, performance.now());
+    ws.send(new Blob([header.buffer, ...parts]));
+    // Keep the server's slot filled so it never waits for the network
+    if (framesInFlight() < MAX_IN_FLIGHT) {
+        requestAnimationFrame(processFrame);
+    }
+}
+
+function framesInFlight() {
+    return framesSent - framesAnswered - framesDiscarded;
+}
+
+function clearInFlight() {
+    framesSent = framesAnswered + framesDiscarded;
+}
+
 function updateState(state) {
     statusBadge.textContent = state;
     